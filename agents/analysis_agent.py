@@ -2,22 +2,130 @@
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
+from time import perf_counter
 import numpy as np
 from datetime import datetime
+from config.settings import settings
+from agents.analysis_session import AnalysisSessionStore
+from agents.risk_engine import (
+    build_return_matrix, portfolio_risk, summarize_risk,
+    historical_var, parametric_var, monte_carlo_var
+)
 
 class AnalysisRequest(BaseModel):
     market_data: Dict
+    returns: Optional[Dict[str, List[float]]] = None  # periodic returns per symbol, oldest first
+    # Exposure per symbol, for every symbol with returns; without weights, current prices are used
+    weights: Optional[Dict[str, float]] = None
+    benchmark_returns: Optional[List[float]] = None
 
 class AnalysisResponse(BaseModel):
     analysis: Dict
     summary: str
 
+class VaRRequest(BaseModel):
+    returns: Dict[str, List[float]]  # periodic returns per symbol, oldest first
+    weights: Dict[str, float]  # position value per symbol
+    confidence: float = 0.99
+    horizon_days: int = 1
+    paths: int = 100_000
+    distribution: str = "normal"  # normal or student_t
+    degrees_of_freedom: float = 5.0
+    seed: Optional[int] = None
+
+class VaRResponse(BaseModel):
+    portfolio_value: float
+    confidence: float
+    horizon_days: int
+    historical: Dict
+    parametric: Dict
+    monte_carlo: Dict
+    timestamp: str
+
+class SessionOpenRequest(BaseModel):
+    market_data: Dict = {}
+
+class QuoteUpdateRequest(BaseModel):
+    quotes: Dict[str, Optional[Dict]]  # None removes a holding
+
+class SessionSnapshot(BaseModel):
+    session_id: str
+    analysis: Dict
+    summary: str
+    holdings: int
+    updates: int
+
 app = FastAPI(title="Analysis Agent", description="Performs risk and diversification analysis")
 
+def _build_analysis(total_exposure: float, sectors: Dict[str, float],
+                    regions: Dict[str, float], volatility: float) -> Tuple[Dict, str]:
+    """Turn exposure aggregates into the analysis payload and summary"""
+    sector_count = len(sectors)
+    region_count = len(regions)
+    risk_score = min(volatility * 10, 10)  # Scale to 0-10
+
+    # Diversification ratios
+    sector_div = min(sector_count / 10, 1.0)  # Ideal: 10+ sectors
+    regional_div = min(region_count / 5, 1.0)  # Ideal: 5+ regions
+
+    analysis = {
+        "total_exposure": round(total_exposure, 2),
+        "sector_diversification": round(sector_div, 2),
+        "regional_diversification": round(regional_div, 2),
+        "risk_score": round(risk_score, 2),
+        "volatility": round(volatility * 100, 2),
+        "sector_breakdown": sectors,
+        "regional_breakdown": regions,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+    # Generate summary
+    risk_level = "Low" if risk_score < 3 else "Medium" if risk_score < 7 else "High"
+    summary = f"{risk_level} risk portfolio with {sector_count} sectors and {region_count} regions. Volatility: {volatility*100:.1f}%"
+
+    return analysis, summary
+
+def _risk_symbols(request: AnalysisRequest) -> List[str]:
+    """Holdings with a quote and return history, i.e. those the risk engine covers"""
+    return [
+        symbol for symbol, info in (request.market_data or {}).items()
+        if isinstance(info, dict) and "current_price" in info and (request.returns or {}).get(symbol)
+    ]
+
+def _risk_from_returns(request: AnalysisRequest, data: Dict) -> Optional[Dict]:
+    """Run the vectorized risk engine over holdings that have return history
+
+    Exposures are the caller's weights when given (validated to cover every
+    holding by analyze_market), otherwise current prices; the two are never
+    mixed.
+    """
+    symbols = _risk_symbols(request)
+    if not symbols:
+        return None
+
+    returns = build_return_matrix(request.returns, symbols)
+    if request.weights:
+        exposures = np.array([request.weights[symbol] for symbol in symbols], dtype=np.float64)
+    else:
+        exposures = np.array([data[symbol]["current_price"] for symbol in symbols], dtype=np.float64)
+    benchmark = np.array(request.benchmark_returns, dtype=np.float64) if request.benchmark_returns else None
+    if benchmark is not None and len(benchmark) < returns.shape[0]:
+        returns = returns[-len(benchmark):]
+    if returns.shape[0] < 2:
+        return None
+
+    return summarize_risk(symbols, portfolio_risk(exposures, returns, benchmark))
+
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_market(request: AnalysisRequest):
     """Analyze portfolio risk and diversification metrics"""
+    if request.weights:
+        missing = [symbol for symbol in _risk_symbols(request) if symbol not in request.weights]
+        if missing:
+            # Defaulting the rest to prices would mix units with the caller's weights
+            raise HTTPException(status_code=400, detail=f"weights missing for holdings with returns: {missing}")
+
     try:
         data = request.market_data
         if not data:
@@ -52,33 +160,14 @@ async def analyze_market(request: AnalysisRequest):
                 summary="No valid market data available for analysis"
             )
 
-        # Calculate metrics
-        total_exposure = sum(prices)
-        sector_count = len(sectors)
-        region_count = len(regions)
-        
-        # Risk metrics
+        # risk_score and volatility keep their cross-sectional price dispersion
+        # scale; the covariance-based breakdown is reported under "risk"
         volatility = np.std(prices) / np.mean(prices) if len(prices) > 1 else 0
-        risk_score = min(volatility * 10, 10)  # Scale to 0-10
-        
-        # Diversification ratios
-        sector_div = min(sector_count / 10, 1.0)  # Ideal: 10+ sectors
-        regional_div = min(region_count / 5, 1.0)  # Ideal: 5+ regions
-
-        analysis = {
-            "total_exposure": round(total_exposure, 2),
-            "sector_diversification": round(sector_div, 2),
-            "regional_diversification": round(regional_div, 2),
-            "risk_score": round(risk_score, 2),
-            "volatility": round(volatility * 100, 2),
-            "sector_breakdown": sectors,
-            "regional_breakdown": regions,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-
-        # Generate summary
-        risk_level = "Low" if risk_score < 3 else "Medium" if risk_score < 7 else "High"
-        summary = f"{risk_level} risk portfolio with {sector_count} sectors and {region_count} regions. Volatility: {volatility*100:.1f}%"
+        risk = _risk_from_returns(request, data)
+
+        analysis, summary = _build_analysis(sum(prices), sectors, regions, volatility)
+        if risk:
+            analysis["risk"] = risk
 
         return AnalysisResponse(analysis=analysis, summary=summary)
 
@@ -86,6 +175,114 @@ async def analyze_market(request: AnalysisRequest):
         print(f"❌ Analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _with_amounts(stats: Dict[str, float], portfolio_value: float) -> Dict:
+    """Report VaR/CVaR both as a return and in currency"""
+    return {
+        "var": round(stats["var"], 6),
+        "cvar": round(stats["cvar"], 6),
+        "var_amount": round(stats["var"] * portfolio_value, 2),
+        "cvar_amount": round(stats["cvar"] * portfolio_value, 2)
+    }
+
+@app.post("/risk/var", response_model=VaRResponse)
+async def value_at_risk(request: VaRRequest):
+    """Historical, parametric and Monte Carlo VaR/CVaR for a portfolio"""
+    symbols = [symbol for symbol in request.weights if request.returns.get(symbol)]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No holdings with both weights and returns")
+    if not 0.5 <= request.confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be in [0.5, 1)")
+    if not 1 <= request.paths <= settings.MONTE_CARLO_MAX_PATHS:
+        raise HTTPException(status_code=400, detail=f"paths must be between 1 and {settings.MONTE_CARLO_MAX_PATHS}")
+    if request.horizon_days < 1:
+        raise HTTPException(status_code=400, detail="horizon_days must be at least 1")
+
+    try:
+        returns = build_return_matrix(request.returns, symbols)
+        weights = np.array([request.weights[symbol] for symbol in symbols], dtype=np.float64)
+        portfolio_value = float(weights.sum())
+        portfolio_returns = portfolio_risk(weights, returns)["portfolio_returns"]
+
+        start = perf_counter()
+        monte_carlo = await monte_carlo_var(
+            returns, weights, request.confidence, request.paths,
+            horizon_days=request.horizon_days,
+            distribution=request.distribution,
+            degrees_of_freedom=request.degrees_of_freedom,
+            seed=request.seed,
+            parallel_threshold=settings.MONTE_CARLO_PARALLEL_THRESHOLD,
+            workers=settings.MONTE_CARLO_WORKERS
+        )
+        elapsed = perf_counter() - start
+
+        return VaRResponse(
+            portfolio_value=round(portfolio_value, 2),
+            confidence=request.confidence,
+            horizon_days=request.horizon_days,
+            historical=_with_amounts(historical_var(portfolio_returns, request.confidence, request.horizon_days), portfolio_value),
+            parametric=_with_amounts(parametric_var(portfolio_returns, request.confidence, request.horizon_days), portfolio_value),
+            monte_carlo={
+                **_with_amounts(monte_carlo, portfolio_value),
+                "paths": request.paths,
+                "distribution": request.distribution,
+                "elapsed": round(elapsed, 3)
+            },
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ VaR error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ---------------- Incremental sessions -------------------
+
+analysis_sessions = AnalysisSessionStore(max_sessions=settings.ANALYSIS_MAX_SESSIONS)
+
+def _session_snapshot(session_id: str) -> SessionSnapshot:
+    session = analysis_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis session '{session_id}'")
+
+    analysis, summary = _build_analysis(
+        session.total_exposure, dict(session.sectors), dict(session.regions), session.volatility()
+    )
+    analysis["betas"] = session.betas()
+    return SessionSnapshot(
+        session_id=session_id,
+        analysis=analysis,
+        summary=summary,
+        holdings=len(session.holdings),
+        updates=session.updates
+    )
+
+@app.post("/sessions", response_model=SessionSnapshot)
+async def open_session(request: SessionOpenRequest):
+    """Open a stateful analysis session seeded with an initial set of quotes"""
+    session_id = analysis_sessions.create()
+    analysis_sessions.get(session_id).apply(request.market_data)
+    return _session_snapshot(session_id)
+
+@app.post("/sessions/{session_id}/quotes", response_model=SessionSnapshot)
+async def push_quotes(session_id: str, request: QuoteUpdateRequest):
+    """Apply quote deltas; only the changed holdings are recomputed"""
+    session = analysis_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown analysis session '{session_id}'")
+    session.apply(request.quotes)
+    return _session_snapshot(session_id)
+
+@app.get("/sessions/{session_id}", response_model=SessionSnapshot)
+async def get_session(session_id: str):
+    return _session_snapshot(session_id)
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    if not analysis_sessions.close(session_id):
+        raise HTTPException(status_code=404, detail=f"Unknown analysis session '{session_id}'")
+    return {"status": "closed", "session_id": session_id}
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "analysis_agent"}
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from typing import Dict, Optional
+import math
+import uuid
+
+class RunningStats:
+    """Welford mean/variance that also supports removing a sample"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x: float):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        old_mean = self.mean
+        self.mean = (self.count * old_mean - x) / (self.count - 1)
+        self.m2 = max(self.m2 - (x - old_mean) * (x - self.mean), 0.0)
+        self.count -= 1
+
+    def variance(self, ddof: int = 0) -> float:
+        return self.m2 / (self.count - ddof) if self.count > ddof else 0.0
+
+class AnalysisSession:
+    """Running portfolio aggregates updated in O(changed holdings)
+
+    Keeps sector/region sums, cross-sectional price statistics (the same
+    volatility measure /analyze reports) and, per update tick, running sums
+    of the portfolio return. Each holding's covariance with the portfolio is
+    kept as raw co-moments that only change on ticks where that holding
+    moved, so untouched holdings cost nothing; the portfolio sums as of the
+    holding's first tick mark the window its beta is measured over.
+    """
+
+    def __init__(self):
+        self.holdings: Dict[str, Dict] = {}
+        self.sectors: Dict[str, float] = {}
+        self.regions: Dict[str, float] = {}
+        self.total_exposure = 0.0
+        self.prices = RunningStats()
+        # Portfolio return ticks recorded so far, with their sum and sum of squares
+        self.ticks = 0
+        self.portfolio_sum = 0.0
+        self.portfolio_sq = 0.0
+        # Per holding: the portfolio totals when it was added, then the sum
+        # of its returns and of return x portfolio return since
+        self.moments: Dict[str, Dict[str, float]] = {}
+        self.updates = 0
+
+    def _remove(self, symbol: str):
+        holding = self.holdings.pop(symbol)
+        price = holding["current_price"]
+        self.total_exposure -= price
+        self.prices.remove(price)
+        for bucket, key in ((self.sectors, holding["sector"]), (self.regions, holding["region"])):
+            bucket[key] -= price
+            if abs(bucket[key]) < 1e-9:
+                del bucket[key]
+
+    def _add(self, symbol: str, price: float, sector: str, region: str):
+        self.holdings[symbol] = {"current_price": price, "sector": sector, "region": region}
+        self.total_exposure += price
+        self.prices.add(price)
+        self.sectors[sector] = self.sectors.get(sector, 0) + price
+        self.regions[region] = self.regions.get(region, 0) + price
+
+    def apply(self, quotes: Dict[str, Dict]):
+        """Apply one tick of quote updates; cost scales with len(quotes)
+
+        A quote of None removes the holding.
+        """
+        exposure_before = self.total_exposure
+        exposure_change = 0.0
+        symbol_returns = {}
+        added = []
+
+        for symbol, info in quotes.items():
+            if info is None:
+                self.remove_symbol(symbol)
+                continue
+            if not isinstance(info, dict) or "current_price" not in info:
+                continue
+            previous = self.holdings.get(symbol)
+            price = float(info["current_price"])
+            sector = info.get("sector", previous["sector"] if previous else "Unknown")
+            region = info.get("region", previous["region"] if previous else "US")
+            if previous:
+                if previous["current_price"]:
+                    symbol_returns[symbol] = price / previous["current_price"] - 1
+                    exposure_change += price - previous["current_price"]
+                self._remove(symbol)
+            else:
+                added.append(symbol)
+            self._add(symbol, price, sector, region)
+
+        if symbol_returns and exposure_before > 0:
+            # Portfolio return over holdings that existed before this tick
+            portfolio_return = exposure_change / exposure_before
+            self.ticks += 1
+            self.portfolio_sum += portfolio_return
+            self.portfolio_sq += portfolio_return * portfolio_return
+            for symbol, r in symbol_returns.items():
+                moments = self.moments[symbol]
+                moments["sum"] += r
+                moments["cross"] += r * portfolio_return
+            self.updates += 1
+
+        # New holdings start contributing from the next tick
+        for symbol in added:
+            self.moments[symbol] = {
+                "ticks": self.ticks, "portfolio_sum": self.portfolio_sum, "portfolio_sq": self.portfolio_sq,
+                "sum": 0.0, "cross": 0.0
+            }
+
+    def remove_symbol(self, symbol: str):
+        if symbol in self.holdings:
+            self._remove(symbol)
+            self.moments.pop(symbol, None)
+
+    def betas(self) -> Dict[str, float]:
+        """Beta of each holding's tick returns to the portfolio's, over the ticks it was held"""
+        betas = {}
+        for symbol, m in self.moments.items():
+            ticks = self.ticks - m["ticks"]
+            if ticks < 2:
+                continue
+            portfolio_sum = self.portfolio_sum - m["portfolio_sum"]
+            mean_p = portfolio_sum / ticks
+            variance = (self.portfolio_sq - m["portfolio_sq"] - portfolio_sum * mean_p) / (ticks - 1)
+            if variance <= 0:
+                continue
+            betas[symbol] = round((m["cross"] - m["sum"] * mean_p) / (ticks - 1) / variance, 4)
+        return betas
+
+    def volatility(self) -> float:
+        """Cross-sectional coefficient of variation, as computed by /analyze"""
+        if self.prices.count < 2 or self.prices.mean == 0:
+            return 0.0
+        return math.sqrt(self.prices.variance()) / self.prices.mean
+
+class AnalysisSessionStore:
+    """Open sessions, oldest evicted first once max_sessions is reached"""
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, AnalysisSession]" = OrderedDict()
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = AnalysisSession()
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+        return session
+
+    def close(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id, None) is not None
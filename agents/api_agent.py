@@ -1,25 +1,77 @@
 
 from config.settings import settings
+from agents.quote_cache import QuoteCache
+from agents.rate_limiter import ProviderRateLimiter, RateLimitExceeded
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Tuple
 import aiohttp
 import asyncio
-from datetime import datetime
+import time
+from datetime import date, datetime, timedelta
+
+def polygon_session_candidates(today: date, lookback_days: int, last_session: Optional[str],
+                               closed: set) -> List[str]:
+    """Dates to try for Polygon grouped daily, newest first
+
+    Weekends and dates already seen without results are skipped, and no
+    date older than the last session that returned results is tried: that
+    session is the final candidate.
+    """
+    candidates = []
+    for days_back in range(1, lookback_days + 1):
+        day = today - timedelta(days=days_back)
+        iso = day.isoformat()
+        if last_session is not None and iso <= last_session:
+            break
+        if day.weekday() < 5 and iso not in closed:
+            candidates.append(iso)
+    if last_session is not None:
+        candidates.append(last_session)
+    return candidates
 
 class MarketDataRequest(BaseModel):
     symbols: List[str]
+    deadline: Optional[float] = None  # seconds; defaults to settings.MARKET_DATA_DEADLINE
 
 app = FastAPI(title="API Agent", description="Fetches live market data from multiple sources")
 
 class MarketDataService:
-    def __init__(self):
+    # Tickers per Alpha Vantage REALTIME_BULK_QUOTES call
+    ALPHA_VANTAGE_BATCH_SIZE = 100
+    # Calendar days to walk back looking for the last trading session
+    POLYGON_GROUPED_LOOKBACK_DAYS = 5
+
+    def __init__(self, max_concurrency: int = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
         self.polygon_key = settings.POLYGON_API_KEY
         self.finnhub_key = settings.FINNHUB_API_KEY
         self.alpha_vantage_key = settings.ALPHA_VANTAGE_API_KEY
+        self.max_concurrency = max_concurrency or settings.MARKET_DATA_CONCURRENCY
+        self.polygon_grouped_min_symbols = settings.POLYGON_GROUPED_MIN_SYMBOLS
+        # Last date grouped daily returned results for, and weekdays it had none (holidays)
+        self.polygon_session: Optional[str] = None
+        self.polygon_closed_dates = set()
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Rate limits, cache TTLs and upstream deadlines all run on this clock
+        self.clock = clock
+        # Single-symbol fallback chain, in order of preference
+        self.providers = {
+            "polygon": self.get_polygon_data,
+            "finnhub": self.get_finnhub_data,
+            "alpha_vantage": self.get_alpha_vantage_data
+        }
+        self.limiter = ProviderRateLimiter(settings.PROVIDER_RATE_LIMITS, clock=clock, sleep=sleep)
+        self.cache = QuoteCache(
+            max_entries=settings.QUOTE_CACHE_MAX_ENTRIES,
+            ttls=settings.QUOTE_CACHE_TTLS,
+            default_ttl=settings.QUOTE_CACHE_DEFAULT_TTL,
+            clock=clock
+        )
 
-    async def get_polygon_data(self, symbol: str) -> Dict:
+    async def get_polygon_data(self, symbol: str, deadline: float = None) -> Dict:
         """Get real-time data from Polygon.io"""
         if not self.polygon_key:
             return {"error": "Polygon API key not configured"}
@@ -27,6 +79,7 @@ class MarketDataService:
         url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/prev"
         params = {"apikey": self.polygon_key}
         
+        await self.limiter.acquire("polygon", deadline)
         async with aiohttp.ClientSession() as session:
             async with session.get(url, params=params) as response:
                 if response.status == 200:
@@ -43,7 +96,7 @@ class MarketDataService:
                         }
                 return {"error": f"Failed to fetch from Polygon: {response.status}"}
 
-    async def get_finnhub_data(self, symbol: str) -> Dict:
+    async def get_finnhub_data(self, symbol: str, deadline: float = None) -> Dict:
         """Get real-time data from Finnhub"""
         if not self.finnhub_key:
             return {"error": "Finnhub API key not configured"}
@@ -51,6 +104,7 @@ class MarketDataService:
         url = "https://finnhub.io/api/v1/quote"
         params = {"symbol": symbol, "token": self.finnhub_key}
         
+        await self.limiter.acquire("finnhub", deadline)
         async with aiohttp.ClientSession() as session:
             async with session.get(url, params=params) as response:
                 if response.status == 200:
@@ -66,7 +120,7 @@ class MarketDataService:
                         }
                 return {"error": f"Failed to fetch from Finnhub: {response.status}"}
 
-    async def get_alpha_vantage_data(self, symbol: str) -> Dict:
+    async def get_alpha_vantage_data(self, symbol: str, deadline: float = None) -> Dict:
         """Get data from Alpha Vantage"""
         if not self.alpha_vantage_key:
             return {"error": "Alpha Vantage API key not configured"}
@@ -78,6 +132,7 @@ class MarketDataService:
             "apikey": self.alpha_vantage_key
         }
         
+        await self.limiter.acquire("alpha_vantage", deadline)
         async with aiohttp.ClientSession() as session:
             async with session.get(url, params=params) as response:
                 if response.status == 200:
@@ -94,6 +149,195 @@ class MarketDataService:
                         }
                 return {"error": f"Failed to fetch from Alpha Vantage: {response.status}"}
 
+    async def get_polygon_grouped_data(self, symbols: List[str], deadline: float = None) -> Dict[str, Dict]:
+        """Get the last session's aggregates for many tickers in one Polygon call
+
+        Grouped daily is keyed by date. Weekends are skipped without a call
+        and the last date that returned results is remembered, so a request
+        usually costs one Polygon token instead of one per day walked back.
+        """
+        if not self.polygon_key:
+            return {}
+
+        wanted = set(symbols)
+        candidates = polygon_session_candidates(
+            datetime.utcnow().date(), self.POLYGON_GROUPED_LOOKBACK_DAYS, self.polygon_session,
+            self.polygon_closed_dates
+        )
+        async with aiohttp.ClientSession() as session:
+            for day in candidates:
+                results = await self._polygon_grouped_day(session, day, deadline)
+                if results is None:
+                    return {}
+                if not results:
+                    if day != self.polygon_session:
+                        self.polygon_closed_dates.add(day)
+                    continue
+                if self.polygon_session is None or day > self.polygon_session:
+                    self.polygon_session = day
+                return {
+                    result["T"]: {
+                        "current_price": result["c"],
+                        "open": result["o"],
+                        "high": result["h"],
+                        "low": result["l"],
+                        "volume": result["v"],
+                        "source": "polygon"
+                    }
+                    for result in results if result.get("T") in wanted
+                }
+        return {}
+
+    async def _polygon_grouped_day(self, session: aiohttp.ClientSession, day: str,
+                                   deadline: float = None) -> Optional[List[Dict]]:
+        """Grouped daily results for one date; None when the request failed"""
+        url = f"https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{day}"
+        params = {"adjusted": "true", "apikey": self.polygon_key}
+        await self.limiter.acquire("polygon", deadline)
+        async with session.get(url, params=params) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+        return data.get("results") or []
+
+    async def get_alpha_vantage_batch_data(self, symbols: List[str], deadline: float = None) -> Dict[str, Dict]:
+        """Get quotes for many tickers via Alpha Vantage bulk quotes, one call per chunk"""
+        if not self.alpha_vantage_key or not symbols:
+            return {}
+
+        async def fetch_chunk(session: aiohttp.ClientSession, chunk: List[str]) -> Dict[str, Dict]:
+            params = {
+                "function": "REALTIME_BULK_QUOTES",
+                "symbol": ",".join(chunk),
+                "apikey": self.alpha_vantage_key
+            }
+            try:
+                await self.limiter.acquire("alpha_vantage", deadline)
+            except RateLimitExceeded:
+                return {}
+            async with session.get("https://www.alphavantage.co/query", params=params) as response:
+                if response.status != 200:
+                    return {}
+                data = await response.json()
+
+            # Plans without bulk access get an informational message and no data
+            quotes = {}
+            for quote in data.get("data", []):
+                if quote.get("symbol") and quote.get("close"):
+                    quotes[quote["symbol"]] = {
+                        "current_price": float(quote["close"]),
+                        "open": float(quote.get("open", 0)),
+                        "high": float(quote.get("high", 0)),
+                        "low": float(quote.get("low", 0)),
+                        "volume": int(float(quote.get("volume", 0))),
+                        "prev_close": float(quote.get("previous_close") or quote["close"]),
+                        "source": "alpha_vantage"
+                    }
+            return quotes
+
+        size = self.ALPHA_VANTAGE_BATCH_SIZE
+        chunks = [symbols[i:i + size] for i in range(0, len(symbols), size)]
+        async with aiohttp.ClientSession() as session:
+            chunk_results = await asyncio.gather(*(fetch_chunk(session, chunk) for chunk in chunks))
+
+        results = {}
+        for quotes in chunk_results:
+            results.update(quotes)
+        return results
+
+    async def _fetch_symbol_data(self, symbol: str, deadline: float = None) -> Dict:
+        """Fetch one symbol upstream, falling back through providers
+
+        Providers with rate-limit budget left are tried first, so requests
+        queue behind an exhausted free tier only when every provider is out.
+        A provider that cannot grant a token before the deadline is skipped.
+        """
+        data = {"error": "No market data providers configured"}
+        for name in self.limiter.rank(list(self.providers)):
+            try:
+                data = await self.providers[name](symbol, deadline)
+            except Exception as e:
+                data = {"error": f"{name} failed: {e}"}
+            if "error" not in data:
+                break
+
+        return self._enrich(symbol, data)
+
+    async def _fetch_batch(self, symbols: List[str], deadline: float = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """Fetch many symbols with provider batch endpoints first, yielding each as it arrives
+
+        Polygon grouped daily covers every ticker in one call, but downloads
+        the whole market, so it is used only for at least
+        polygon_grouped_min_symbols misses. Alpha Vantage bulk quotes take
+        100 per call; only symbols neither returns go through the
+        single-symbol fallback chain, and each of those is yielded as soon as
+        its own chain finishes.
+        """
+        found = set()
+        for batch_provider in (self.get_polygon_grouped_data, self.get_alpha_vantage_batch_data):
+            missing = [symbol for symbol in symbols if symbol not in found]
+            if not missing:
+                break
+            if batch_provider == self.get_polygon_grouped_data and len(missing) < self.polygon_grouped_min_symbols:
+                continue
+            try:
+                quotes = await batch_provider(missing, deadline)
+            except Exception as e:
+                print(f"⚠️ {batch_provider.__name__} failed: {e}")
+                continue
+            for symbol in missing:
+                if symbol in quotes:
+                    found.add(symbol)
+                    yield symbol, self._enrich(symbol, quotes[symbol])
+
+        async def fetch_single(symbol: str) -> Tuple[str, Dict]:
+            async with self.semaphore:
+                return symbol, await self._fetch_symbol_data(symbol, deadline)
+
+        missing = [symbol for symbol in symbols if symbol not in found]
+        for single in asyncio.as_completed([fetch_single(symbol) for symbol in missing]):
+            yield await single
+
+    def _enrich(self, symbol: str, data: Dict) -> Dict:
+        """Add timestamp and symbol info"""
+        if "error" not in data:
+            data.update({
+                "symbol": symbol,
+                "timestamp": datetime.utcnow().isoformat(),
+                "change": round(data.get("current_price", 0) - data.get("prev_close", data.get("current_price", 0)), 2),
+                "change_percent": round(((data.get("current_price", 0) - data.get("prev_close", data.get("current_price", 0))) / data.get("prev_close", 1)) * 100, 2)
+            })
+        return data
+
+    async def get_many(self, symbols: List[str], deadline: float = None) -> Dict[str, Dict]:
+        """Fetch symbols through the cache, batching all misses upstream
+
+        Symbols still pending when the deadline expires are reported with an
+        error, so callers always get partial results. The upstream fetch keeps
+        running and still fills the cache for the next request, but gives up
+        on providers whose rate limit would hold it past the deadline.
+        """
+        deadline = settings.MARKET_DATA_DEADLINE if deadline is None else deadline
+        symbols = list(dict.fromkeys(symbol.upper().strip() for symbol in symbols))
+        if not symbols:
+            return {}
+
+        expires_at = self.clock() + deadline
+        futures = self.cache.get_or_fetch_many(symbols, lambda missing: self._fetch_batch(missing, expires_at))
+        _, pending = await asyncio.wait(futures.values(), timeout=deadline)
+        for future in pending:
+            future.cancel()
+
+        results = {}
+        for symbol, future in futures.items():
+            if future in pending:
+                results[symbol] = {"error": f"Timed out after {deadline}s"}
+            elif future.exception():
+                results[symbol] = {"error": str(future.exception())}
+            else:
+                results[symbol] = future.result()
+        return results
+
 market_service = MarketDataService()
 
 @app.post("/market-data", response_model=Dict[str, Dict])
@@ -101,30 +345,7 @@ async def get_market_data(request: MarketDataRequest):
     """Fetch live market data with fallback sources"""
     try:
         print(f"📥 Fetching data for symbols: {request.symbols}")
-        results = {}
-        
-        for symbol in request.symbols:
-            symbol = symbol.upper().strip()
-            
-            # Try multiple sources with fallback
-            data = await market_service.get_polygon_data(symbol)
-            
-            if "error" in data:
-                data = await market_service.get_finnhub_data(symbol)
-                
-            if "error" in data:
-                data = await market_service.get_alpha_vantage_data(symbol)
-            
-            # Add timestamp and symbol info
-            if "error" not in data:
-                data.update({
-                    "symbol": symbol,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "change": round(data.get("current_price", 0) - data.get("prev_close", data.get("current_price", 0)), 2),
-                    "change_percent": round(((data.get("current_price", 0) - data.get("prev_close", data.get("current_price", 0))) / data.get("prev_close", 1)) * 100, 2)
-                })
-            
-            results[symbol] = data
+        results = await market_service.get_many(request.symbols, request.deadline)
 
         print(f"✅ Successfully fetched data for {len([r for r in results.values() if 'error' not in r])} symbols")
         return results
@@ -135,4 +356,9 @@ async def get_market_data(request: MarketDataRequest):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "api_agent"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "service": "api_agent",
+        "quote_cache": market_service.cache.stats(),
+        "rate_limits": market_service.limiter.stats()
+    }
\ No newline at end of file
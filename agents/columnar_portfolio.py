@@ -0,0 +1,182 @@
+"""Columnar, memory-mapped on-disk portfolio format.
+
+Numeric and boolean fields are stored as NumPy arrays of their own dtype
+and string fields as int32 codes into a per-field dictionary. Integer and
+boolean columns with missing values keep their dtype and get a separate
+null mask; float columns use NaN. Arrays are opened with mmap_mode="r", so a
+multi-hundred-MB book opens without parsing and worker processes share the
+same page-cache pages.
+
+Layout of a portfolio directory:
+
+    meta.json                    version, row count, field kinds and dictionaries
+    <field>.<version>.npy        one array per field
+    <field>.null.<version>.npy   True where the value is missing, if any are
+
+A writer saves a new version's arrays first and then atomically replaces
+meta.json, so readers always see one complete version. The previous
+version's arrays are kept until the next write, so a reader that has read
+the old meta.json but not yet mapped its arrays can still open them; older
+versions are deleted.
+
+Convert a JSON portfolio with:
+
+    python -m agents.columnar_portfolio data/portfolio.json data/portfolio.columnar
+"""
+from numbers import Number
+from typing import Dict, Iterator, List
+import json
+import os
+import sys
+import numpy as np
+
+META_FILE = "meta.json"
+# Always dictionary-encoded so they can be searched
+STRING_FIELDS = ("symbol", "name", "sector", "region")
+
+def _is_numeric(value) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+def _is_bool(value) -> bool:
+    return isinstance(value, (bool, np.bool_))
+
+def _array_version(filename: str):
+    """Version number of a <field>[.null].<version>.npy file, or None"""
+    if not filename.endswith(".npy"):
+        return None
+    version = filename[:-len(".npy")].rsplit(".", 1)[-1]
+    return int(version) if version.isdigit() else None
+
+def write_columnar(entries: List[Dict], directory: str) -> int:
+    """Write holdings to directory as a new columnar version; returns the version"""
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    previous = None
+    if os.path.exists(meta_path):
+        with open(meta_path, "r") as f:
+            previous = json.load(f)
+    version = previous["version"] + 1 if previous else 1
+
+    fields = list(dict.fromkeys(field for entry in entries for field in entry))
+    numeric, categorical, nullable = {}, {}, []
+    for field in fields:
+        values = [entry.get(field) for entry in entries]
+        present = [value for value in values if value is not None]
+        missing = len(present) < len(values)
+        if field not in STRING_FIELDS and present and (
+                all(_is_numeric(value) for value in present) or all(_is_bool(value) for value in present)):
+            if all(_is_bool(value) for value in present):
+                dtype, fill = np.bool_, False
+            elif all(isinstance(value, int) for value in present):
+                dtype, fill = np.int64, 0
+            else:
+                dtype, fill = np.float64, np.nan
+            column = np.array([fill if value is None else value for value in values], dtype=dtype)
+            numeric[field] = str(column.dtype)
+            if missing and dtype is not np.float64:
+                nullable.append(field)
+                mask = np.array([value is None for value in values], dtype=np.bool_)
+                np.save(os.path.join(directory, f"{field}.null.{version}.npy"), mask)
+        else:
+            dictionary: Dict[str, int] = {}
+            column = np.array([
+                -1 if value is None else dictionary.setdefault(str(value), len(dictionary))
+                for value in values
+            ], dtype=np.int32)
+            categorical[field] = list(dictionary)
+        np.save(os.path.join(directory, f"{field}.{version}.npy"), column)
+
+    meta = {
+        "version": version,
+        "count": len(entries),
+        "fields": fields,
+        "numeric": numeric,
+        "categorical": categorical,
+        "nullable": nullable
+    }
+    tmp_path = f"{meta_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+    # Keep the previous version for readers that have not mapped it yet; mapped
+    # arrays of older versions stay alive after unlink
+    for filename in os.listdir(directory):
+        array_version = _array_version(filename)
+        if array_version is not None and array_version < version - 1:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+    return version
+
+class ColumnarPortfolio:
+    """Read-only, memory-mapped holdings that behave like a list of dicts"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), "r") as f:
+            meta = json.load(f)
+        self.version = meta["version"]
+        self.count = meta["count"]
+        self.fields = meta["fields"]
+        self.categorical: Dict[str, List[str]] = meta["categorical"]
+        self.columns: Dict[str, np.ndarray] = {
+            field: np.load(os.path.join(directory, f"{field}.{self.version}.npy"), mmap_mode="r")
+            for field in self.fields
+        }
+        self.nulls: Dict[str, np.ndarray] = {
+            field: np.load(os.path.join(directory, f"{field}.null.{self.version}.npy"), mmap_mode="r")
+            for field in meta.get("nullable", [])
+        }
+
+    @staticmethod
+    def meta_mtime(directory: str):
+        return os.stat(os.path.join(directory, META_FILE)).st_mtime_ns
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, position: int) -> Dict:
+        """Materialise one holding as a dict"""
+        row = {}
+        for field in self.fields:
+            value = self.columns[field][position]
+            if field in self.categorical:
+                if value >= 0:
+                    row[field] = self.categorical[field][value]
+            elif field in self.nulls:
+                if not self.nulls[field][position]:
+                    row[field] = value.item()
+            elif value.dtype.kind != "f" or not np.isnan(value):
+                row[field] = value.item()
+        return row
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(self.count):
+            yield self[position]
+
+    def total(self, field: str) -> float:
+        """Sum of a numeric column; missing fields count as zero"""
+        column = self.columns.get(field)
+        if column is None or field in self.categorical:
+            return 0
+        return float(np.nansum(column))
+
+    def dot(self, left: str, right: str) -> float:
+        """Sum of the row-wise product of two numeric columns"""
+        if any(field not in self.columns or field in self.categorical for field in (left, right)):
+            return 0
+        return float(np.nansum(np.multiply(self.columns[left], self.columns[right], dtype=np.float64)))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m agents.columnar_portfolio <portfolio.json> <output_dir>")
+        sys.exit(1)
+    with open(sys.argv[1], "r") as f:
+        holdings = json.load(f)
+    if not isinstance(holdings, list):
+        print("❌ Portfolio file must contain a list of holdings")
+        sys.exit(1)
+    written = write_columnar(holdings, sys.argv[2])
+    print(f"✅ Wrote {len(holdings)} holdings to {sys.argv[2]} (version {written})")
@@ -0,0 +1,146 @@
+"""Token-budgeted prompt context for the language agent.
+
+Quotes and document snippets are ranked by relevance to the query and
+packed greedily into a token budget, instead of concatenating everything.
+Tokens are counted locally with tiktoken when it is installed, otherwise
+with a close approximation of BPE token counts.
+"""
+from typing import Callable, Dict, List, Tuple
+import math
+import re
+from data_ingestion.bm25_index import BM25Index, tokenize
+
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def _approximate_tokens(text: str) -> int:
+    # BPE vocabularies average about 4 characters per token for English words
+    return sum(math.ceil(len(piece) / 4) for piece in PIECE_PATTERN.findall(text))
+
+def token_counter(model: str = "gpt-3.5-turbo") -> Callable[[str], int]:
+    """Token count function for the model's tokenizer, or an approximation without tiktoken"""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return _approximate_tokens
+
+def quote_line(symbol: str, data: Dict) -> str:
+    change = data.get("change", 0)
+    change_pct = data.get("change_percent", 0)
+    return f"{symbol}: ${data['current_price']:.2f} ({change:+.2f}, {change_pct:+.1f}%)"
+
+def analysis_line(analysis_results: Dict) -> str:
+    analysis = analysis_results.get("analysis", {})
+    return f"Risk Score: {analysis.get('risk_score', 'N/A')}, Volatility: {analysis.get('volatility', 'N/A')}%, Diversification: {analysis.get('sector_diversification', 'N/A')}"
+
+class ContextBuilder:
+    """Packs the most relevant quotes and documents into token_budget tokens
+
+    The analysis summary goes first. Quotes for symbols named in the query
+    follow, then the remaining budget is shared between documents ranked by
+    BM25 against the query and quotes ranked by the size of their move.
+    Documents are guaranteed document_share of it when they need it.
+    """
+
+    def __init__(self, token_budget: int, document_share: float = 0.4, snippet_chars: int = 150,
+                 count_tokens: Callable[[str], int] = None):
+        self.token_budget = token_budget
+        self.document_share = document_share
+        self.snippet_chars = snippet_chars
+        self.count_tokens = count_tokens or token_counter()
+
+    def rank_quotes(self, query: str, market_data: Dict) -> List[Tuple[str, Dict]]:
+        """Quotes for symbols named in the query first, then by absolute percent change"""
+        mentioned = {token.upper() for token in tokenize(query)}
+        quotes = [
+            (symbol, data) for symbol, data in (market_data or {}).items()
+            if isinstance(data, dict) and "current_price" in data
+        ]
+        return sorted(quotes, key=lambda item: (item[0].upper() not in mentioned,
+                                                -abs(item[1].get("change_percent") or 0)))
+
+    def rank_documents(self, query: str, documents: List[Dict]) -> List[str]:
+        """Snippets ordered by BM25 relevance, ties kept in retrieval order"""
+        contents = [doc.get("content", "") for doc in documents or [] if isinstance(doc, dict)]
+        contents = [content for content in contents if content]
+        if not contents:
+            return []
+        index = BM25Index()
+        index.add(contents)
+        _, ids = index.search(query, len(contents))
+        matched = set(ids.tolist())
+        ranked = ids.tolist() + [i for i in range(len(contents)) if i not in matched]
+        return [self._snippet(contents[i]) for i in ranked]
+
+    def _snippet(self, content: str) -> str:
+        if len(content) <= self.snippet_chars:
+            return content
+        return content[:self.snippet_chars] + "..."
+
+    def build(self, query: str, market_data: Dict, analysis_results: Dict, documents: List[Dict]) -> Dict:
+        """Context sections (market, analysis, documents) plus packing stats"""
+        quotes = self.rank_quotes(query, market_data)
+        mentioned = {token.upper() for token in tokenize(query)}
+        pinned = sum(1 for symbol, _ in quotes if symbol.upper() in mentioned)
+        lines = [quote_line(symbol, data) for symbol, data in quotes]
+        snippets = self.rank_documents(query, documents)
+        analysis = analysis_line(analysis_results) if analysis_results else ""
+
+        # Everything that was available: every quote and full document
+        full_documents = [doc.get("content", "") for doc in documents or [] if isinstance(doc, dict)]
+        original_tokens = (
+            self.count_tokens("; ".join(lines)) + self.count_tokens(analysis)
+            + self.count_tokens("; ".join(content for content in full_documents if content))
+        )
+
+        remaining = self.token_budget
+        if analysis:
+            remaining -= self.count_tokens(analysis)
+
+        market, docs = [], []
+        # Separators ("; ") cost about a token per item
+        costs = [self.count_tokens(line) + 1 for line in lines]
+        doc_costs = [self.count_tokens(snippet) + 1 for snippet in snippets]
+
+        if sum(costs) + min(int(remaining * self.document_share), sum(doc_costs)) > remaining:
+            # Some quotes will give way to documents: room for the "(+N more symbols omitted)" note
+            remaining -= self.count_tokens(f"(+{len(lines)} more symbols omitted)") + 1
+
+        position = 0
+        while position < pinned and costs[position] <= remaining:
+            market.append(lines[position])
+            remaining -= costs[position]
+            position += 1
+
+        reserved = min(int(remaining * self.document_share), sum(doc_costs))
+        quote_budget = remaining - reserved
+        for line, cost in zip(lines[position:], costs[position:]):
+            if cost > quote_budget:
+                break
+            market.append(line)
+            quote_budget -= cost
+        doc_budget = reserved + quote_budget
+        for snippet, cost in zip(snippets, doc_costs):
+            if cost > doc_budget:
+                break
+            docs.append(snippet)
+            doc_budget -= cost
+
+        omitted = len(lines) - len(market)
+        if omitted:
+            market.append(f"(+{omitted} more symbols omitted)")
+        context = {"market": "; ".join(market), "analysis": analysis, "documents": "; ".join(docs)}
+        context_tokens = sum(self.count_tokens(text) for text in context.values())
+        context["stats"] = {
+            "original_tokens": original_tokens,
+            "context_tokens": context_tokens,
+            "token_budget": self.token_budget,
+            "compression_ratio": round(original_tokens / context_tokens, 2) if context_tokens else 1.0,
+            "quotes_included": len(market) - (1 if omitted else 0),
+            "quotes_total": len(lines),
+            "documents_included": len(docs),
+            "documents_total": len(snippets)
+        }
+        return context
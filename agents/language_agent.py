@@ -1,11 +1,21 @@
 
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List
-import openai
-from openai import AsyncOpenAI
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple
+import asyncio
+import json
+import numpy as np
 from config.settings import settings
+from agents.context_builder import ContextBuilder
+from agents.llm_backends import LLMBackend, build_backends
+from agents.llm_dispatcher import DeadlineExceeded, LLMDispatcher
+from agents.response_cache import (
+    SemanticResponseCache, build_response_cache, market_data_ttl, market_snapshot_key, response_key
+)
 
 class LanguageRequest(BaseModel):
     market_data: Dict
@@ -13,33 +23,176 @@ class LanguageRequest(BaseModel):
     retrieved_documents: List[Dict]
     query: str
     response_type: str = "brief"
+    priority: Literal["interactive", "background"] = "interactive"  # interactive is dispatched first
+    deadline: Optional[float] = None  # seconds the request may queue; defaults per priority
+    backend: Optional[str] = None  # "openai" or "template"; defaults to settings.LLM_BACKEND
 
 class LanguageResponse(BaseModel):
     response: str
     confidence: float
     sources: List[str]
     reasoning: str
+    # Served from the response cache; exclude from LLM latency stats
+    cached: bool = False
+    # Prompt context packing: token counts, compression ratio, items included
+    context_stats: Optional[Dict] = None
+    backend: Optional[str] = None
 
-app = FastAPI(title="Language Agent", description="Enhanced LLM synthesis agent")
+# Placeholder for the semantic cache until its embedding model is loaded
+UNBUILT = object()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load the semantic cache's embedding model before serving rather than on import"""
+    await asyncio.to_thread(lambda: language_service.semantic_cache)
+    yield
+
+app = FastAPI(title="Language Agent", description="Enhanced LLM synthesis agent", lifespan=lifespan)
 
 class LanguageService:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+        self.backends = build_backends(settings.OPENAI_API_KEY, settings.OPENAI_MODEL, settings.OPENAI_BASE_URL)
+        self.cache = build_response_cache(
+            settings.RESPONSE_CACHE_BACKEND,
+            settings.RESPONSE_CACHE_MAX_ENTRIES,
+            settings.RESPONSE_CACHE_PATH
+        )
+        # Built on first use (or at app startup), since it loads an embedding model
+        self._semantic_cache = UNBUILT
+        self.dispatcher = LLMDispatcher(settings.LLM_MAX_IN_FLIGHT)
+        self.context_builder = ContextBuilder(
+            settings.CONTEXT_TOKEN_BUDGET,
+            settings.CONTEXT_DOCUMENT_SHARE,
+            settings.CONTEXT_SNIPPET_CHARS
+        )
+
+    @property
+    def semantic_cache(self) -> Optional[SemanticResponseCache]:
+        if self._semantic_cache is UNBUILT:
+            self._semantic_cache = self._build_semantic_cache()
+        return self._semantic_cache
+
+    @semantic_cache.setter
+    def semantic_cache(self, cache: Optional[SemanticResponseCache]):
+        self._semantic_cache = cache
+
+    def _build_semantic_cache(self) -> Optional[SemanticResponseCache]:
+        if settings.SEMANTIC_CACHE_MAX_ENTRIES <= 0:
+            return None
+        from data_ingestion.embedding_service import EmbeddingService
+
+        embedding_service = EmbeddingService()
+        if not embedding_service.use_sentence_transformers:
+            # TF-IDF vectors of a single query can't measure paraphrase similarity
+            print("⚠️ Semantic response cache needs SentenceTransformers, disabled")
+            return None
+        return SemanticResponseCache(
+            embedding_service,
+            settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            settings.SEMANTIC_CACHE_THRESHOLD
+        )
+
+    def backend(self, request: LanguageRequest) -> LLMBackend:
+        name = request.backend or settings.LLM_BACKEND
+        if name not in self.backends:
+            raise ValueError(f"Unknown LLM backend '{name}', expected one of {list(self.backends)}")
+        return self.backends[name]
 
     async def generate_response(self, request: LanguageRequest) -> LanguageResponse:
         """Generate intelligent response using market data and analysis"""
-        if not self.client:
-            return LanguageResponse(
-                response="OpenAI API key not configured",
-                confidence=0.0,
-                sources=[],
-                reasoning="API unavailable"
-            )
+        backend = self.backend(request)
+        if not backend.available:
+            return self._unavailable_response(backend)
+
+        messages, max_tokens, sources, context = self._build_prompt(request)
+        if not backend.remote:
+            try:
+                content = await backend.complete(messages, context, request.query, max_tokens)
+            except Exception as e:
+                return self._error_response(backend, e)
+            return self._completed_response(backend, content, sources, context["stats"])
+
+        key = self._cache_key(backend, messages, max_tokens, sources)
+        cached, embedding = await self._cached(request, backend, key)
+        if cached is not None:
+            return LanguageResponse(**cached, cached=True)
 
+        try:
+            async with self.dispatcher.slot(request.priority, self._deadline(request)):
+                start = perf_counter()
+                content = await backend.complete(messages, context, request.query, max_tokens)
+
+            result = self._completed_response(backend, content, sources, context["stats"])
+            self._store(key, request, backend, result, embedding, perf_counter() - start)
+            return result
+
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            return self._error_response(backend, e)
+
+    async def stream_response(self, request: LanguageRequest) -> AsyncIterator[Dict]:
+        """Yield {"type": "token"} events as the completion streams, then one {"type": "done"}
+
+        The done event carries the full LanguageResponse. A cache hit arrives
+        as a single token event. A failing backend, or a request shed by the
+        dispatcher, ends the stream with an {"type": "error"} event instead of done.
+        """
+        backend = self.backend(request)
+        if not backend.available:
+            yield {"type": "done", **self._unavailable_response(backend).dict()}
+            return
+
+        messages, max_tokens, sources, context = self._build_prompt(request)
+        if not backend.remote:
+            tokens = []
+            try:
+                async for token in backend.stream(messages, context, request.query, max_tokens):
+                    tokens.append(token)
+                    yield {"type": "token", "content": token}
+            except Exception as e:
+                print(f"❌ Language stream error: {e}")
+                yield {"type": "error", "detail": f"Unable to generate response: {str(e)}"}
+                return
+            yield {"type": "done", **self._completed_response(backend, "".join(tokens).strip(), sources, context["stats"]).dict()}
+            return
+
+        key = self._cache_key(backend, messages, max_tokens, sources)
+        cached, embedding = await self._cached(request, backend, key)
+        if cached is not None:
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "done", **cached, "cached": True}
+            return
+
+        tokens = []
+        try:
+            # The slot is held until the last token has arrived
+            async with self.dispatcher.slot(request.priority, self._deadline(request)):
+                start = perf_counter()
+                async for token in backend.stream(messages, context, request.query, max_tokens):
+                    tokens.append(token)
+                    yield {"type": "token", "content": token}
+        except DeadlineExceeded as e:
+            # Shed before any token was sent; /synthesize answers 503 in the same case
+            yield {"type": "error", "detail": f"Service busy, please retry: {str(e)}"}
+            return
+        except Exception as e:
+            # Tokens already sent stay on screen; the error event reports the failure
+            print(f"❌ Language stream error: {e}")
+            yield {"type": "error", "detail": f"Unable to generate response: {str(e)}"}
+            return
+
+        result = self._completed_response(backend, "".join(tokens).strip(), sources, context["stats"])
+        self._store(key, request, backend, result, embedding, perf_counter() - start)
+        yield {"type": "done", **result.dict()}
+
+    def _build_prompt(self, request: LanguageRequest) -> Tuple[List[Dict], int, List[str], Dict]:
+        """Chat messages, token limit, cited sources and packed context for a request"""
         context = self._prepare_context(
             request.market_data,
             request.analysis_results,
-            request.retrieved_documents
+            request.retrieved_documents,
+            request.query
         )
 
         system_prompt = """You are a professional financial analyst AI. Provide accurate, 
@@ -56,63 +209,87 @@ class LanguageService:
         Response type: {request.response_type}
         """
 
-        try:
-            response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=300 if request.response_type == "brief" else 800,
-                temperature=0.3
-            )
-
-            content = response.choices[0].message.content.strip()
-            
-            return LanguageResponse(
-                response=content,
-                confidence=0.85,
-                sources=self._extract_sources(request.retrieved_documents),
-                reasoning="Analysis based on live market data and portfolio analysis"
-            )
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        max_tokens = 300 if request.response_type == "brief" else 800
+        return messages, max_tokens, self._extract_sources(request.retrieved_documents), context
 
-        except Exception as e:
-            return LanguageResponse(
-                response=f"Unable to generate response: {str(e)}",
-                confidence=0.0,
-                sources=[],
-                reasoning="API error"
-            )
-
-    def _prepare_context(self, market_data: Dict, analysis_results: Dict, documents: List[Dict]) -> Dict:
-        """Prepare structured context for LLM"""
-        context = {"market": "", "analysis": "", "documents": ""}
-        
-        # Market data context
-        if market_data:
-            market_summary = []
-            for symbol, data in market_data.items():
-                if isinstance(data, dict) and "current_price" in data:
-                    change = data.get("change", 0)
-                    change_pct = data.get("change_percent", 0)
-                    market_summary.append(f"{symbol}: ${data['current_price']:.2f} ({change:+.2f}, {change_pct:+.1f}%)")
-            context["market"] = "; ".join(market_summary)
-
-        # Analysis context
-        if analysis_results:
-            analysis = analysis_results.get("analysis", {})
-            context["analysis"] = f"Risk Score: {analysis.get('risk_score', 'N/A')}, Volatility: {analysis.get('volatility', 'N/A')}%, Diversification: {analysis.get('sector_diversification', 'N/A')}"
-
-        # Documents context
-        if documents:
-            doc_summaries = []
-            for doc in documents[:3]:
-                content = doc.get("content", "")[:150]
-                if content:
-                    doc_summaries.append(content + "...")
-            context["documents"] = "; ".join(doc_summaries)
-
-        return context
+    def _cache_key(self, backend: LLMBackend, messages: List[Dict], max_tokens: int, sources: List[str]) -> str:
+        # Sources come from document metadata, which the prompt doesn't include
+        return response_key(backend.model, messages, max_tokens=max_tokens, temperature=0.3, sources=sources)
+
+    def _snapshot(self, request: LanguageRequest, backend: LLMBackend) -> str:
+        return market_snapshot_key(
+            request.market_data, request.analysis_results, request.retrieved_documents,
+            model=backend.model, response_type=request.response_type
+        )
+
+    async def _cached(self, request: LanguageRequest, backend: LLMBackend,
+                      key: str) -> Tuple[Optional[Dict], Optional[np.ndarray]]:
+        """Exact cache hit, else a semantic cache hit, plus the query embedding used for storing"""
+        cached = self.cache.get(key) if self.cache else None
+        embedding = None
+        if cached is None and self.semantic_cache:
+            embedding = await asyncio.to_thread(self.semantic_cache.embed, request.query)
+            cached = self.semantic_cache.get(embedding, self._snapshot(request, backend))
+        return cached, embedding
+
+    def _store(self, key: str, request: LanguageRequest, backend: LLMBackend, result: LanguageResponse,
+               embedding: Optional[np.ndarray], llm_seconds: float):
+        if not (self.cache or self.semantic_cache):
+            return
+        ttl = market_data_ttl(
+            request.market_data,
+            settings.QUOTE_CACHE_TTLS,
+            settings.QUOTE_CACHE_DEFAULT_TTL,
+            settings.RESPONSE_CACHE_EMPTY_TTL
+        )
+        value = result.dict(exclude={"cached"})
+        if self.cache:
+            self.cache.set(key, value, ttl)
+        if self.semantic_cache and embedding is not None:
+            self.semantic_cache.set(embedding, self._snapshot(request, backend), value, ttl, llm_seconds)
+
+    def _completed_response(self, backend: LLMBackend, content: str, sources: List[str],
+                            context_stats: Dict) -> LanguageResponse:
+        return LanguageResponse(
+            response=content,
+            confidence=backend.confidence,
+            sources=sources,
+            reasoning=backend.reasoning,
+            context_stats=context_stats,
+            backend=backend.name
+        )
+
+    def _unavailable_response(self, backend: LLMBackend) -> LanguageResponse:
+        return LanguageResponse(
+            response=f"The {backend.name} backend is unavailable: {backend.unavailable_reason}",
+            confidence=0.0,
+            sources=[],
+            reasoning=f"{backend.name} backend unavailable",
+            backend=backend.name
+        )
+
+    def _deadline(self, request: LanguageRequest) -> Optional[float]:
+        if request.deadline is not None:
+            return request.deadline
+        return settings.LLM_QUEUE_DEADLINES.get(request.priority)
+
+    def _error_response(self, backend: LLMBackend, error: Exception) -> LanguageResponse:
+        return LanguageResponse(
+            response=f"Unable to generate response: {str(error)}",
+            confidence=0.0,
+            sources=[],
+            reasoning="API error",
+            backend=backend.name
+        )
+
+    def _prepare_context(self, market_data: Dict, analysis_results: Dict, documents: List[Dict],
+                         query: str = "") -> Dict:
+        """Prepare structured context for LLM, packed into the configured token budget"""
+        return self.context_builder.build(query, market_data, analysis_results, documents)
 
     def _extract_sources(self, docs: List[Dict]) -> List[str]:
         """Extract source information from documents"""
@@ -133,10 +310,34 @@ async def synthesize_response(request: LanguageRequest):
     """Generate intelligent response using market data and analysis"""
     try:
         return await language_service.generate_response(request)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"❌ Language synthesis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/synthesize/stream")
+async def synthesize_stream(request: LanguageRequest):
+    """Stream the response as NDJSON: token events, then a done event with the full response"""
+    try:
+        language_service.backend(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        async for event in language_service.stream_response(request):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "language_agent"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "service": "language_agent",
+        "response_cache": language_service.cache.stats() if language_service.cache else None,
+        "semantic_cache": language_service.semantic_cache.stats() if language_service.semantic_cache else None,
+        "dispatcher": language_service.dispatcher.stats()
+    }
@@ -0,0 +1,124 @@
+"""Completion backends for the language agent.
+
+Every backend turns the chat messages, the packed context from
+LanguageService._prepare_context and the query into response text, whole
+or as a token stream:
+
+    openai    chat completions over the network (any OpenAI-compatible server)
+    template  deterministic in-process summary of the context, no model and no
+              network, for low-latency "brief" responses and offline use
+
+Remote backends go through the dispatcher and the response caches; local
+ones answer directly.
+"""
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+import re
+from openai import AsyncOpenAI
+
+class LLMBackend(ABC):
+    """Base class: name, model and response metadata plus complete/stream"""
+
+    name = ""
+    model = ""
+    # Remote calls are queued by the dispatcher and cached; local ones are cheaper than both
+    remote = True
+    confidence = 0.85
+    reasoning = "Analysis based on live market data and portfolio analysis"
+
+    @property
+    def unavailable_reason(self) -> Optional[str]:
+        """Why the backend cannot serve requests, or None when it can"""
+        return None
+
+    @property
+    def available(self) -> bool:
+        return self.unavailable_reason is None
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> str:
+        """Whole completion text"""
+
+    async def stream(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> AsyncIterator[str]:
+        """Token stream; by default the whole completion as one token"""
+        yield await self.complete(messages, context, query, max_tokens)
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str, base_url: Optional[str] = None):
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url) if api_key else None
+        self.model = model
+
+    @property
+    def unavailable_reason(self) -> Optional[str]:
+        return None if self.client is not None else "OpenAI API key not configured"
+
+    async def complete(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.3
+        )
+        return response.choices[0].message.content.strip()
+
+    async def stream(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=0.3,
+            stream=True
+        )
+        async for chunk in stream:
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if token:
+                yield token
+
+class TemplateBackend(LLMBackend):
+    """Fills a fixed summary template from the packed context
+
+    The context builder already ranks quotes and documents by relevance to
+    the query, so the template reports the leading entries of each section.
+    """
+
+    name = "template"
+    model = "template-v1"
+    remote = False
+    confidence = 0.6
+    reasoning = "Template summary of live market data, no language model"
+
+    def __init__(self, max_quotes: int = 5):
+        self.max_quotes = max_quotes
+
+    async def complete(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> str:
+        return self.render(context, query, max_tokens)
+
+    async def stream(self, messages: List[Dict], context: Dict, query: str, max_tokens: int) -> AsyncIterator[str]:
+        for token in re.findall(r"\S+\s*", self.render(context, query, max_tokens)):
+            yield token
+
+    def render(self, context: Dict, query: str, max_tokens: int) -> str:
+        sections = []
+        quotes = [quote for quote in context.get("market", "").split("; ") if quote and not quote.startswith("(+")]
+        if quotes:
+            shown = quotes[:self.max_quotes]
+            more = len(quotes) - len(shown)
+            sections.append("Market: " + "; ".join(shown) + (f"; and {more} more." if more else "."))
+        if context.get("analysis"):
+            sections.append(f"Portfolio: {context['analysis']}.")
+        documents = [doc for doc in context.get("documents", "").split("; ") if doc]
+        if documents:
+            sections.append(f"Most relevant coverage: {documents[0]}")
+        if not sections:
+            sections.append("No market data, analysis or documents were available for this query.")
+
+        text = f"Re: {query.strip()}\n" + "\n".join(sections)
+        # Roughly 4 characters per token
+        limit = max_tokens * 4
+        return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+def build_backends(api_key: Optional[str], openai_model: str, base_url: Optional[str] = None) -> Dict[str, LLMBackend]:
+    backends = [OpenAIBackend(api_key, openai_model, base_url), TemplateBackend()]
+    return {backend.name: backend for backend in backends}
@@ -0,0 +1,124 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import math
+import time
+
+# Lower value is dispatched first
+PRIORITIES = {"interactive": 0, "background": 1}
+
+class DeadlineExceeded(Exception):
+    """A request was shed because it could not start before its deadline"""
+
+class LLMDispatcher:
+    """Admission control for LLM calls: bounded in-flight slots and a priority queue
+
+    Callers wait for a slot with `async with dispatcher.slot(priority, deadline)`.
+    Free slots go to the highest priority waiter, first come first served
+    within a priority. A waiter is shed with DeadlineExceeded when its
+    deadline (seconds from arrival) passes while queued, or on arrival
+    when the deadline has already passed (negative), or when it would have
+    to queue and the estimated wait already exceeds the deadline. Calls
+    that have started are never cut short. The clock is injectable like
+    TokenBucket's.
+    """
+
+    def __init__(self, max_in_flight: int, clock: Callable[[], float] = time.monotonic,
+                 window: int = 1000):
+        self.max_in_flight = max_in_flight
+        self.clock = clock
+        self.in_flight = 0
+        self.queue: List[Tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        # Moving average of how long a call holds its slot, for the wait estimate
+        self.service_time = 0.0
+        self.counters = {name: {"submitted": 0, "dispatched": 0, "shed": 0, "queued": 0} for name in PRIORITIES}
+        self.queue_times: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name in PRIORITIES}
+
+    def _ahead_of(self, rank: int) -> int:
+        return sum(1 for queued_rank, _, waiter in self.queue if queued_rank <= rank and not waiter.done())
+
+    def estimated_wait(self, priority: str) -> float:
+        """Seconds a caller arriving now at this priority is expected to queue"""
+        if self.in_flight < self.max_in_flight and not self._ahead_of(PRIORITIES[priority]):
+            return 0.0
+        waves = math.ceil((self._ahead_of(PRIORITIES[priority]) + 1) / self.max_in_flight)
+        return waves * self.service_time
+
+    def _release(self):
+        self.in_flight -= 1
+        while self.queue:
+            _, _, waiter = heapq.heappop(self.queue)
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+                return
+
+    def _shed(self, priority: str, deadline: float, reason: str):
+        self.counters[priority]["shed"] += 1
+        raise DeadlineExceeded(f"Shed {priority} request: {reason} (deadline {deadline}s)")
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive", deadline: Optional[float] = None):
+        """Hold one in-flight slot for the body of the block"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+        counters = self.counters[priority]
+        counters["submitted"] += 1
+        arrived = self.clock()
+        if deadline is not None and deadline < 0:
+            self._shed(priority, deadline, "deadline passed before arrival")
+
+        if self.in_flight < self.max_in_flight and not self._ahead_of(PRIORITIES[priority]):
+            self.in_flight += 1
+        else:
+            if deadline is not None and (deadline == 0 or self.estimated_wait(priority) > deadline):
+                self._shed(priority, deadline, f"estimated wait {self.estimated_wait(priority):.2f}s")
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.queue, (PRIORITIES[priority], next(self.sequence), waiter))
+            counters["queued"] += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), deadline)
+            except asyncio.TimeoutError:
+                if not waiter.done():
+                    waiter.cancel()
+                    self._shed(priority, deadline, "still queued at deadline")
+                # Granted just as the deadline passed: the slot is ours
+            except BaseException:
+                # Caller cancelled: give back a slot granted in the meantime
+                if waiter.done() and not waiter.cancelled():
+                    self._release()
+                else:
+                    waiter.cancel()
+                raise
+
+        start = self.clock()
+        counters["dispatched"] += 1
+        self.queue_times[priority].append(start - arrived)
+        try:
+            yield
+        finally:
+            held = self.clock() - start
+            self.service_time = held if not self.service_time else 0.8 * self.service_time + 0.2 * held
+            self._release()
+
+    def stats(self) -> Dict:
+        priorities = {}
+        for name, counters in self.counters.items():
+            times = sorted(self.queue_times[name])
+            priorities[name] = {
+                **counters,
+                "queue_depth": sum(1 for rank, _, waiter in self.queue if rank == PRIORITIES[name] and not waiter.done()),
+                "avg_queue_time": round(sum(times) / len(times), 3) if times else 0.0,
+                "p95_queue_time": round(times[min(int(len(times) * 0.95), len(times) - 1)], 3) if times else 0.0,
+                "max_queue_time": round(times[-1], 3) if times else 0.0
+            }
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_service_time": round(self.service_time, 3),
+            "priorities": priorities
+        }
@@ -0,0 +1,101 @@
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterator, List, Sequence, Set
+import numpy as np
+
+SEARCHABLE_FIELDS = ["symbol", "name", "sector", "region"]
+MAX_GRAM = 3
+
+def _grams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+class PortfolioIndex:
+    """Substring index and cached totals over a list of holdings
+
+    Holdings share few distinct field values (many lots per symbol, a
+    handful of sectors and regions), so n-grams are indexed over distinct
+    lowercase values and each value maps to the sorted ids of the holdings
+    that carry it. A query intersects the postings of its n-grams, verifies
+    the surviving values with a substring check and merges their holding
+    ids lazily, so work scales with the matches rather than the portfolio.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self.value_postings: Dict[str, Sequence[int]] = {}
+
+        for position, entry in enumerate(entries):
+            values = {str(entry[field]).lower() for field in SEARCHABLE_FIELDS if field in entry}
+            for value in values:
+                self.value_postings.setdefault(value, []).append(position)
+        self._index_grams()
+
+        self.total_value = sum(entry.get("current_value", 0) for entry in entries)
+        self.total_return = sum(entry.get("return", 0) for entry in entries)
+        self.total_cost = sum(entry.get("shares", 0) * entry.get("avg_cost", 0) for entry in entries)
+
+    @classmethod
+    def from_columnar(cls, portfolio) -> "PortfolioIndex":
+        """Build from a ColumnarPortfolio using its dictionary encoding
+
+        Postings come from grouping each field's codes with one stable argsort
+        and totals are array reductions, so no holding is materialised.
+        """
+        index = cls.__new__(cls)
+        index.entries = portfolio
+        index.value_postings = {}
+
+        for field in SEARCHABLE_FIELDS:
+            if field not in portfolio.categorical or not len(portfolio):
+                continue
+            codes = np.asarray(portfolio.columns[field])
+            order = np.argsort(codes, kind="stable")
+            boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+            for group in np.split(order, boundaries):
+                code = codes[group[0]]
+                if code < 0:
+                    continue
+                value = portfolio.categorical[field][code].lower()
+                existing = index.value_postings.get(value)
+                index.value_postings[value] = group if existing is None else np.union1d(existing, group)
+        index._index_grams()
+
+        index.total_value = portfolio.total("current_value")
+        index.total_return = portfolio.total("return")
+        index.total_cost = portfolio.dot("shares", "avg_cost")
+        return index
+
+    def _index_grams(self):
+        self.gram_postings: Dict[str, Set[str]] = {}
+        for value in self.value_postings:
+            for size in range(1, MAX_GRAM + 1):
+                for gram in _grams(value, size):
+                    self.gram_postings.setdefault(gram, set()).add(value)
+
+    def matching_values(self, query: str) -> List[str]:
+        """Distinct field values containing query as a substring"""
+        size = min(len(query), MAX_GRAM)
+        candidates = None
+        for gram in sorted(_grams(query, size), key=lambda g: len(self.gram_postings.get(g, ()))):
+            postings = self.gram_postings.get(gram)
+            if not postings:
+                return []
+            candidates = set(postings) if candidates is None else candidates & postings
+            if not candidates:
+                return []
+        return [value for value in candidates or () if query in value]
+
+    def search(self, query: str, limit: int) -> List[Dict]:
+        """Holdings matching query in portfolio order, at most limit of them"""
+        if not query:
+            return []
+        postings = [self.value_postings[value] for value in self.matching_values(query)]
+        return [self.entries[i] for i in islice(self._unique(merge(*postings)), limit)]
+
+    @staticmethod
+    def _unique(positions: Iterator[int]) -> Iterator[int]:
+        last = None
+        for position in positions:
+            if position != last:
+                yield position
+                last = position
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+class QuoteCache:
+    """In-process quote cache with per-provider TTL, LRU eviction and
+    single-flight coalescing.
+
+    Concurrent misses for the same symbol share one upstream fetch. The fetch
+    runs as its own task, so a caller that gives up (e.g. on a deadline) does
+    not cancel it for the others and the result still lands in the cache.
+    """
+
+    def __init__(self, max_entries: int, ttls: Dict[str, float], default_ttl: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.inflight: Dict[str, "asyncio.Future"] = {}
+        # Batch fetches still delivering results, kept referenced until they finish
+        self.batches = set()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a fresh cached quote or None, without touching counters"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if self.clock() >= expires_at:
+            del self.entries[key]
+            self.counters["expirations"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return dict(data)
+
+    def set(self, key: str, data: Dict):
+        """Cache a quote for the TTL of the provider that served it"""
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttls.get(data.get("source"), self.default_ttl)
+        self.entries[key] = (self.clock() + ttl, dict(data))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Serve from cache, join an in-flight fetch, or start a new one"""
+        cached = self.get(key)
+        if cached is not None:
+            self.counters["hits"] += 1
+            return cached
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            task = asyncio.ensure_future(fetch())
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self._on_fetched(key, done))
+
+        return dict(await asyncio.shield(task))
+
+    def get_or_fetch_many(self, keys: List[str],
+                          fetch_many: Callable[[List[str]], AsyncIterator[Tuple[str, Dict]]]) -> Dict[str, "asyncio.Future"]:
+        """Like get_or_fetch for many keys, with all misses fetched in one call
+
+        fetch_many yields (key, quote) pairs as they arrive, and each key's
+        awaitable resolves as soon as its own pair does, so callers can apply
+        their own deadline and keep whatever finished in time.
+        """
+        loop = asyncio.get_running_loop()
+        futures = {}
+        missing = {}
+        for key in keys:
+            cached = self.get(key)
+            if cached is not None:
+                self.counters["hits"] += 1
+                futures[key] = loop.create_future()
+                futures[key].set_result(cached)
+            elif key in self.inflight:
+                self.counters["coalesced"] += 1
+                futures[key] = self._join(self.inflight[key])
+            else:
+                self.counters["misses"] += 1
+                missing[key] = loop.create_future()
+                self.inflight[key] = missing[key]
+                missing[key].add_done_callback(lambda done, key=key: self._on_fetched(key, done))
+                futures[key] = self._join(missing[key])
+
+        if missing:
+            batch = asyncio.ensure_future(self._deliver(fetch_many, missing))
+            self.batches.add(batch)
+            batch.add_done_callback(self.batches.discard)
+        return futures
+
+    @staticmethod
+    def _join(task: "asyncio.Future") -> "asyncio.Future":
+        async def join():
+            return dict(await asyncio.shield(task))
+        return asyncio.ensure_future(join())
+
+    @staticmethod
+    async def _deliver(fetch_many: Callable[[List[str]], AsyncIterator[Tuple[str, Dict]]],
+                       futures: Dict[str, "asyncio.Future"]):
+        """Resolve each key's future as fetch_many yields it; leftovers get an error"""
+        try:
+            async for key, data in fetch_many(list(futures)):
+                future = futures.get(key)
+                if future is not None and not future.done():
+                    future.set_result(data)
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+        for future in futures.values():
+            if not future.done():
+                future.set_result({"error": "No data returned"})
+
+    def _on_fetched(self, key: str, task: "asyncio.Future"):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        # Retrieve the exception even if every waiter has already given up
+        if task.cancelled() or task.exception() is not None:
+            return
+        data = task.result()
+        if "error" not in data:
+            self.set(key, data)
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self.inflight),
+            "hit_rate": round((self.counters["hits"] + self.counters["coalesced"]) / lookups, 3) if lookups else 0.0
+        }
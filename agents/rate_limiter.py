@@ -0,0 +1,122 @@
+from typing import Awaitable, Callable, Dict, List
+import asyncio
+import time
+
+class RateLimitExceeded(Exception):
+    """No token can be had before the caller's deadline"""
+
+class TokenBucket:
+    """Async token bucket that queues callers instead of rejecting them
+
+    Waiters are served in arrival order. A caller with a deadline is turned
+    away, rather than queued, once its token would arrive too late. The
+    clock and sleep functions are injectable so the bucket can be driven by
+    a fake clock offline.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+        self.queue_depth = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def time_until_available(self) -> float:
+        """Seconds until a token is free for a caller joining the queue now"""
+        if self.rate <= 0:
+            return float("inf")
+        needed = 1 + self.queue_depth - self.available()
+        return max(needed, 0) / self.rate
+
+    async def acquire(self, deadline: float = None) -> float:
+        """Take one token, waiting in line for it; returns seconds waited
+
+        With a deadline (on the bucket's clock), raises RateLimitExceeded
+        instead of waiting past it.
+        """
+        start = self.clock()
+        if deadline is not None and start + self.time_until_available() > deadline:
+            self._reject(deadline)
+        self.queue_depth += 1
+        try:
+            async with self.lock:
+                self._refill()
+                while self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                    if deadline is not None and self.clock() + wait > deadline:
+                        self._reject(deadline)
+                    await self.sleep(wait)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.queue_depth -= 1
+
+        waited = self.clock() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def _reject(self, deadline: float):
+        self.rejected += 1
+        raise RateLimitExceeded(f"No token within {max(deadline - self.clock(), 0):.1f}s")
+
+    def stats(self) -> Dict:
+        return {
+            "tokens": round(self.available(), 2),
+            "capacity": self.capacity,
+            "rate_per_minute": round(self.rate * 60, 2),
+            "queue_depth": self.queue_depth,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "avg_wait": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+            "max_wait": round(self.max_wait, 3)
+        }
+
+class ProviderRateLimiter:
+    """One token bucket per market data provider"""
+
+    def __init__(self, limits: Dict[str, float],
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.buckets = {
+            provider: TokenBucket(rate, clock=clock, sleep=sleep)
+            for provider, rate in limits.items()
+        }
+
+    async def acquire(self, provider: str, deadline: float = None) -> float:
+        bucket = self.buckets.get(provider)
+        return await bucket.acquire(deadline) if bucket else 0.0
+
+    def rank(self, providers: List[str]) -> List[str]:
+        """Order providers so those with budget left come first
+
+        Ties keep the given preference order; providers without a bucket are
+        treated as always having budget.
+        """
+        def wait_for(provider: str) -> float:
+            bucket = self.buckets.get(provider)
+            return bucket.time_until_available() if bucket else 0.0
+
+        return sorted(providers, key=wait_for)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {provider: bucket.stats() for provider, bucket in self.buckets.items()}
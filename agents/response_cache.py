@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+
+def response_key(model: str, messages, **params) -> str:
+    """Hash of everything that determines a completion"""
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def market_snapshot_key(market_data: Dict, analysis_results: Dict, documents: Optional[List[Dict]] = None,
+                        **params) -> str:
+    """Hash of the market data, analysis and retrieved documents a response was built from
+
+    Fetch timestamps are left out, so refetching unchanged quotes keeps the
+    same snapshot; expiry is handled by market_data_ttl. Documents count by
+    content and metadata, so a query that retrieves different evidence or
+    sources gets a different snapshot.
+    """
+    quotes = {
+        symbol: {field: value for field, value in data.items() if field != "timestamp"}
+        if isinstance(data, dict) else data
+        for symbol, data in (market_data or {}).items()
+    }
+    evidence = [
+        hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        for doc in documents or []
+    ]
+    payload = json.dumps(
+        {"market": quotes, "analysis": analysis_results or {}, "documents": evidence, "params": params},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def market_data_ttl(market_data: Dict, ttls: Dict[str, float], default_ttl: float, empty_ttl: float,
+                    now: Optional[datetime] = None) -> float:
+    """Seconds until the stalest quote in market_data expires
+
+    Each quote stays fresh for its provider's quote TTL from the time it was
+    fetched, so a response built on it is valid no longer than that. Without
+    quotes, empty_ttl applies.
+    """
+    now = now or datetime.utcnow()
+    remaining = None
+    for data in (market_data or {}).values():
+        if not isinstance(data, dict) or "current_price" not in data:
+            continue
+        ttl = ttls.get(data.get("source"), default_ttl)
+        try:
+            age = (now - datetime.fromisoformat(data["timestamp"])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            age = 0.0
+        left = ttl - max(age, 0.0)
+        remaining = left if remaining is None else min(remaining, left)
+    return empty_ttl if remaining is None else remaining
+
+class MemoryResponseBackend:
+    """LRU of responses with per-entry expiry"""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if self.clock() >= expires_at:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return dict(value)
+
+    def set(self, key: str, value: Dict, ttl: float):
+        self.entries[key] = (self.clock() + ttl, dict(value))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class DiskResponseBackend:
+    """Responses in a local SQLite file, shared by workers and kept across restarts"""
+
+    def __init__(self, path: str, max_entries: int, clock: Callable[[], float] = time.time):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.clock = clock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL, used_at REAL)"
+        )
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = self.clock()
+        row = self.db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            if now >= row[1]:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self.db.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict, ttl: float):
+        now = self.clock()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            # Least recently used beyond max_entries
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    """Completed LLM responses keyed by response_key, over a pluggable backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "uncacheable": 0}
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.backend.get(key)
+        self.counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: Dict, ttl: float):
+        if ttl <= 0:
+            # Market data was already stale; the next request must refetch anyway
+            self.counters["uncacheable"] += 1
+            return
+        self.backend.set(key, value, ttl)
+        self.counters["stores"] += 1
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+class SemanticEntry(NamedTuple):
+    snapshot: str
+    embedding: np.ndarray
+    expires_at: float
+    llm_seconds: float
+    value: Dict
+
+class SemanticResponseCache:
+    """Responses reused across near-duplicate queries over the same market snapshot
+
+    Queries are embedded with an EmbeddingService. A lookup returns the
+    most similar entry for the same snapshot if its cosine similarity
+    reaches threshold. Entries are evicted least recently used beyond
+    max_entries and expire like ResponseCache entries.
+    """
+
+    def __init__(self, embedding_service, max_entries: int, threshold: float,
+                 clock: Callable[[], float] = time.time):
+        self.embedding_service = embedding_service
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.clock = clock
+        self.entries: "OrderedDict[int, SemanticEntry]" = OrderedDict()
+        self.next_id = 0
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "uncacheable": 0}
+        self.saved_llm_seconds = 0.0
+
+    def embed(self, query: str) -> np.ndarray:
+        """Unit-length query embedding"""
+        return self.embedding_service.encode_query(query)[0]
+
+    def get(self, embedding: np.ndarray, snapshot: str) -> Optional[Dict]:
+        now = self.clock()
+        candidates = []
+        for entry_id, entry in list(self.entries.items()):
+            if now >= entry.expires_at:
+                del self.entries[entry_id]
+            elif entry.snapshot == snapshot:
+                candidates.append(entry_id)
+
+        if candidates:
+            similarities = np.stack([self.entries[entry_id].embedding for entry_id in candidates]) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                entry_id = candidates[best]
+                self.entries.move_to_end(entry_id)
+                entry = self.entries[entry_id]
+                self.counters["hits"] += 1
+                self.saved_llm_seconds += entry.llm_seconds
+                return dict(entry.value)
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, embedding: np.ndarray, snapshot: str, value: Dict, ttl: float, llm_seconds: float):
+        """Store a response and how long the LLM took to produce it"""
+        if ttl <= 0:
+            self.counters["uncacheable"] += 1
+            return
+        self.entries[self.next_id] = SemanticEntry(snapshot, embedding, self.clock() + ttl, llm_seconds, dict(value))
+        self.next_id += 1
+        self.counters["stores"] += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "size": len(self.entries),
+            "threshold": self.threshold,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "saved_llm_seconds": round(self.saved_llm_seconds, 3)
+        }
+
+def build_response_cache(backend: str, max_entries: int, path: str) -> Optional[ResponseCache]:
+    """ResponseCache for backend "memory" or "disk"; None when disabled"""
+    if backend == "memory":
+        return ResponseCache(MemoryResponseBackend(max_entries))
+    if backend == "disk":
+        return ResponseCache(DiskResponseBackend(path, max_entries))
+    if backend not in ("none", ""):
+        print(f"⚠️ Unknown response cache backend '{backend}', caching disabled")
+    return None
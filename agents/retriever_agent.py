@@ -3,12 +3,16 @@
 
 from config.settings import settings
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional, Sequence
+import asyncio
 import json
 import os
 from datetime import datetime
+from agents.portfolio_index import PortfolioIndex
+from agents.columnar_portfolio import ColumnarPortfolio
 
 class RetrieveRequest(BaseModel):
     query: str
@@ -19,14 +23,111 @@ class RetrieveResponse(BaseModel):
     summary: str
     count: int
 
-app = FastAPI(title="Retriever Agent", description="Dynamic portfolio data retrieval")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Poll the portfolio file for changes while the agent is running"""
+    watcher = None
+    if settings.PORTFOLIO_RELOAD_INTERVAL > 0:
+        watcher = asyncio.create_task(portfolio_retriever.watch(settings.PORTFOLIO_RELOAD_INTERVAL))
+    yield
+    if watcher:
+        watcher.cancel()
+
+app = FastAPI(title="Retriever Agent", description="Dynamic portfolio data retrieval", lifespan=lifespan)
+
+class PortfolioSnapshot(NamedTuple):
+    """An immutable, fully indexed view of the portfolio file"""
+    entries: Sequence[Dict]  # list of dicts, or a memory-mapped ColumnarPortfolio
+    index: PortfolioIndex
+    mtime: Optional[int]
+    version: int
+    loaded_at: str
 
 class PortfolioRetriever:
     def __init__(self):
-        self.portfolio_data = self._load_portfolio()
+        entries = self._load_portfolio()
+        self.snapshot = self._build_snapshot(entries, self._file_mtime(), version=1)
+        self.failed_mtime: Optional[int] = None
+
+    @property
+    def portfolio_data(self) -> Sequence[Dict]:
+        return self.snapshot.entries
+
+    @staticmethod
+    def _build_snapshot(entries: Sequence[Dict], mtime: Optional[int], version: int) -> PortfolioSnapshot:
+        if isinstance(entries, ColumnarPortfolio):
+            index = PortfolioIndex.from_columnar(entries)
+        else:
+            index = PortfolioIndex(entries)
+        return PortfolioSnapshot(
+            entries=entries,
+            index=index,
+            mtime=mtime,
+            version=version,
+            loaded_at=datetime.utcnow().isoformat()
+        )
+
+    @staticmethod
+    def _file_mtime() -> Optional[int]:
+        try:
+            if settings.PORTFOLIO_COLUMNAR_DIR:
+                return ColumnarPortfolio.meta_mtime(settings.PORTFOLIO_COLUMNAR_DIR)
+            return os.stat(settings.PORTFOLIO_FILE).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read_portfolio() -> Sequence[Dict]:
+        if settings.PORTFOLIO_COLUMNAR_DIR:
+            return ColumnarPortfolio(settings.PORTFOLIO_COLUMNAR_DIR)
+        with open(settings.PORTFOLIO_FILE, "r") as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError("Portfolio file must contain a list of holdings")
+        return entries
+
+    def reload_if_changed(self) -> bool:
+        """Parse and index a changed portfolio file, then swap it in
+
+        Runs off the event loop. Requests keep using the snapshot they started
+        with; the new one replaces it with a single reference assignment, so
+        nobody sees a half-loaded portfolio. A file that fails to parse (e.g.
+        mid-write) leaves the current snapshot in place until it changes again.
+        """
+        mtime = self._file_mtime()
+        if mtime is None or mtime == self.snapshot.mtime or mtime == self.failed_mtime:
+            return False
+
+        try:
+            entries = self._read_portfolio()
+            snapshot = self._build_snapshot(entries, mtime, self.snapshot.version + 1)
+        except Exception as e:
+            print(f"⚠️ Portfolio reload skipped: {e}")
+            self.failed_mtime = mtime
+            return False
+
+        self.snapshot = snapshot
+        print(f"🔄 Portfolio reloaded: {len(entries)} holdings (version {snapshot.version})")
+        return True
 
-    def _load_portfolio(self) -> List[Dict]:
+    async def watch(self, interval: float):
+        """Poll the portfolio file's mtime and reload it in a worker thread"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                print(f"❌ Portfolio watcher error: {e}")
+
+    def _load_portfolio(self) -> Sequence[Dict]:
         """Load and validate portfolio data"""
+        if settings.PORTFOLIO_COLUMNAR_DIR:
+            try:
+                return self._read_portfolio()
+            except Exception as e:
+                print(f"❌ Error loading columnar portfolio: {e}")
+                return []
+
         portfolio_file = settings.PORTFOLIO_FILE
         
         # Create default portfolio if file doesn't exist
@@ -83,19 +184,15 @@ class PortfolioRetriever:
     def search_portfolio(self, query: str, limit: int = 10) -> Dict:
         """Search portfolio based on query"""
         query_lower = query.lower().strip()
+        # Pin one snapshot for the whole request
+        snapshot = self.snapshot
         
         # Handle empty or general queries
         if not query_lower or query_lower in ["portfolio", "all", "overview", "summary"]:
-            return self._get_portfolio_summary()
-
-        # Search filters
-        matching_entries = []
-        for entry in self.portfolio_data:
-            if self._matches_query(entry, query_lower):
-                matching_entries.append(entry)
+            return self._get_portfolio_summary(snapshot)
 
-        # Limit results
-        matching_entries = matching_entries[:limit]
+        # Indexed substring search, limited to the first matches in portfolio order
+        matching_entries = snapshot.index.search(query_lower, limit)
 
         # Calculate summary for filtered results
         if matching_entries:
@@ -113,19 +210,10 @@ class PortfolioRetriever:
             "timestamp": datetime.utcnow().isoformat()
         }
 
-    def _matches_query(self, entry: Dict, query: str) -> bool:
-        """Check if entry matches search query"""
-        searchable_fields = ["symbol", "name", "sector", "region"]
-        
-        for field in searchable_fields:
-            if field in entry and query in str(entry[field]).lower():
-                return True
-        
-        return False
-
-    def _get_portfolio_summary(self) -> Dict:
+    def _get_portfolio_summary(self, snapshot: PortfolioSnapshot) -> Dict:
         """Get complete portfolio summary"""
-        if not self.portfolio_data:
+        entries = snapshot.entries
+        if not entries:
             return {
                 "documents": [],
                 "summary": "No portfolio data available",
@@ -133,18 +221,19 @@ class PortfolioRetriever:
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-        total_value = sum(entry.get("current_value", 0) for entry in self.portfolio_data)
-        total_return = sum(entry.get("return", 0) for entry in self.portfolio_data)
-        total_cost = sum(entry.get("shares", 0) * entry.get("avg_cost", 0) for entry in self.portfolio_data)
-        
+        # Totals are precomputed when the index is built
+        total_value = snapshot.index.total_value
+        total_return = snapshot.index.total_return
+        total_cost = snapshot.index.total_cost
+
         return_percent = (total_return / total_cost * 100) if total_cost > 0 else 0
 
-        summary = f"Portfolio Overview: {len(self.portfolio_data)} holdings, Total value: ${total_value:,.2f}, Total return: ${total_return:,.2f} ({return_percent:.1f}%)"
+        summary = f"Portfolio Overview: {len(entries)} holdings, Total value: ${total_value:,.2f}, Total return: ${total_return:,.2f} ({return_percent:.1f}%)"
 
         return {
-            "documents": self.portfolio_data,
+            "documents": list(entries),
             "summary": summary,
-            "count": len(self.portfolio_data),
+            "count": len(entries),
             "total_value": total_value,
             "total_return": total_return,
             "return_percent": round(return_percent, 2),
@@ -171,4 +260,13 @@ async def retrieve_documents(request: RetrieveRequest):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "retriever_agent"}
\ No newline at end of file
+    snapshot = portfolio_retriever.snapshot
+    return {
+        "status": "healthy",
+        "service": "retriever_agent",
+        "portfolio": {
+            "holdings": len(snapshot.entries),
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at
+        }
+    }
\ No newline at end of file
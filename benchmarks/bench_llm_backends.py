@@ -0,0 +1,91 @@
+"""Benchmark language agent latency per completion backend.
+
+Runs the same requests through LanguageService on every backend, with
+response caches disabled, and reports p50/p95 latency of whole responses
+and time to first streamed token. The openai backend talks to the fake
+completion server (set --latency to your measured provider latency)
+unless --live is given, which uses the configured OPENAI_* settings.
+
+Usage: python -m benchmarks.bench_llm_backends [--requests 20] [--symbols 100] [--latency 0.8] [--live]
+"""
+import argparse
+import asyncio
+import statistics
+from time import perf_counter
+
+import numpy as np
+
+from agents.language_agent import LanguageRequest, language_service
+from agents.llm_backends import OpenAIBackend
+from benchmarks.fake_llm_server import create_app, serve_in_thread
+
+def sample_request(i: int, symbols: int, backend: str, rng: np.random.Generator) -> LanguageRequest:
+    market_data = {
+        f"S{n:03d}": {
+            "current_price": float(rng.uniform(5, 500)),
+            "change": float(rng.normal()),
+            "change_percent": float(rng.normal(0, 2))
+        }
+        for n in range(symbols)
+    }
+    documents = [
+        {"content": "Chipmakers rallied after data center revenue beat estimates. " * 4, "metadata": {"source": "news"}},
+        {"content": "Treasury yields rose as the Fed held rates steady. " * 4, "metadata": {"source": "news"}}
+    ]
+    return LanguageRequest(
+        market_data=market_data,
+        analysis_results={"analysis": {"risk_score": 6.2, "volatility": 23.5, "sector_diversification": 0.6}},
+        retrieved_documents=documents,
+        query=f"What's our tech exposure today? ({i})",
+        backend=backend
+    )
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+async def measure(backend: str, requests: int, symbols: int):
+    rng = np.random.default_rng(0)
+    totals, first_tokens = [], []
+    for i in range(requests):
+        request = sample_request(i, symbols, backend, rng)
+        start = perf_counter()
+        await language_service.generate_response(request)
+        totals.append(perf_counter() - start)
+
+        start = perf_counter()
+        first_token = None
+        # Read to the end so the stream releases its dispatcher slot
+        async for event in language_service.stream_response(request):
+            if event["type"] == "token" and first_token is None:
+                first_token = perf_counter() - start
+        first_tokens.append(first_token)
+    return totals, first_tokens
+
+async def run(args):
+    for backend in language_service.backends:
+        totals, first_tokens = await measure(backend, args.requests, args.symbols)
+        print(f"   🧠 {backend:<9} response p50 {percentile(totals, 50):8.2f} ms  p95 {percentile(totals, 95):8.2f} ms  "
+              f"| first token p50 {statistics.median(first_tokens) * 1000:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.8, help="fake provider seconds to first token")
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    parser.add_argument("--live", action="store_true", help="call the configured OpenAI endpoint instead")
+    parser.add_argument("--llm-port", type=int, default=9000)
+    args = parser.parse_args()
+
+    if not args.live:
+        serve_in_thread(create_app(args.latency, args.token_latency), args.llm_port)
+        language_service.backends["openai"] = OpenAIBackend("fake", "gpt-3.5-turbo", f"http://127.0.0.1:{args.llm_port}/v1")
+    language_service.cache = None
+    language_service.semantic_cache = None
+
+    target = "live OpenAI" if args.live else f"fake server, {args.latency}s to first token"
+    print(f"⏱️ {args.requests} requests per backend, {args.symbols} symbols ({target})")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Drive the language agent's LLM dispatcher with a burst against the fake completion server.
+
+A burst of background report requests is followed shortly by interactive
+chat requests. Reports queue times per priority, requests shed at their
+deadline and the peak concurrency the fake server actually saw.
+
+Usage: python -m benchmarks.bench_llm_dispatch [--background 40] [--interactive 10] [--max-in-flight 4]
+"""
+import argparse
+import asyncio
+import json
+from time import perf_counter
+from urllib.request import urlopen
+
+from agents.language_agent import LanguageRequest, language_service
+from agents.llm_backends import OpenAIBackend
+from agents.llm_dispatcher import DeadlineExceeded, LLMDispatcher
+from benchmarks.fake_llm_server import create_app, serve_in_thread
+
+def request(i: int, priority: str, deadline: float) -> LanguageRequest:
+    return LanguageRequest(
+        market_data={},
+        analysis_results={},
+        retrieved_documents=[],
+        # Distinct queries, so no response is served from a cache
+        query=f"{priority} request {i}",
+        priority=priority,
+        deadline=deadline
+    )
+
+async def run(args) -> dict:
+    outcomes = {"completed": 0, "shed": 0}
+
+    async def call(req: LanguageRequest, delay: float):
+        await asyncio.sleep(delay)
+        try:
+            await language_service.generate_response(req)
+            outcomes["completed"] += 1
+        except DeadlineExceeded:
+            outcomes["shed"] += 1
+
+    start = perf_counter()
+    await asyncio.gather(
+        *(call(request(i, "background", args.background_deadline), 0.0) for i in range(args.background)),
+        *(call(request(i, "interactive", args.interactive_deadline), args.interactive_delay)
+          for i in range(args.interactive))
+    )
+    outcomes["wall_time"] = perf_counter() - start
+    return outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--background", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per fake completion")
+    parser.add_argument("--interactive-delay", type=float, default=0.2, help="seconds after the background burst")
+    parser.add_argument("--interactive-deadline", type=float, default=2.0)
+    parser.add_argument("--background-deadline", type=float, default=3.0)
+    parser.add_argument("--llm-port", type=int, default=9000)
+    args = parser.parse_args()
+
+    fake = create_app(args.latency, 0.0)
+    serve_in_thread(fake, args.llm_port)
+    language_service.backends["openai"] = OpenAIBackend("fake", "gpt-3.5-turbo", f"http://127.0.0.1:{args.llm_port}/v1")
+    language_service.cache = None
+    language_service.semantic_cache = None
+    language_service.dispatcher = LLMDispatcher(args.max_in_flight)
+
+    print(f"🚦 {args.background} background + {args.interactive} interactive requests, "
+          f"{args.max_in_flight} in flight, {args.latency}s per completion")
+    outcomes = asyncio.run(run(args))
+    with urlopen(f"http://127.0.0.1:{args.llm_port}/health") as response:
+        server = json.load(response)
+
+    stats = language_service.dispatcher.stats()
+    for priority, metrics in stats["priorities"].items():
+        print(f"   📊 {priority:<11} dispatched {metrics['dispatched']:3d}  shed {metrics['shed']:3d}  "
+              f"queue avg {metrics['avg_queue_time']:.3f}s  p95 {metrics['p95_queue_time']:.3f}s  "
+              f"max {metrics['max_queue_time']:.3f}s")
+    print(f"   ✅ completed {outcomes['completed']}, shed {outcomes['shed']} in {outcomes['wall_time']:.2f}s; "
+          f"fake server peak in flight {server['peak_in_flight']} (limit {args.max_in_flight})")
+
+if __name__ == "__main__":
+    main()
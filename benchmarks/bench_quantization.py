@@ -0,0 +1,67 @@
+"""Report memory and recall of quantized vector storage, with and without float re-ranking.
+
+Uses the same synthetic clustered corpus as bench_vector_index; re-ranking
+re-scores the top k * factor quantized candidates with exact float vectors.
+
+Usage: python -m benchmarks.bench_quantization [--vectors 200000] [--dim 384] [--rerank-factor 4]
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.bench_vector_index import recall_at_k, synthetic_corpus
+from data_ingestion.vector_index import build_index, index_memory_bytes, train_index
+
+def rerank(corpus: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    reranked = np.empty((len(queries), k), dtype=np.int64)
+    for row, (query, ids) in enumerate(zip(queries, candidates)):
+        ids = ids[ids >= 0]
+        reranked[row] = ids[np.argsort(-(corpus[ids] @ query), kind="stable")[:k]]
+    return reranked
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--types", default="flat,ivf_flat,hnsw")
+    parser.add_argument("--nlist", type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    corpus = synthetic_corpus(args.vectors + args.queries, args.dim, clusters=256, rng=rng)
+    corpus, queries = corpus[:args.vectors], corpus[args.vectors:]
+    float_bytes = corpus.nbytes
+    print(f"📐 {args.vectors} vectors x {args.dim} dims, recall@{args.k}, re-rank factor {args.rerank_factor}")
+
+    exact = build_index("flat", args.dim)
+    exact.add(corpus)
+    _, truth = exact.search(queries, args.k)
+
+    for index_type in args.types.split(","):
+        for quantization in ("none", "sq8", "pq"):
+            index = build_index(index_type, args.dim, nlist=args.nlist, pq_m=args.pq_m, quantization=quantization)
+            train_index(index, corpus)
+            index.add(corpus)
+            memory = index_memory_bytes(index)
+
+            start = perf_counter()
+            _, found = index.search(queries, args.k)
+            qps = len(queries) / (perf_counter() - start)
+            line = (f"   📦 {index_type:<8} {quantization:<4} {memory / 2 ** 20:8.1f} MiB "
+                    f"({float_bytes / memory:4.1f}x smaller than float vectors)  "
+                    f"recall {recall_at_k(found, truth):.3f}  {qps:8.0f} QPS")
+            if quantization != "none" and args.rerank_factor > 0:
+                start = perf_counter()
+                _, candidates = index.search(queries, args.k * args.rerank_factor)
+                reranked = rerank(corpus, queries, candidates, args.k)
+                qps = len(queries) / (perf_counter() - start)
+                line += f"  | re-ranked recall {recall_at_k(reranked, truth):.3f}  {qps:8.0f} QPS"
+            print(line)
+
+if __name__ == "__main__":
+    main()
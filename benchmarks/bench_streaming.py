@@ -0,0 +1,75 @@
+"""Compare time-to-first-token and total latency of /synthesize and /synthesize/stream.
+
+Starts the fake LLM server and the language agent on local ports, with the
+response cache disabled so every request reaches the model.
+
+Usage: python -m benchmarks.bench_streaming [--requests 5] [--first-token-latency 0.5] [--token-latency 0.02]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+from time import perf_counter
+
+import aiohttp
+
+from agents.language_agent import app as language_app, language_service
+from agents.llm_backends import OpenAIBackend
+from benchmarks.fake_llm_server import create_app, serve_in_thread
+
+PAYLOAD = {
+    "market_data": {"AAPL": {"current_price": 190.1, "change": 1.2, "change_percent": 0.6}},
+    "analysis_results": {"analysis": {"risk_score": 6.1, "volatility": 24.0}},
+    "retrieved_documents": [],
+    "query": "What's our risk exposure in tech stocks today?",
+    "response_type": "detailed"
+}
+
+async def timed_request(session: aiohttp.ClientSession, url: str, stream: bool):
+    """(seconds to first token, total seconds, response text)"""
+    start = perf_counter()
+    first_token = None
+    async with session.post(url, json=PAYLOAD) as response:
+        if not stream:
+            data = await response.json()
+            total = perf_counter() - start
+            return total, total, data["response"]
+        text = ""
+        async for line in response.content:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event["type"] == "token":
+                first_token = first_token or perf_counter() - start
+            elif event["type"] == "done":
+                text = event["response"]
+    return first_token, perf_counter() - start, text
+
+async def run(base_url: str, requests: int):
+    async with aiohttp.ClientSession() as session:
+        for name, path, stream in (("blocking", "/synthesize", False), ("streaming", "/synthesize/stream", True)):
+            results = [await timed_request(session, base_url + path, stream) for _ in range(requests)]
+            first, total = [r[0] for r in results], [r[1] for r in results]
+            print(f"   📡 {name:<9} first token {statistics.median(first) * 1000:7.1f} ms  "
+                  f"total {statistics.median(total) * 1000:7.1f} ms  ({len(results[0][2])} chars)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    parser.add_argument("--llm-port", type=int, default=9000)
+    parser.add_argument("--agent-port", type=int, default=9005)
+    args = parser.parse_args()
+
+    serve_in_thread(create_app(args.first_token_latency, args.token_latency), args.llm_port)
+    language_service.backends["openai"] = OpenAIBackend("fake", "gpt-3.5-turbo", f"http://127.0.0.1:{args.llm_port}/v1")
+    language_service.cache = None
+    serve_in_thread(language_app, args.agent_port)
+
+    print(f"⏱️ Median of {args.requests} requests, first token {args.first_token_latency}s, "
+          f"{args.token_latency}s per token")
+    asyncio.run(run(f"http://127.0.0.1:{args.agent_port}", args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark recall@k and QPS of ANN index types against exact flat search.
+
+Builds a synthetic clustered corpus of unit vectors, takes IndexFlatIP results
+as ground truth and sweeps nprobe (IVF) and efSearch (HNSW).
+
+Usage: python -m benchmarks.bench_vector_index [--vectors 1000000] [--dim 64] [--queries 1000]
+"""
+import argparse
+from time import perf_counter
+
+import faiss
+import numpy as np
+
+from data_ingestion.vector_index import build_index, search_params, train_index
+
+def synthetic_corpus(count: int, dimension: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors scattered around random cluster centres, like topic embeddings"""
+    centres = rng.standard_normal((clusters, dimension), dtype=np.float32)
+    vectors = np.empty((count, dimension), dtype=np.float32)
+    chunk = 100_000
+    for start in range(0, count, chunk):
+        size = min(chunk, count - start)
+        labels = rng.integers(clusters, size=size)
+        vectors[start:start + size] = centres[labels] + 0.6 * rng.standard_normal((size, dimension), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(np.intersect1d(row, expected)) for row, expected in zip(found, truth))
+    return hits / truth.size
+
+def timed_search(index, queries: np.ndarray, k: int, params=None):
+    start = perf_counter()
+    _, found = index.search(queries, k, params=params)
+    return found, len(queries) / (perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--train-sample", type=int, default=100_000)
+    parser.add_argument("--types", default="ivf_flat,ivf_pq,hnsw")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    corpus = synthetic_corpus(args.vectors + args.queries, args.dim, clusters=max(args.nlist // 4, 16), rng=rng)
+    corpus, queries = corpus[:args.vectors], corpus[args.vectors:]
+    print(f"📐 {args.vectors} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+
+    flat = build_index("flat", args.dim)
+    flat.add(corpus)
+    truth, flat_qps = timed_search(flat, queries, args.k)
+    print(f"   📏 flat      exact            recall 1.000  {flat_qps:9.0f} QPS")
+
+    sweeps = {
+        "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+        "ivf_pq": ("nprobe", [1, 4, 16, 64]),
+        "hnsw": ("efSearch", [16, 32, 64, 128])
+    }
+    for index_type in args.types.split(","):
+        index = build_index(index_type, args.dim, nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+        start = perf_counter()
+        train_index(index, corpus, args.train_sample)
+        index.add(corpus)
+        print(f"   🏗️  {index_type} built in {perf_counter() - start:.1f}s")
+
+        name, values = sweeps[index_type]
+        for value in values:
+            params = search_params(index, **{"nprobe" if name == "nprobe" else "ef_search": value})
+            found, qps = timed_search(index, queries, args.k, params)
+            print(f"   ⚡ {index_type:<9} {name}={value:<7} recall {recall_at_k(found, truth):.3f}  "
+                  f"{qps:9.0f} QPS  ({qps / flat_qps:.1f}x flat)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""OpenAI-compatible chat completion server with injected latency, for local testing.
+
+Serves POST /v1/chat/completions, streamed (SSE) or not, answering every
+request with the same canned text. Point the language agent at it with
+OPENAI_BASE_URL=http://localhost:9000/v1 and any OPENAI_API_KEY.
+
+Usage: python -m benchmarks.fake_llm_server [--port 9000] [--first-token-latency 0.5] [--token-latency 0.02]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_TEXT = (
+    "Tech exposure is elevated relative to the benchmark and volatility has risen this week. "
+    "Earnings surprises were mixed, with two holdings beating estimates. "
+    "Consider trimming concentrated positions to keep sector risk within limits."
+)
+
+def create_app(first_token_latency: float = 0.5, token_latency: float = 0.02, text: str = DEFAULT_TEXT) -> FastAPI:
+    """Fake completion app; completions take first_token_latency + token_latency per token"""
+    app = FastAPI(title="Fake LLM", description="OpenAI-compatible completions with injected latency")
+    # Whitespace-preserving word tokens, so joined tokens reproduce the text
+    tokens = [word + " " for word in text.split(" ")]
+    tokens[-1] = tokens[-1].rstrip()
+    app.state.requests = 0
+    app.state.in_flight = 0
+    app.state.peak_in_flight = 0
+
+    def chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        max_tokens = body.get("max_tokens") or len(tokens)
+        reply = tokens[:max_tokens]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        app.state.requests += 1
+        app.state.in_flight += 1
+        app.state.peak_in_flight = max(app.state.peak_in_flight, app.state.in_flight)
+
+        if body.get("stream"):
+            async def events():
+                try:
+                    await asyncio.sleep(first_token_latency)
+                    yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                    for i, token in enumerate(reply):
+                        if i:
+                            await asyncio.sleep(token_latency)
+                        yield chunk(completion_id, model, {"content": token})
+                    yield chunk(completion_id, model, {}, finish_reason="stop")
+                    yield "data: [DONE]\n\n"
+                finally:
+                    app.state.in_flight -= 1
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        try:
+            await asyncio.sleep(first_token_latency + token_latency * max(len(reply) - 1, 0))
+        finally:
+            app.state.in_flight -= 1
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(reply)},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(reply), "total_tokens": len(reply)}
+        }
+
+    @app.get("/health")
+    async def health_check():
+        return {
+            "status": "healthy",
+            "service": "fake_llm",
+            "requests": app.state.requests,
+            "in_flight": app.state.in_flight,
+            "peak_in_flight": app.state.peak_in_flight
+        }
+
+    return app
+
+def serve_in_thread(app: FastAPI, port: int):
+    """Run app with uvicorn on a daemon thread; returns the server once it accepts connections"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--first-token-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"🤖 Fake LLM on http://localhost:{args.port}/v1 "
+          f"(first token {args.first_token_latency}s, {args.token_latency}s per token)")
+    uvicorn.run(create_app(args.first_token_latency, args.token_latency), host="0.0.0.0", port=args.port)
+
+if __name__ == "__main__":
+    main()
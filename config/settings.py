@@ -33,7 +33,7 @@
 
 # settings = Settings()
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings:
     # API Keys
@@ -41,11 +41,129 @@ class Settings:
     FINNHUB_API_KEY: Optional[str] = os.getenv("FINNHUB_API_KEY")
     ALPHA_VANTAGE_API_KEY: Optional[str] = os.getenv("ALPHA_VANTAGE_API_KEY")
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
+    # OpenAI-compatible endpoint for the language agent, e.g. benchmarks/fake_llm_server.py
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    # Default language agent backend: "openai", or "template" for in-process offline summaries
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "openai")
     
     # Model settings
     WHISPER_MODEL: str = "base"
     
     # Portfolio file path
     PORTFOLIO_FILE: str = os.getenv("PORTFOLIO_FILE", "data/portfolio.json")
+    # Optional columnar, memory-mapped portfolio directory; used instead of PORTFOLIO_FILE when set
+    PORTFOLIO_COLUMNAR_DIR: Optional[str] = os.getenv("PORTFOLIO_COLUMNAR_DIR")
+    # Seconds between portfolio file mtime checks; 0 disables hot reload
+    PORTFOLIO_RELOAD_INTERVAL: float = float(os.getenv("PORTFOLIO_RELOAD_INTERVAL", "5"))
+
+    # API agent fan-out: concurrent symbol fetches and overall deadline (seconds)
+    MARKET_DATA_CONCURRENCY: int = int(os.getenv("MARKET_DATA_CONCURRENCY", "20"))
+    MARKET_DATA_DEADLINE: float = float(os.getenv("MARKET_DATA_DEADLINE", "25"))
+    # Smallest batch of cache misses worth a Polygon grouped-daily call (whole market, one token)
+    POLYGON_GROUPED_MIN_SYMBOLS: int = int(os.getenv("POLYGON_GROUPED_MIN_SYMBOLS", "20"))
+
+    # API agent quote cache: TTL (seconds) per provider, bounded by entry count
+    QUOTE_CACHE_MAX_ENTRIES: int = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "5000"))
+    QUOTE_CACHE_DEFAULT_TTL: float = float(os.getenv("QUOTE_CACHE_DEFAULT_TTL", "5"))
+    QUOTE_CACHE_TTLS: Dict[str, float] = {
+        "polygon": float(os.getenv("POLYGON_QUOTE_TTL", "300")),  # previous-day aggregates
+        "finnhub": float(os.getenv("FINNHUB_QUOTE_TTL", "5")),
+        "alpha_vantage": float(os.getenv("ALPHA_VANTAGE_QUOTE_TTL", "60"))
+    }
+
+    # Upstream provider budgets (requests per minute) for the API agent's token buckets
+    PROVIDER_RATE_LIMITS: Dict[str, float] = {
+        "polygon": float(os.getenv("POLYGON_RATE_LIMIT", "5")),
+        "finnhub": float(os.getenv("FINNHUB_RATE_LIMIT", "60")),
+        "alpha_vantage": float(os.getenv("ALPHA_VANTAGE_RATE_LIMIT", "5"))
+    }
+
+    # Analysis agent Monte Carlo VaR: path counts above the threshold use a process pool
+    MONTE_CARLO_MAX_PATHS: int = int(os.getenv("MONTE_CARLO_MAX_PATHS", "5000000"))
+    MONTE_CARLO_PARALLEL_THRESHOLD: int = int(os.getenv("MONTE_CARLO_PARALLEL_THRESHOLD", "200000"))
+    MONTE_CARLO_WORKERS: int = int(os.getenv("MONTE_CARLO_WORKERS", str(os.cpu_count() or 1)))
+
+    # Analysis agent incremental sessions kept in memory (oldest evicted first)
+    ANALYSIS_MAX_SESSIONS: int = int(os.getenv("ANALYSIS_MAX_SESSIONS", "1000"))
+
+    # Embedding service vector index: flat, ivf_flat, ivf_pq or hnsw
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "flat")
+    VECTOR_INDEX_NLIST: int = int(os.getenv("VECTOR_INDEX_NLIST", "1024"))
+    VECTOR_INDEX_NPROBE: int = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+    VECTOR_INDEX_PQ_M: int = int(os.getenv("VECTOR_INDEX_PQ_M", "16"))
+    VECTOR_INDEX_PQ_BITS: int = int(os.getenv("VECTOR_INDEX_PQ_BITS", "8"))
+    VECTOR_INDEX_HNSW_M: int = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+    VECTOR_INDEX_EF_CONSTRUCTION: int = int(os.getenv("VECTOR_INDEX_EF_CONSTRUCTION", "200"))
+    VECTOR_INDEX_EF_SEARCH: int = int(os.getenv("VECTOR_INDEX_EF_SEARCH", "64"))
+    VECTOR_INDEX_TRAIN_SAMPLE: int = int(os.getenv("VECTOR_INDEX_TRAIN_SAMPLE", "100000"))
+    # Stored vector quantization (none, sq8 or pq); with a re-rank factor > 0 the top
+    # k * factor candidates are re-scored with float vectors kept in a memory-mapped file
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none")
+    VECTOR_RERANK_FACTOR: int = int(os.getenv("VECTOR_RERANK_FACTOR", "0"))
+
+    # Embedding computation: encode batch size, content-hash cache (optional SQLite file)
+    # and a process pool for large uncached batches on CPU-only hosts
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+    EMBEDDING_CACHE_PATH: Optional[str] = os.getenv("EMBEDDING_CACHE_PATH")
+    EMBEDDING_ENCODE_WORKERS: int = int(os.getenv("EMBEDDING_ENCODE_WORKERS", "1"))
+    EMBEDDING_PARALLEL_THRESHOLD: int = int(os.getenv("EMBEDDING_PARALLEL_THRESHOLD", "1000"))
+
+    # Sharded embedding index: shard by "date" (day/month/year buckets) or "symbol" hash,
+    # optional retention for date shards (0 keeps everything) and search fan-out threads
+    VECTOR_SHARD_BY: str = os.getenv("VECTOR_SHARD_BY", "date")
+    VECTOR_SHARD_COUNT: int = int(os.getenv("VECTOR_SHARD_COUNT", "8"))
+    VECTOR_SHARD_DATE_BUCKET: str = os.getenv("VECTOR_SHARD_DATE_BUCKET", "month")
+    VECTOR_SHARD_RETENTION_DAYS: float = float(os.getenv("VECTOR_SHARD_RETENTION_DAYS", "0"))
+    VECTOR_SEARCH_WORKERS: int = int(os.getenv("VECTOR_SEARCH_WORKERS", "4"))
+
+    # TF-IDF fallback (no SentenceTransformers): features kept, most frequent terms first
+    TFIDF_MAX_FEATURES: int = int(os.getenv("TFIDF_MAX_FEATURES", "1000"))
+
+    # Embedding service lexical search and hybrid (BM25 + vector) rank fusion
+    BM25_K1: float = float(os.getenv("BM25_K1", "1.5"))
+    BM25_B: float = float(os.getenv("BM25_B", "0.75"))
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+
+    # Language agent response cache: "memory" (LRU), "disk" (SQLite file) or "none".
+    # Entries expire with the stalest quote they were built from (QUOTE_CACHE_TTLS);
+    # responses without market data use RESPONSE_CACHE_EMPTY_TTL
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "data/response_cache.sqlite")
+    RESPONSE_CACHE_EMPTY_TTL: float = float(os.getenv("RESPONSE_CACHE_EMPTY_TTL", "300"))
+    # Semantic response cache: reuse the answer to a near-duplicate query (embedding cosine
+    # similarity >= threshold) over the same market data and retrieved documents; 0 entries disables it
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+    # Language agent LLM dispatch: concurrent completions, and how long each priority may
+    # queue for a slot before it is shed (requests can pass their own deadline)
+    LLM_MAX_IN_FLIGHT: int = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+    LLM_QUEUE_DEADLINES: Dict[str, float] = {
+        "interactive": float(os.getenv("LLM_INTERACTIVE_DEADLINE", "10")),
+        "background": float(os.getenv("LLM_BACKGROUND_DEADLINE", "120"))
+    }
+
+    # Language agent prompt context: token budget for quotes, analysis and document snippets,
+    # the share of it kept for documents when they need it, and characters per snippet
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+    CONTEXT_DOCUMENT_SHARE: float = float(os.getenv("CONTEXT_DOCUMENT_SHARE", "0.4"))
+    CONTEXT_SNIPPET_CHARS: int = int(os.getenv("CONTEXT_SNIPPET_CHARS", "150"))
+
+    # Orchestrator -> agent HTTP connection pools (one pool per agent)
+    AGENT_POOL_SIZE: int = int(os.getenv("AGENT_POOL_SIZE", "100"))
+    AGENT_KEEPALIVE_TIMEOUT: float = float(os.getenv("AGENT_KEEPALIVE_TIMEOUT", "30"))
+    AGENT_DEFAULT_TIMEOUT: float = float(os.getenv("AGENT_DEFAULT_TIMEOUT", "30"))
+    AGENT_TIMEOUTS: Dict[str, float] = {
+        "retriever": float(os.getenv("RETRIEVER_AGENT_TIMEOUT", "10")),
+        "analysis": float(os.getenv("ANALYSIS_AGENT_TIMEOUT", "15")),
+        "api": float(os.getenv("API_AGENT_TIMEOUT", "30")),
+        "language": float(os.getenv("LANGUAGE_AGENT_TIMEOUT", "60")),
+        "scraping": float(os.getenv("SCRAPING_AGENT_TIMEOUT", "20")),
+        "voice": float(os.getenv("VOICE_AGENT_TIMEOUT", "120"))
+    }
 
 settings = Settings()
\ No newline at end of file
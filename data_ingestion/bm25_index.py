@@ -0,0 +1,111 @@
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+import math
+import re
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# Keeps dotted tickers such as BRK.B together; "$AAPL" indexes as "aapl"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
+
+class BM25Index:
+    """Okapi BM25 over an append-only inverted index
+
+    Each term's postings are compact arrays of document ids (increasing,
+    since documents are only appended) and term frequencies, read as NumPy
+    views at query time. Queries use term-level MaxScore pruning: terms are
+    visited by decreasing score upper bound and, once the remaining terms
+    can no longer lift an unseen document into the top k, those terms are
+    only looked up for the current candidates instead of being scanned.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.lengths = array("I")
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, documents: List[str]):
+        for document in documents:
+            doc_id = len(self.lengths)
+            tokens = tokenize(document)
+            for term, count in Counter(tokens).items():
+                ids, tfs = self.postings.setdefault(term, (array("i"), array("f")))
+                ids.append(doc_id)
+                tfs.append(count)
+            self.lengths.append(len(tokens))
+            self.total_length += len(tokens)
+
+    def _idf(self, document_frequency: int) -> float:
+        return math.log(1 + (len(self.lengths) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _term_scores(self, ids: np.ndarray, tfs: np.ndarray, idf: float, lengths: np.ndarray,
+                     average_length: float) -> np.ndarray:
+        norm = self.k1 * (1 - self.b + self.b * lengths[ids] / average_length)
+        return idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, document ids) by BM25, best first"""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+        if not terms or k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+        average_length = self.total_length / len(self.lengths) or 1.0
+        weighted = []
+        for term in terms:
+            ids, tfs = self.postings[term]
+            idf = self._idf(len(ids))
+            # BM25 term score tends to idf * (k1 + 1) as tf grows
+            weighted.append((idf * (self.k1 + 1), idf, np.frombuffer(ids, dtype=np.int32), np.frombuffer(tfs, dtype=np.float32)))
+        weighted.sort(key=lambda item: item[0], reverse=True)
+        remaining_bounds = np.cumsum([bound for bound, *_ in weighted][::-1])[::-1]
+
+        candidates = np.empty(0, dtype=np.int32)
+        scores = np.empty(0)
+        threshold = 0.0
+        for position, (_, idf, ids, tfs) in enumerate(weighted):
+            if len(candidates) >= k and remaining_bounds[position] <= threshold:
+                # No unseen document can reach the top k: score candidates only
+                for _, idf, ids, tfs in weighted[position:]:
+                    slots = np.searchsorted(ids, candidates)
+                    slots[slots == len(ids)] = 0
+                    hit = ids[slots] == candidates
+                    scores[hit] += self._term_scores(ids[slots[hit]], tfs[slots[hit]], idf, lengths, average_length)
+                break
+            term_scores = self._term_scores(ids, tfs, idf, lengths, average_length)
+            if not len(candidates):
+                candidates, scores = ids, term_scores
+            elif len(candidates) + len(ids) > len(lengths) // 8:
+                # Dense accumulator beats sorting when postings cover much of the corpus
+                accumulator = np.zeros(len(lengths))
+                accumulator[candidates] = scores
+                accumulator[ids] += term_scores
+                candidates = np.flatnonzero(accumulator).astype(np.int32)
+                scores = accumulator[candidates]
+            else:
+                candidates, inverse = np.unique(np.concatenate([candidates, ids]), return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate([scores, term_scores]), minlength=len(candidates))
+            if len(candidates) >= k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], candidates[top].astype(np.int64)
+
+def reciprocal_rank_fusion(rankings: List[np.ndarray], k: int, rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists by sum of 1 / (rrf_k + rank); top-k (id, score), best first"""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[int(doc_id)] = fused.get(int(doc_id), 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
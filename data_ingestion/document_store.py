@@ -0,0 +1,120 @@
+"""Append-only, memory-mapped store for embedded documents.
+
+A store at <path> is two files:
+
+    <path>.seg   JSON records ({"content", "metadata"}) written back to back
+    <path>.idx   little-endian uint64 end offset of each record in .seg
+
+Both files are only ever appended to. Opening a store maps them read-only,
+so it costs the same for ten documents or ten million, and every process
+that opens the same store shares one copy in the page cache. Saving writes
+only the documents added since the last save: records go to .seg first and
+their offsets to .idx after, so a reader never sees an offset whose record
+is incomplete.
+"""
+from typing import Dict, Iterator, List, Optional
+import json
+import mmap
+import os
+import shutil
+import numpy as np
+
+SEGMENT_SUFFIX = ".seg"
+OFFSETS_SUFFIX = ".idx"
+OFFSET_DTYPE = np.dtype("<u8")
+
+class DocumentStore:
+    """List-like document store: persisted records are memory-mapped, new ones pending in memory"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = None
+        self.pending: List[Dict] = []
+        self._segment = None
+        self._ends = np.empty(0, dtype=OFFSET_DTYPE)
+        if path:
+            self.open(path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(path + SEGMENT_SUFFIX) and os.path.exists(path + OFFSETS_SUFFIX)
+
+    def open(self, path: str):
+        """Map an existing store; documents not yet saved are discarded"""
+        self.path = path
+        self.pending = []
+        self._map()
+
+    def refresh(self):
+        """Pick up records another process has appended since this store was mapped"""
+        if self.path and os.path.getsize(self.path + OFFSETS_SUFFIX) // OFFSET_DTYPE.itemsize > len(self._ends):
+            self._map()
+
+    def _map(self):
+        count = os.path.getsize(self.path + OFFSETS_SUFFIX) // OFFSET_DTYPE.itemsize
+        self._ends = (np.memmap(self.path + OFFSETS_SUFFIX, dtype=OFFSET_DTYPE, mode="r", shape=(count,))
+                      if count else np.empty(0, dtype=OFFSET_DTYPE))
+        self._segment = None
+        if count and self._ends[-1]:
+            with open(self.path + SEGMENT_SUFFIX, "rb") as f:
+                self._segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def persisted(self) -> int:
+        return len(self._ends)
+
+    def __len__(self) -> int:
+        return self.persisted + len(self.pending)
+
+    def __getitem__(self, position: int) -> Dict:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("document index out of range")
+        if position >= self.persisted:
+            return self.pending[position - self.persisted]
+        start = int(self._ends[position - 1]) if position else 0
+        return json.loads(self._segment[start:int(self._ends[position])])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(len(self)):
+            yield self[position]
+
+    def append(self, document: Dict):
+        self.pending.append(document)
+
+    def extend(self, documents: List[Dict]):
+        self.pending.extend(documents)
+
+    def save(self, path: str):
+        """Persist to path, appending only pending documents when path is the open store"""
+        if path != self.path:
+            if self.path:
+                # Copy the persisted part, then continue appending at the new location
+                shutil.copyfile(self.path + SEGMENT_SUFFIX, path + SEGMENT_SUFFIX)
+                shutil.copyfile(self.path + OFFSETS_SUFFIX, path + OFFSETS_SUFFIX)
+            else:
+                for suffix in (SEGMENT_SUFFIX, OFFSETS_SUFFIX):
+                    open(path + suffix, "wb").close()
+            self.path = path
+
+        encoded = [json.dumps(document, default=str).encode("utf-8") for document in self.pending]
+        base = int(self._ends[-1]) if self.persisted else 0
+        ends = base + np.cumsum([len(record) for record in encoded], dtype=np.uint64)
+
+        # Drop the tail of a save that was interrupted before its offsets were written
+        with open(path + SEGMENT_SUFFIX, "r+b") as f:
+            f.truncate(base)
+            f.seek(base)
+            for record in encoded:
+                f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(path + OFFSETS_SUFFIX, "r+b") as f:
+            f.truncate(self.persisted * OFFSET_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(ends.astype(OFFSET_DTYPE).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.pending = []
+        self._map()
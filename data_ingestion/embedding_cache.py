@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import sqlite3
+import numpy as np
+
+def content_key(model_name: str, text: str) -> bytes:
+    """Cache key for text embedded by model_name"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+class EmbeddingCache:
+    """Content-hash keyed embeddings: in-memory LRU over an optional SQLite store
+
+    Syndicated headlines and re-ingested filings repeat verbatim, so each
+    distinct text is encoded once. Entries evicted from memory stay in the
+    disk store (when configured) and survive restarts.
+    """
+
+    def __init__(self, max_entries: int, disk_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.disk = None
+        if disk_path:
+            self.disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self.disk.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB)")
+        self.counters = {"hits": 0, "disk_hits": 0, "duplicates": 0, "encoded": 0, "evictions": 0}
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self.entries[key] = vector
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Cached vectors for the distinct keys found in memory or on disk"""
+        found, missing = {}, []
+        for key in dict.fromkeys(keys):
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                found[key] = vector
+                self.counters["hits"] += 1
+            else:
+                missing.append(key)
+
+        if self.disk is not None and missing:
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self.disk.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.counters["disk_hits"] += 1
+        self.counters["duplicates"] += len(keys) - len(set(keys))
+        return found
+
+    def set_many(self, vectors: Dict[bytes, np.ndarray]):
+        for key, vector in vectors.items():
+            self._remember(key, vector)
+        self.counters["encoded"] += len(vectors)
+        if self.disk is not None and vectors:
+            with self.disk:
+                self.disk.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in vectors.items()]
+                )
+
+    def stats(self) -> Dict:
+        avoided = self.counters["hits"] + self.counters["disk_hits"] + self.counters["duplicates"]
+        requested = avoided + self.counters["encoded"]
+        return {
+            **self.counters,
+            "avoided": avoided,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "avoided_rate": round(avoided / requested, 3) if requested else 0.0
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
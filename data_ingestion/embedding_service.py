@@ -1,82 +1,193 @@
 # data_ingestion/embedding_service.py - FIXED VERSION
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 import pickle
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
 from dotenv import load_dotenv
+from config.settings import settings
+from data_ingestion.bm25_index import BM25Index, reciprocal_rank_fusion
+from data_ingestion.document_store import DocumentStore
+from data_ingestion.embedding_cache import EmbeddingCache, content_key
+from data_ingestion.sparse_index import IncrementalTfidfIndex
+from data_ingestion.vector_index import build_index, is_quantized, min_training_size, search_params, train_index
+from data_ingestion.vector_store import FloatVectorStore
 load_dotenv()
 
 class EmbeddingService:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
-        self.documents = []
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", index_type: str = None,
+                 model=None, embedding_cache: Optional[EmbeddingCache] = None, load_model: bool = True):
+        """model and embedding_cache may be shared with other instances, e.g. index shards
+
+        A model passed in is used as-is (anything with SentenceTransformer's
+        encode and get_sentence_embedding_dimension); otherwise model_name is loaded.
+
+        load_model=False goes straight to the TF-IDF fallback, for callers that
+        already know SentenceTransformers cannot be loaded.
+        """
+        self.documents = DocumentStore()
         self.use_sentence_transformers = False
+        self.index_type = index_type or settings.VECTOR_INDEX_TYPE
+        # IVF indexes hold vectors here, searched exhaustively, until there are enough to train on
+        self.staging = None
+        # Float copies of quantized vectors, read back to re-rank candidates
+        self.rerank_store = None
+        self.model_name = model_name
+        self.encode_pool = None
+        self.bm25 = BM25Index(settings.BM25_K1, settings.BM25_B)
+        self.owns_embedding_cache = embedding_cache is None
+
+        if not load_model:
+            self.sparse_index = IncrementalTfidfIndex(max_features=settings.TFIDF_MAX_FEATURES)
+            return
         
         # Try to use sentence-transformers with proper authentication
         try:
-            from sentence_transformers import SentenceTransformer
-            
-            # Check for HuggingFace token
-            hf_token = os.getenv("HUGGINGFACE_API_KEY") or os.getenv("HF_TOKEN")
-            
-            if hf_token:
-                # Set the token for authentication
-                os.environ["HF_TOKEN"] = hf_token
-                
-            # Try to load the model
-            self.model = SentenceTransformer(model_name, use_auth_token=hf_token)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+
+                # Check for HuggingFace token
+                hf_token = os.getenv("HUGGINGFACE_API_KEY") or os.getenv("HF_TOKEN")
+
+                if hf_token:
+                    # Set the token for authentication
+                    os.environ["HF_TOKEN"] = hf_token
+
+                # Try to load the model
+                model = SentenceTransformer(model_name, use_auth_token=hf_token)
+            self.model = model
             self.dimension = self.model.get_sentence_embedding_dimension()
+            self.embedding_cache = embedding_cache or EmbeddingCache(
+                settings.EMBEDDING_CACHE_MAX_ENTRIES, settings.EMBEDDING_CACHE_PATH
+            )
             
             # Try to load FAISS
-            import faiss
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self._reset_index()
             self.use_sentence_transformers = True
-            print("✅ Using SentenceTransformers with FAISS")
+            print(f"✅ Using SentenceTransformers with FAISS ({self.index_type} index)")
             
         except Exception as e:
             print(f"⚠️ SentenceTransformers failed: {e}")
             print("🔄 Falling back to TF-IDF embeddings")
             
             # Fallback to TF-IDF
-            self.vectorizer = TfidfVectorizer(
-                max_features=1000,
-                stop_words='english',
-                ngram_range=(1, 2)
-            )
-            self.embeddings_matrix = None
+            self.sparse_index = IncrementalTfidfIndex(max_features=settings.TFIDF_MAX_FEATURES)
+
+    def _reset_index(self):
+        import faiss
+
+        self.index = build_index(
+            self.index_type,
+            self.dimension,
+            nlist=settings.VECTOR_INDEX_NLIST,
+            pq_m=settings.VECTOR_INDEX_PQ_M,
+            pq_bits=settings.VECTOR_INDEX_PQ_BITS,
+            hnsw_m=settings.VECTOR_INDEX_HNSW_M,
+            ef_construction=settings.VECTOR_INDEX_EF_CONSTRUCTION,
+            nprobe=settings.VECTOR_INDEX_NPROBE,
+            ef_search=settings.VECTOR_INDEX_EF_SEARCH,
+            quantization=settings.VECTOR_QUANTIZATION
+        )
+        self.staging = None if self.index.is_trained else faiss.IndexFlatIP(self.dimension)
+        if self.rerank_store is not None:
+            self.rerank_store.close()
+        self.rerank_store = None
+        if settings.VECTOR_RERANK_FACTOR > 0 and is_quantized(self.index):
+            self.rerank_store = FloatVectorStore(self.dimension)
+
+    def _add_vectors(self, vectors: np.ndarray):
+        if self.rerank_store is not None:
+            self.rerank_store.add(vectors)
+        if self.staging is None:
+            self.index.add(vectors)
+            return
+        self.staging.add(vectors)
+        if self.staging.ntotal >= min_training_size(self.index_type, settings.VECTOR_INDEX_NLIST,
+                                                    settings.VECTOR_INDEX_PQ_BITS, settings.VECTOR_QUANTIZATION):
+            self.train()
+
+    def train(self, sample_size: int = None):
+        """Train a pending IVF index on a sample of the staged vectors and move them into it
+
+        Runs automatically once enough vectors are staged; call it directly to
+        train earlier. Staged vectors are added in order, so ids are unchanged.
+        """
+        if self.staging is None or self.staging.ntotal == 0:
+            return
+        required = min_training_size(self.index_type, settings.VECTOR_INDEX_NLIST, settings.VECTOR_INDEX_PQ_BITS,
+                                     settings.VECTOR_QUANTIZATION, points_per_centroid=1)
+        if self.staging.ntotal < required:
+            print(f"⚠️ Need at least {required} vectors to train, have {self.staging.ntotal}")
+            return
+        sample_size = sample_size or settings.VECTOR_INDEX_TRAIN_SAMPLE
+        staged = self.staging.reconstruct_n(0, self.staging.ntotal)
+        train_index(self.index, staged, sample_size)
+        self.index.add(staged)
+        self.staging = None
+        print(f"✅ Trained {self.index_type} index on {min(len(staged), sample_size)} of {len(staged)} vectors")
 
     def embed_documents(self, documents: List[str]) -> np.ndarray:
-        """Generate embeddings for documents"""
+        """Generate embeddings for documents
+
+        Dense either way: model embeddings, or TF-IDF vectors with one column
+        per feature (at most TFIDF_MAX_FEATURES) on the fallback.
+        """
         if self.use_sentence_transformers:
-            embeddings = self.model.encode(documents, convert_to_tensor=False)
-            return embeddings
+            keys = [content_key(self.model_name, doc) for doc in documents]
+            vectors = self.embedding_cache.get_many(keys)
+            # Each distinct uncached text is encoded once
+            missing = {key: doc for key, doc in zip(keys, documents) if key not in vectors}
+            if missing:
+                encoded = dict(zip(missing, self._encode(list(missing.values()))))
+                self.embedding_cache.set_many(encoded)
+                vectors.update(encoded)
+            if not documents:
+                return np.empty((0, self.dimension), dtype=np.float32)
+            return np.stack([vectors[key] for key in keys])
         else:
-            # Use TF-IDF fallback
-            if self.embeddings_matrix is None:
-                self.embeddings_matrix = self.vectorizer.fit_transform(documents)
-            else:
-                # Transform new documents
-                new_embeddings = self.vectorizer.transform(documents)
-                # Combine with existing embeddings
-                from scipy.sparse import vstack
-                self.embeddings_matrix = vstack([self.embeddings_matrix, new_embeddings])
-            
-            return self.embeddings_matrix.toarray()
+            # TF-IDF fallback: vectors under the current corpus IDF weights
+            return self.sparse_index.transform(documents).toarray()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode in fixed-size batches, on a process pool for large CPU-only batches"""
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        if settings.EMBEDDING_ENCODE_WORKERS > 1 and len(texts) >= settings.EMBEDDING_PARALLEL_THRESHOLD:
+            if self.encode_pool is None:
+                self.encode_pool = self.model.start_multi_process_pool(
+                    target_devices=["cpu"] * settings.EMBEDDING_ENCODE_WORKERS
+                )
+            embeddings = self.model.encode_multi_process(texts, self.encode_pool, batch_size=batch_size)
+        else:
+            embeddings = self.model.encode(texts, batch_size=batch_size, convert_to_tensor=False)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def cache_stats(self) -> Dict:
+        """Embedding cache counters, including how many encodes were avoided"""
+        return self.embedding_cache.stats() if self.use_sentence_transformers else {}
+
+    def close(self):
+        """Stop the encode pool and close the on-disk embedding cache (unless shared)"""
+        if self.encode_pool is not None:
+            self.model.stop_multi_process_pool(self.encode_pool)
+            self.encode_pool = None
+        if self.use_sentence_transformers:
+            if self.owns_embedding_cache:
+                self.embedding_cache.close()
+            if self.rerank_store is not None:
+                self.rerank_store.close()
 
     def add_documents(self, documents: List[str], metadatas: List[Dict] = None):
         """Add documents to the vector store"""
         if self.use_sentence_transformers:
-            embeddings = self.embed_documents(documents)
+            embeddings = np.ascontiguousarray(self.embed_documents(documents), dtype=np.float32)
             # Normalize embeddings for cosine similarity
             import faiss
             faiss.normalize_L2(embeddings)
-            self.index.add(embeddings)
+            self._add_vectors(embeddings)
         else:
-            # For TF-IDF, just fit the vectorizer with all documents
-            all_docs = [doc["content"] for doc in self.documents] + documents
-            self.embeddings_matrix = self.vectorizer.fit_transform(all_docs)
+            # For TF-IDF, append the new documents' term counts
+            self.sparse_index.add(documents)
+        self.bm25.add(documents)
 
         # Store documents and metadata
         for i, doc in enumerate(documents):
@@ -86,65 +197,147 @@ class EmbeddingService:
             }
             self.documents.append(doc_data)
 
-    def search(self, query: str, k: int = 5) -> List[Tuple[str, float, Dict]]:
-        """Search for similar documents"""
-        if len(self.documents) == 0:
-            return []
-            
+    def encode_query(self, query: str) -> Optional[np.ndarray]:
+        """Normalised query embedding (1 x dimension), or None on the TF-IDF fallback"""
+        if not self.use_sentence_transformers:
+            return None
+        query_embedding = np.ascontiguousarray(self.model.encode([query]), dtype=np.float32)
+        import faiss
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+
+    def _vector_search(self, query: str, k: int, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       query_embedding: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, document ids) from the FAISS index or the TF-IDF fallback"""
         if self.use_sentence_transformers:
-            query_embedding = self.model.encode([query])
-            import faiss
-            faiss.normalize_L2(query_embedding)
-            scores, indices = self.index.search(query_embedding, min(k, len(self.documents)))
-        else:
-            # TF-IDF fallback search
-            if self.embeddings_matrix is None:
-                return []
-                
-            query_vec = self.vectorizer.transform([query])
-            similarities = cosine_similarity(query_vec, self.embeddings_matrix).flatten()
-            
-            # Get top k indices
-            top_indices = similarities.argsort()[-k:][::-1]
-            scores = [similarities[idx] for idx in top_indices]
-            indices = [[top_indices]]
+            if query_embedding is None:
+                query_embedding = self.encode_query(query)
+            if self.staging is not None:
+                scores, indices = self.staging.search(query_embedding, min(k, len(self.documents)))
+            else:
+                params = search_params(self.index, nprobe=nprobe, ef_search=ef_search)
+                fetch = k * settings.VECTOR_RERANK_FACTOR if self.rerank_store is not None else k
+                scores, indices = self.index.search(query_embedding, min(fetch, len(self.documents)), params=params)
+            # IVF/HNSW pad with -1 when fewer than k neighbours are found
+            found = indices[0] >= 0
+            scores, indices = scores[0][found], indices[0][found]
+            if self.staging is None and self.rerank_store is not None:
+                # Exact scores for the candidates from the quantized search
+                scores = self.rerank_store.get(indices) @ query_embedding[0]
+                top = np.argsort(-scores, kind="stable")[:k]
+                scores, indices = scores[top], indices[top]
+            return scores, indices
+        # TF-IDF fallback search
+        return self.sparse_index.search(query, k)
 
+    def _results(self, scored) -> List[Tuple[str, float, Dict]]:
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0] if self.use_sentence_transformers else scores, 
-                                           indices[0] if self.use_sentence_transformers else top_indices)):
-            if idx < len(self.documents):
+        for idx, score in scored:
+            if 0 <= idx < len(self.documents):
                 doc = self.documents[idx]
                 results.append((doc["content"], float(score), doc["metadata"]))
-
         return results
 
+    def search(self, query: str, k: int = 5, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               query_embedding: Optional[np.ndarray] = None) -> List[Tuple[str, float, Dict]]:
+        """Search for similar documents
+
+        nprobe (IVF) and ef_search (HNSW) override the index defaults for this
+        query only, trading recall for speed. Pass query_embedding (from
+        encode_query) to reuse one encoding across several indexes.
+        """
+        if len(self.documents) == 0:
+            return []
+        scores, indices = self._vector_search(query, k, nprobe, ef_search, query_embedding)
+        return self._results(zip(indices, scores))
+
+    def keyword_search(self, query: str, k: int = 5) -> List[Tuple[str, float, Dict]]:
+        """BM25 search over the inverted index"""
+        scores, indices = self.bm25.search(query, k)
+        return self._results(zip(indices, scores))
+
+    def hybrid_search(self, query: str, k: int = 5, candidates: Optional[int] = None,
+                      nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> List[Tuple[str, float, Dict]]:
+        """BM25 and vector results fused by reciprocal rank
+
+        Each side contributes only its top `candidates` documents, so tickers
+        and exact terms are matched lexically while paraphrases still surface
+        through the vector index. Scores are RRF scores, not similarities.
+        """
+        if len(self.documents) == 0:
+            return []
+        candidates = max(candidates or settings.HYBRID_CANDIDATES, k)
+        _, lexical = self.bm25.search(query, candidates)
+        _, semantic = self._vector_search(query, candidates, nprobe, ef_search)
+        return self._results(reciprocal_rank_fusion([lexical, semantic], k, settings.HYBRID_RRF_K))
+
     def save_index(self, filepath: str):
         """Save the index and documents"""
+        import joblib
         if self.use_sentence_transformers:
             import faiss
-            faiss.write_index(self.index, f"{filepath}.index")
+            # An untrained IVF index is saved as its staged flat vectors
+            faiss.write_index(self.staging if self.staging is not None else self.index, f"{filepath}.index")
+            if self.rerank_store is not None:
+                self.rerank_store.save(f"{filepath}.vectors")
         else:
-            # Save TF-IDF vectorizer and matrix
-            import joblib
-            joblib.dump(self.vectorizer, f"{filepath}.vectorizer")
-            joblib.dump(self.embeddings_matrix, f"{filepath}.embeddings")
-            
-        with open(f"{filepath}.docs", "wb") as f:
-            pickle.dump(self.documents, f)
+            # Save TF-IDF term counts and document frequencies
+            joblib.dump(self.sparse_index, f"{filepath}.tfidf")
+
+        joblib.dump(self.bm25, f"{filepath}.bm25")
+        # Appends only the documents added since the last save to this path
+        self.documents.save(f"{filepath}.docs")
 
     def load_index(self, filepath: str):
         """Load the index and documents"""
+        import joblib
+        rebuild_tfidf = False
         try:
             if self.use_sentence_transformers:
                 import faiss
-                self.index = faiss.read_index(f"{filepath}.index")
+                index = faiss.read_index(f"{filepath}.index")
+                configured_flat = self.index_type == "flat" and settings.VECTOR_QUANTIZATION == "none"
+                if not configured_flat and isinstance(index, faiss.IndexFlat):
+                    # Staged vectors, or a flat index from before index types were configurable
+                    self._reset_index()
+                    if index.ntotal:
+                        self._add_vectors(index.reconstruct_n(0, index.ntotal))
+                else:
+                    self.index = index
+                    self.staging = None
+                    if self.rerank_store is not None:
+                        self.rerank_store.close()
+                    self.rerank_store = None
+                    if settings.VECTOR_RERANK_FACTOR > 0 and is_quantized(index):
+                        if os.path.exists(f"{filepath}.vectors"):
+                            # A private copy of the rows this index covers; the snapshot is never written
+                            self.rerank_store = FloatVectorStore(self.dimension, f"{filepath}.vectors", index.ntotal)
+                        else:
+                            print("⚠️ No saved float vectors for this index; re-ranking disabled")
             else:
-                import joblib
-                self.vectorizer = joblib.load(f"{filepath}.vectorizer")
-                self.embeddings_matrix = joblib.load(f"{filepath}.embeddings")
-                
-            with open(f"{filepath}.docs", "rb") as f:
-                self.documents = pickle.load(f)
+                if os.path.exists(f"{filepath}.tfidf"):
+                    self.sparse_index = joblib.load(f"{filepath}.tfidf")
+                else:
+                    rebuild_tfidf = True
+
+            if DocumentStore.exists(f"{filepath}.docs"):
+                self.documents = DocumentStore(f"{filepath}.docs")
+            else:
+                # Pickled document list from before the segment store; rewritten on next save
+                with open(f"{filepath}.docs", "rb") as f:
+                    self.documents = DocumentStore()
+                    self.documents.extend(pickle.load(f))
+
+            if os.path.exists(f"{filepath}.bm25"):
+                self.bm25 = joblib.load(f"{filepath}.bm25")
+            else:
+                self.bm25 = BM25Index(settings.BM25_K1, settings.BM25_B)
+                self.bm25.add([doc["content"] for doc in self.documents])
+
+            if rebuild_tfidf:
+                # Index saved by the old refitting vectorizer; rebuild from the documents
+                self.sparse_index = IncrementalTfidfIndex(max_features=settings.TFIDF_MAX_FEATURES)
+                self.sparse_index.add([doc["content"] for doc in self.documents])
         except Exception as e:
             print(f"Failed to load index: {e}")
 
@@ -152,31 +345,24 @@ class EmbeddingService:
 
 # Alternative: Simple keyword-based search if all else fails
 class KeywordEmbeddingService:
-    """Ultra-simple fallback using keyword matching"""
+    """Keyword-only fallback: BM25 over an inverted index, no embeddings"""
     
     def __init__(self):
         self.documents = []
+        self.bm25 = BM25Index(settings.BM25_K1, settings.BM25_B)
         
     def add_documents(self, documents: List[str], metadatas: List[Dict] = None):
+        self.bm25.add(documents)
         for i, doc in enumerate(documents):
             doc_data = {
                 "content": doc.lower(),
-                "metadata": metadatas[i] if metadatas else {},
-                "keywords": set(doc.lower().split())
+                "metadata": metadatas[i] if metadatas else {}
             }
             self.documents.append(doc_data)
     
     def search(self, query: str, k: int = 5) -> List[Tuple[str, float, Dict]]:
-        query_words = set(query.lower().split())
-        results = []
-        
-        for doc in self.documents:
-            # Simple keyword overlap scoring
-            overlap = len(query_words.intersection(doc["keywords"]))
-            if overlap > 0:
-                score = overlap / len(query_words.union(doc["keywords"]))
-                results.append((doc["content"], score, doc["metadata"]))
-        
-        # Sort by score and return top k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:k]
\ No newline at end of file
+        scores, indices = self.bm25.search(query, k)
+        return [
+            (self.documents[idx]["content"], float(score), self.documents[idx]["metadata"])
+            for idx, score in zip(indices, scores)
+        ]
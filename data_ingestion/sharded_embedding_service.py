@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from heapq import nlargest
+from itertools import chain
+from typing import Dict, List, Optional, Set, Tuple
+import glob
+import json
+import os
+import zlib
+from config.settings import settings
+from data_ingestion.embedding_service import EmbeddingService
+
+MANIFEST_FILE = "manifest.json"
+# Prefix length of an ISO date per time bucket
+DATE_BUCKETS = {"day": 10, "month": 7, "year": 4}
+UNDATED_SHARD = "undated"
+
+class ShardedEmbeddingService:
+    """Corpus split across EmbeddingService shards, searched in parallel
+
+    Documents are routed by metadata: shard_by="date" buckets the ISO "date"
+    field by day, month or year, shard_by="symbol" hashes "ticker"/"symbol"
+    into shard_count buckets. A query is encoded once, fanned out to every
+    shard on a thread pool (FAISS releases the GIL while searching) and the
+    per-shard top k are merged. Aged date shards are dropped whole instead
+    of deleting vectors from one large index.
+    """
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", index_type: str = None,
+                 shard_by: str = None, shard_count: int = None, date_bucket: str = None, workers: int = None,
+                 model=None):
+        self.model_name = model_name
+        self.index_type = index_type
+        self.shard_by = shard_by or settings.VECTOR_SHARD_BY
+        self.shard_count = shard_count or settings.VECTOR_SHARD_COUNT
+        self.date_bucket = date_bucket or settings.VECTOR_SHARD_DATE_BUCKET
+        if self.shard_by not in ("date", "symbol"):
+            raise ValueError(f"Unknown shard_by '{self.shard_by}', expected 'date' or 'symbol'")
+        if self.date_bucket not in DATE_BUCKETS:
+            raise ValueError(f"Unknown date bucket '{self.date_bucket}', expected one of {list(DATE_BUCKETS)}")
+        self.shards: Dict[str, EmbeddingService] = {}
+        # Dropped shards whose files are removed on the next save
+        self.dropped: Set[str] = set()
+        # Loaded by the first shard unless passed in
+        self.model = model
+        self.embedding_cache = None
+        # Set once SentenceTransformers fails to load, so later shards skip the attempt
+        self._model_failed = False
+        self.executor = ThreadPoolExecutor(max_workers=workers or settings.VECTOR_SEARCH_WORKERS)
+
+    def shard_key(self, metadata: Dict) -> str:
+        if self.shard_by == "date":
+            date = str(metadata.get("date") or "")[:DATE_BUCKETS[self.date_bucket]]
+            return date or UNDATED_SHARD
+        symbol = str(metadata.get("ticker") or metadata.get("symbol") or "").upper()
+        return f"{zlib.crc32(symbol.encode('utf-8')) % self.shard_count:03d}"
+
+    def _shard(self, key: str) -> EmbeddingService:
+        shard = self.shards.get(key)
+        if shard is None:
+            # All shards share one model and one embedding cache
+            shard = EmbeddingService(self.model_name, self.index_type, model=self.model,
+                                     embedding_cache=self.embedding_cache, load_model=not self._model_failed)
+            if not shard.use_sentence_transformers:
+                self._model_failed = True
+            elif self.embedding_cache is None:
+                self.model, self.embedding_cache = shard.model, shard.embedding_cache
+                shard.owns_embedding_cache = False
+            self.shards[key] = shard
+            self.dropped.discard(key)
+        return shard
+
+    def __len__(self) -> int:
+        return sum(len(shard.documents) for shard in self.shards.values())
+
+    def add_documents(self, documents: List[str], metadatas: List[Dict] = None):
+        groups: Dict[str, Tuple[List[str], List[Dict]]] = {}
+        for i, doc in enumerate(documents):
+            metadata = metadatas[i] if metadatas else {}
+            texts, metas = groups.setdefault(self.shard_key(metadata), ([], []))
+            texts.append(doc)
+            metas.append(metadata)
+        for key, (texts, metas) in groups.items():
+            self._shard(key).add_documents(texts, metas)
+        if self.shard_by == "date" and settings.VECTOR_SHARD_RETENTION_DAYS > 0:
+            self.drop_older_than(settings.VECTOR_SHARD_RETENTION_DAYS)
+
+    def search(self, query: str, k: int = 5, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               shard_keys: Optional[List[str]] = None) -> List[Tuple[str, float, Dict]]:
+        """Top-k across shards (all, or only shard_keys), best first
+
+        Scores are comparable across shards on the FAISS path. On the TF-IDF
+        fallback each shard weights terms by its own document frequencies.
+        """
+        shards = [self.shards[key] for key in (shard_keys or self.shards) if key in self.shards]
+        shards = [shard for shard in shards if len(shard.documents)]
+        if not shards:
+            return []
+        query_embedding = shards[0].encode_query(query)
+        futures = [
+            self.executor.submit(shard.search, query, k, nprobe, ef_search, query_embedding)
+            for shard in shards
+        ]
+        return nlargest(k, chain.from_iterable(future.result() for future in futures), key=lambda result: result[1])
+
+    def drop_shard(self, key: str) -> bool:
+        shard = self.shards.pop(key, None)
+        if shard is None:
+            return False
+        shard.close()
+        self.dropped.add(key)
+        return True
+
+    def drop_before(self, cutoff: str) -> List[str]:
+        """Drop date shards whose bucket is older than the ISO date cutoff"""
+        if self.shard_by != "date":
+            return []
+        bucket = cutoff[:DATE_BUCKETS[self.date_bucket]]
+        expired = [key for key in self.shards if key != UNDATED_SHARD and key < bucket]
+        for key in expired:
+            self.drop_shard(key)
+        if expired:
+            print(f"🗑️ Dropped {len(expired)} expired shards: {', '.join(sorted(expired))}")
+        return expired
+
+    def drop_older_than(self, days: float) -> List[str]:
+        return self.drop_before((datetime.now() - timedelta(days=days)).date().isoformat())
+
+    def save_index(self, directory: str):
+        """Save every shard under directory; shard saves are incremental where their stores are"""
+        os.makedirs(directory, exist_ok=True)
+        for key, shard in self.shards.items():
+            shard.save_index(os.path.join(directory, key))
+        for key in self.dropped:
+            for path in glob.glob(os.path.join(directory, glob.escape(key) + ".*")):
+                os.remove(path)
+        self.dropped.clear()
+
+        manifest = {
+            "shard_by": self.shard_by,
+            "shard_count": self.shard_count,
+            "date_bucket": self.date_bucket,
+            "shards": sorted(self.shards)
+        }
+        tmp_path = os.path.join(directory, f"{MANIFEST_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    def load_index(self, directory: str):
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE), "r") as f:
+                manifest = json.load(f)
+            self.shard_by = manifest["shard_by"]
+            self.shard_count = manifest["shard_count"]
+            self.date_bucket = manifest["date_bucket"]
+            for key in manifest["shards"]:
+                self._shard(key).load_index(os.path.join(directory, key))
+        except Exception as e:
+            print(f"Failed to load sharded index: {e}")
+
+    def close(self):
+        for shard in self.shards.values():
+            shard.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,185 @@
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+class IncrementalTfidfIndex:
+    """TF-IDF index that appends documents without refitting the corpus
+
+    New terms get the next free column of an append-only vocabulary, so
+    existing rows never change. Raw term counts are appended to growable CSR
+    arrays and document frequencies are updated from the new rows only,
+    making ingestion linear in corpus size. IDF weights and document norms
+    are derived lazily at search time with the same smoothing and l2
+    normalisation as TfidfVectorizer's defaults, so scores match a vectorizer
+    fitted on the whole corpus.
+
+    With max_features set, only the most frequent terms across the corpus
+    are used as features, as with TfidfVectorizer(max_features=...). Counts
+    for every term are still kept because the most frequent terms can change
+    as documents arrive; the feature set is re-chosen lazily with the IDF.
+    """
+
+    def __init__(self, stop_words: str = "english", ngram_range=(1, 2), max_features: Optional[int] = None):
+        self.stop_words = stop_words
+        self.ngram_range = ngram_range
+        self.max_features = max_features
+        self.analyzer = CountVectorizer(stop_words=stop_words, ngram_range=ngram_range).build_analyzer()
+        self.vocabulary: Dict[str, int] = {}
+        self.n_documents = 0
+        self.document_frequency = np.zeros(0, dtype=np.int64)
+        self.term_frequency = np.zeros(0, dtype=np.float64)
+        self.data = np.empty(0, dtype=np.float32)
+        self.indices = np.empty(0, dtype=np.int32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self._features = None
+        self._idf = None
+        self._norms = None
+
+    @property
+    def nnz(self) -> int:
+        return int(self.indptr[self.n_documents])
+
+    @staticmethod
+    def _grow(array: np.ndarray, size: int) -> np.ndarray:
+        """Resize geometrically so appends are amortised O(1)"""
+        if size <= len(array):
+            return array
+        grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def add(self, documents: List[str]):
+        """Append documents; cost depends only on the new documents"""
+        indices, data, lengths = [], [], []
+        for document in documents:
+            counts = Counter(self.analyzer(document))
+            indices.extend(self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts)
+            data.extend(counts.values())
+            lengths.append(len(counts))
+
+        start, rows = self.nnz, self.n_documents + len(documents)
+        end = start + len(indices)
+        self.data = self._grow(self.data, end)
+        self.indices = self._grow(self.indices, end)
+        self.indptr = self._grow(self.indptr, rows + 1)
+        self.data[start:end] = data
+        self.indices[start:end] = indices
+        self.indptr[self.n_documents + 1:rows + 1] = start + np.cumsum(lengths)
+
+        new_columns = np.asarray(indices, dtype=np.int64)
+        self.document_frequency = self._grow(self.document_frequency, len(self.vocabulary))
+        self.document_frequency += np.bincount(new_columns, minlength=len(self.document_frequency))
+        self.term_frequency = self._grow(self.term_frequency, len(self.vocabulary))
+        self.term_frequency += np.bincount(new_columns, weights=data, minlength=len(self.term_frequency))
+        self.n_documents = rows
+        self._features = self._idf = self._norms = None
+
+    def matrix(self) -> csr_matrix:
+        """Raw term counts of all documents, as a view over the backing arrays"""
+        nnz = self.nnz
+        return csr_matrix(
+            (self.data[:nnz], self.indices[:nnz], self.indptr[:self.n_documents + 1]),
+            shape=(self.n_documents, len(self.vocabulary))
+        )
+
+    def features(self) -> np.ndarray:
+        """Columns used as features: the max_features most frequent terms (ties alphabetical)"""
+        if self._features is None:
+            columns = len(self.vocabulary)
+            if self.max_features is None or columns <= self.max_features:
+                self._features = np.arange(columns)
+            else:
+                alphabetical = np.empty(columns, dtype=np.int64)
+                alphabetical[np.argsort(np.array(list(self.vocabulary), dtype=object))] = np.arange(columns)
+                order = np.lexsort((alphabetical, -self.term_frequency[:columns]))
+                self._features = np.sort(order[:self.max_features])
+        return self._features
+
+    def idf(self) -> np.ndarray:
+        """IDF weight of every column, 0 for terms outside the feature set"""
+        if self._idf is None:
+            df = self.document_frequency[:len(self.vocabulary)]
+            idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+            features = self.features()
+            idf[features] = np.log((1 + self.n_documents) / (1 + df[features])) + 1
+            self._idf = idf
+        return self._idf
+
+    def transform(self, documents: List[str]) -> csr_matrix:
+        """l2-normalised TF-IDF vectors under the current IDF weights, one column per feature
+
+        Unseen terms and terms outside the feature set are ignored.
+        """
+        return self._weighted(documents)[:, self.features()]
+
+    def _weighted(self, documents: List[str]) -> csr_matrix:
+        """TF-IDF vectors over all vocabulary columns, zero outside the feature set"""
+        indices, data, indptr = [], [], [0]
+        for document in documents:
+            for term, count in Counter(self.analyzer(document)).items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    indices.append(column)
+                    data.append(count)
+            indptr.append(len(indices))
+        weighted = csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(documents), len(self.vocabulary))
+        )
+        weighted.data *= self.idf()[weighted.indices]
+        weighted.eliminate_zeros()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        weighted.data /= np.repeat(norms, np.diff(weighted.indptr)).astype(np.float32)
+        return weighted
+
+    def _document_norms(self) -> np.ndarray:
+        """TF-IDF norm of every document; recomputed once per batch of adds"""
+        if self._norms is None:
+            nnz = self.nnz
+            weighted = self.data[:nnz] * self.idf()[self.indices[:nnz]]
+            rows = np.repeat(np.arange(self.n_documents), np.diff(self.indptr[:self.n_documents + 1]))
+            norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=self.n_documents))
+            norms[norms == 0] = 1
+            self._norms = norms
+        return self._norms
+
+    def search(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k (scores, document ids) by cosine similarity, best first"""
+        if self.n_documents == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        query_vec = self._weighted([query])
+        # Fold the documents' IDF weights into the query so the count matrix is used as-is
+        weights = np.zeros(len(self.vocabulary), dtype=np.float32)
+        weights[query_vec.indices] = query_vec.data * self.idf()[query_vec.indices]
+        similarities = (self.matrix() @ weights) / self._document_norms()
+        k = min(k, self.n_documents)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return similarities[top], top
+
+    def __getstate__(self):
+        # Persist only the used part of the backing arrays; the analyzer is rebuilt on load
+        state = self.__dict__.copy()
+        nnz = self.nnz
+        state.update(
+            data=self.data[:nnz], indices=self.indices[:nnz],
+            indptr=self.indptr[:self.n_documents + 1],
+            document_frequency=self.document_frequency[:len(self.vocabulary)],
+            term_frequency=self.term_frequency[:len(self.vocabulary)],
+            analyzer=None, _features=None, _idf=None, _norms=None
+        )
+        return state
+
+    def __setstate__(self, state):
+        # Indexes pickled before max_features have no term frequencies; recount them
+        if "term_frequency" not in state:
+            state["term_frequency"] = np.bincount(
+                state["indices"], weights=state["data"], minlength=len(state["vocabulary"])
+            )
+        state.setdefault("max_features", None)
+        state.setdefault("_features", None)
+        self.__dict__.update(state)
+        self.analyzer = CountVectorizer(stop_words=self.stop_words, ngram_range=self.ngram_range).build_analyzer()
@@ -0,0 +1,122 @@
+"""FAISS index construction and per-query search parameters.
+
+Supported index types (all inner product over L2-normalised vectors):
+
+    flat      exact IndexFlatIP, O(N*d) per query
+    ivf_flat  inverted lists over nlist k-means cells, searched nprobe at a time
+    ivf_pq    IVF with product-quantised residuals (pq_m sub-vectors, pq_bits each)
+    hnsw      graph index, efSearch controls the candidate list per query
+
+Stored vectors can additionally be quantized (quantization):
+
+    none      float32, 4 bytes per dimension
+    sq8       int8 scalar quantization, 1 byte per dimension
+    pq        product quantization, pq_m codes of pq_bits each per vector
+
+IVF types and quantized indexes need training; train on a sample drawn from
+the corpus.
+"""
+from typing import Optional
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+QUANTIZATIONS = ("none", "sq8", "pq")
+
+def build_index(index_type: str, dimension: int, nlist: int = 1024, pq_m: int = 16,
+                pq_bits: int = 8, hnsw_m: int = 32, ef_construction: int = 200,
+                nprobe: int = 16, ef_search: int = 64, quantization: str = "none"):
+    """Create an empty FAISS index of the given type
+
+    nprobe and ef_search are the defaults used when a query doesn't pass its own.
+    ivf_pq is always product-quantized; ivf_flat with quantization="pq" is the same index.
+    """
+    import faiss
+
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+    if quantization == "pq" or index_type == "ivf_pq":
+        if dimension % pq_m:
+            raise ValueError(f"pq_m ({pq_m}) must divide the embedding dimension ({dimension})")
+    sq8 = faiss.ScalarQuantizer.QT_8bit
+
+    if index_type == "flat":
+        if quantization == "sq8":
+            return faiss.IndexScalarQuantizer(dimension, sq8, faiss.METRIC_INNER_PRODUCT)
+        if quantization == "pq":
+            return faiss.IndexPQ(dimension, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dimension)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        if index_type == "ivf_pq" and quantization == "sq8":
+            raise ValueError("ivf_pq is already product-quantized; use ivf_flat with sq8")
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_pq" or quantization == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+        elif quantization == "sq8":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = nprobe
+        return index
+    if index_type == "hnsw":
+        if quantization == "sq8":
+            index = faiss.IndexHNSWSQ(dimension, sq8, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif quantization == "pq":
+            index = faiss.IndexHNSWPQ(dimension, pq_m, hnsw_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+    raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+def min_training_size(index_type: str, nlist: int = 1024, pq_bits: int = 8, quantization: str = "none",
+                      points_per_centroid: int = 39) -> int:
+    """Vectors to collect before training an index of this type
+
+    39 points per centroid is the least FAISS k-means accepts without warning;
+    int8 scalar quantization only needs enough vectors to fix per-dimension ranges.
+    points_per_centroid=1 gives the hard minimum, below which training fails.
+    """
+    centroids = 0
+    if index_type in ("ivf_flat", "ivf_pq"):
+        centroids = nlist
+    if quantization == "pq" or index_type == "ivf_pq":
+        centroids = max(centroids, 2 ** pq_bits)
+    if centroids:
+        return points_per_centroid * centroids
+    if quantization == "sq8":
+        return 1000 if points_per_centroid > 1 else 1
+    return 0
+
+def index_memory_bytes(index) -> int:
+    """Serialized size of an index, a close proxy for its resident memory"""
+    import faiss
+
+    return int(faiss.serialize_index(index).size)
+
+def is_quantized(index) -> bool:
+    """Whether search scores are approximations that float re-ranking can refine"""
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    return not isinstance(index, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+def train_index(index, vectors: np.ndarray, sample_size: int = 100_000, seed: int = 0):
+    """Train an IVF index on a random sample of vectors (no-op if already trained)"""
+    if index.is_trained:
+        return
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+def search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Per-query FAISS search parameters, so concurrent queries don't share state"""
+    import faiss
+
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
@@ -0,0 +1,66 @@
+"""Append-only, memory-mapped float32 vectors for re-ranking quantized search.
+
+Quantized indexes keep only codes in memory. The original vectors live in a
+flat file of float32 rows; re-ranking reads just the candidate rows through
+a memory map, so they cost page cache rather than process memory.
+"""
+from typing import Optional
+import os
+import shutil
+import tempfile
+import numpy as np
+
+class FloatVectorStore:
+    """Row-addressable float32 vectors in a file, appended to and read via mmap
+
+    Appends always go to a private temporary file. save() copies it out to a
+    snapshot and opening a snapshot copies it in, so a saved snapshot keeps
+    matching the index saved alongside it and other processes can load it
+    while this one keeps adding vectors.
+    """
+
+    def __init__(self, dimension: int, path: Optional[str] = None, rows: Optional[int] = None):
+        """Start empty, or from the first `rows` rows (default all) of the snapshot at path"""
+        self.dimension = dimension
+        self.row_bytes = dimension * np.dtype(np.float32).itemsize
+        # Unsaved vectors still go to disk rather than the heap
+        handle, self.path = tempfile.mkstemp(suffix=".vectors")
+        with os.fdopen(handle, "wb") as f:
+            if path is not None:
+                saved = os.path.getsize(path) // self.row_bytes
+                size = (saved if rows is None else min(rows, saved)) * self.row_bytes
+                with open(path, "rb") as snapshot:
+                    while f.tell() < size:
+                        chunk = snapshot.read(min(size - f.tell(), 1 << 20))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+        self._map()
+
+    def _map(self):
+        rows = os.path.getsize(self.path) // self.row_bytes
+        self.vectors = (np.memmap(self.path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+                        if rows else np.empty((0, self.dimension), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def add(self, vectors: np.ndarray):
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._map()
+
+    def get(self, ids: np.ndarray) -> np.ndarray:
+        return np.asarray(self.vectors[ids])
+
+    def save(self, path: str):
+        """Write a snapshot of the current rows to path; later adds don't touch it"""
+        partial = f"{path}.partial"
+        shutil.copyfile(self.path, partial)
+        # Readers of path see either the previous snapshot or this one, never a partial copy
+        os.replace(partial, path)
+
+    def close(self):
+        self.vectors = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,86 @@
+from config.settings import settings
+
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import aiohttp
+
+class AgentClientPool:
+    """One long-lived aiohttp session per agent
+
+    Each agent gets its own keep-alive connector and timeout so connections
+    are reused across requests instead of paying a TCP handshake per hop.
+    """
+
+    def __init__(self, agent_urls: Dict[str, str], pool_size: int = None,
+                 keepalive_timeout: float = None, timeouts: Dict[str, float] = None):
+        self.agent_urls = agent_urls
+        self.pool_size = settings.AGENT_POOL_SIZE if pool_size is None else pool_size
+        self.keepalive_timeout = settings.AGENT_KEEPALIVE_TIMEOUT if keepalive_timeout is None else keepalive_timeout
+        self.timeouts = {**settings.AGENT_TIMEOUTS, **(timeouts or {})}
+        self.sessions: Dict[str, aiohttp.ClientSession] = {}
+        self.stats: Dict[str, Dict[str, int]] = {
+            name: {"requests": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+            for name in agent_urls
+        }
+
+    async def start(self):
+        """Open a session for every agent (called from the app lifespan)"""
+        for name in self.agent_urls:
+            self._session(name)
+
+    async def close(self):
+        """Close all sessions and their connectors"""
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions = {}
+
+    def _session(self, agent: str) -> aiohttp.ClientSession:
+        session = self.sessions.get(agent)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(
+                base_url=self.agent_urls[agent],
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeouts.get(agent, settings.AGENT_DEFAULT_TIMEOUT))
+            )
+            self.sessions[agent] = session
+        return session
+
+    @asynccontextmanager
+    async def request(self, agent: str, method: str, path: str, **kwargs):
+        """Issue a request to an agent over its pooled session"""
+        stats = self.stats[agent]
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            async with self._session(agent).request(method, path, **kwargs) as response:
+                yield response
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+
+    def post(self, agent: str, path: str, **kwargs):
+        return self.request(agent, "POST", path, **kwargs)
+
+    def get(self, agent: str, path: str, **kwargs):
+        return self.request(agent, "GET", path, **kwargs)
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Pool usage per agent for the /health endpoint"""
+        metrics = {}
+        for name, stats in self.stats.items():
+            session: Optional[aiohttp.ClientSession] = self.sessions.get(name)
+            metrics[name] = {
+                **stats,
+                "pool_size": self.pool_size,
+                "utilization": round(stats["in_flight"] / self.pool_size, 3) if self.pool_size else 0,
+                "timeout": self.timeouts.get(name, settings.AGENT_DEFAULT_TIMEOUT),
+                "open": bool(session and not session.closed)
+            }
+        return metrics
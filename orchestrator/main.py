@@ -241,12 +241,18 @@
 #         "timestamp": datetime.utcnow().isoformat()
 #     }
 from time import perf_counter
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Literal, Optional
 import aiohttp
 import asyncio
+import json
 from datetime import datetime
+from orchestrator.agent_clients import AgentClientPool
+from orchestrator.stage_graph import StageGraph
+from orchestrator import router
 
 # ---------------- Models -------------------
 
@@ -256,6 +262,8 @@ class OrchestrationRequest(BaseModel):
     include_analysis: bool = True
     include_news: bool = False
     response_type: str = "brief"
+    priority: Literal["interactive", "background"] = "interactive"  # "background" for report generation; queued behind chat
+    backend: Optional[str] = None  # language agent backend, e.g. "template" for offline summaries
 
 class OrchestrationResponse(BaseModel):
     query: str
@@ -266,10 +274,19 @@ class OrchestrationResponse(BaseModel):
     ai_response: Dict
     timestamp: str
     processing_time: Optional[float] = None
+    stage_timings: Optional[Dict[str, Dict[str, float]]] = None
 
 # ---------------- App Setup -------------------
 
-app = FastAPI(title="Trading Agent Orchestrator", description="Coordinates all trading agents")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled agent clients on startup and close them on shutdown"""
+    await orchestrator.clients.start()
+    yield
+    await orchestrator.clients.close()
+    await router.close_clients()
+
+app = FastAPI(title="Trading Agent Orchestrator", description="Coordinates all trading agents", lifespan=lifespan)
 
 # ---------------- Orchestrator -------------------
 
@@ -283,114 +300,222 @@ class AgentOrchestrator:
             "scraping": "http://localhost:8005",
             "voice": "http://localhost:8006"
         }
+        self.clients = AgentClientPool(self.agent_urls)
 
     async def process_request(self, request: OrchestrationRequest) -> OrchestrationResponse:
         """Orchestrate all agents to process a complete request"""
         start_time = perf_counter()
 
-        # Step 1: Get portfolio data
-        portfolio_data = await self._call_retriever(request.query)
-
-        # Step 2: Get market data if symbols are provided
-        market_data = {}
-        if request.symbols:
-            market_data = await self._call_api_agent(request.symbols)
-
-        # Step 3: Perform analysis
-        analysis = {}
-        if request.include_analysis and market_data:
-            analysis = await self._call_analysis_agent(market_data)
-
-        # Step 4: Get news
-        news = []
-        if request.include_news and request.symbols:
-            for symbol in request.symbols:
-                symbol_news = await self._call_scraping_agent(symbol, "news")
-                news.extend(symbol_news.get("documents", []))
-
-        # Step 5: AI response
-        ai_response = await self._call_language_agent(
-            market_data, analysis, portfolio_data.get("documents", []), 
-            request.query, request.response_type
-        )
+        graph = self._build_stage_graph(request)
+        results, stage_timings = await graph.run()
 
         duration = perf_counter() - start_time
 
         return OrchestrationResponse(
             query=request.query,
-            market_data=market_data,
-            analysis=analysis,
-            portfolio_data=portfolio_data,
-            news=news,
-            ai_response=ai_response,
+            market_data=results["market_data"],
+            analysis=results["analysis"],
+            portfolio_data=results["retriever"],
+            news=results["news"],
+            ai_response=results["language"],
             timestamp=datetime.utcnow().isoformat(),
-            processing_time=round(duration, 3)
+            processing_time=round(duration, 3),
+            stage_timings=stage_timings
         )
 
+    async def stream_request(self, request: OrchestrationRequest) -> AsyncIterator[Dict]:
+        """Run the pipeline, then forward language agent tokens as they arrive
+
+        Yields one "context" event with the upstream stage results, the
+        language agent's "token" events, and a final "done" event with the
+        complete ai_response and timings, or an "error" event if the
+        language agent failed.
+        """
+        start_time = perf_counter()
+
+        graph = self._build_stage_graph(request, include_language=False)
+        results, stage_timings = await graph.run()
+        yield {
+            "type": "context",
+            "query": request.query,
+            "market_data": results["market_data"],
+            "analysis": results["analysis"],
+            "portfolio_data": results["retriever"],
+            "news": results["news"],
+            "stage_timings": stage_timings
+        }
+
+        ai_response = {}
+        first_token_time = None
+        async for event in self._stream_language_agent(
+            results["market_data"], results["analysis"], results["retriever"].get("documents", []),
+            request.query, request.response_type, request.priority, request.backend
+        ):
+            if event.get("type") == "token":
+                if first_token_time is None:
+                    first_token_time = perf_counter() - start_time
+                yield event
+            elif event.get("type") == "done":
+                ai_response = {key: value for key, value in event.items() if key != "type"}
+            elif event.get("type") == "error":
+                yield {**event, "processing_time": round(perf_counter() - start_time, 3)}
+                return
+
+        if not ai_response:
+            yield {
+                "type": "error",
+                "detail": "Language agent stream ended without a response",
+                "processing_time": round(perf_counter() - start_time, 3)
+            }
+            return
+
+        yield {
+            "type": "done",
+            "ai_response": ai_response,
+            "timestamp": datetime.utcnow().isoformat(),
+            "time_to_first_token": round(first_token_time, 3) if first_token_time is not None else None,
+            "processing_time": round(perf_counter() - start_time, 3)
+        }
+
+    def _build_stage_graph(self, request: OrchestrationRequest, include_language: bool = True) -> StageGraph:
+        """Wire agent calls by data dependency
+
+        Retriever, market data and news run concurrently; analysis starts as
+        soon as market data lands and the language agent waits only on the
+        inputs it uses.
+        """
+        graph = StageGraph()
+
+        async def retriever_stage(_):
+            return await self._call_retriever(request.query)
+
+        async def market_data_stage(_):
+            if not request.symbols:
+                return {}
+            return await self._call_api_agent(request.symbols)
+
+        async def news_stage(_):
+            if not (request.include_news and request.symbols):
+                return []
+            responses = await asyncio.gather(
+                *(self._call_scraping_agent(symbol, "news") for symbol in request.symbols)
+            )
+            news = []
+            for symbol_news in responses:
+                news.extend(symbol_news.get("documents", []))
+            return news
+
+        async def analysis_stage(deps):
+            market_data = deps["market_data"]
+            if not (request.include_analysis and market_data):
+                return {}
+            return await self._call_analysis_agent(market_data)
+
+        async def language_stage(deps):
+            return await self._call_language_agent(
+                deps["market_data"], deps["analysis"], deps["retriever"].get("documents", []),
+                request.query, request.response_type, request.priority, request.backend
+            )
+
+        graph.add("retriever", retriever_stage)
+        graph.add("market_data", market_data_stage)
+        graph.add("news", news_stage)
+        graph.add("analysis", analysis_stage, depends_on=["market_data"])
+        if include_language:
+            graph.add("language", language_stage, depends_on=["retriever", "market_data", "analysis"])
+        return graph
+
     async def _call_retriever(self, query: str) -> Dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.agent_urls['retriever']}/retrieve", json={"query": query}
-                ) as response:
-                    return await response.json() if response.status == 200 else {}
+            async with self.clients.post(
+                "retriever", "/retrieve", json={"query": query}
+            ) as response:
+                return await response.json() if response.status == 200 else {}
         except Exception as e:
             print(f"❌ Retriever error: {e}")
             return {}
 
     async def _call_api_agent(self, symbols: List[str]) -> Dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.agent_urls['api']}/market-data", json={"symbols": symbols}
-                ) as response:
-                    return await response.json() if response.status == 200 else {}
+            async with self.clients.post(
+                "api", "/market-data", json={"symbols": symbols}
+            ) as response:
+                return await response.json() if response.status == 200 else {}
         except Exception as e:
             print(f"❌ API Agent error: {e}")
             return {}
 
     async def _call_analysis_agent(self, market_data: Dict) -> Dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.agent_urls['analysis']}/analyze", json={"market_data": market_data}
-                ) as response:
-                    return await response.json() if response.status == 200 else {}
+            async with self.clients.post(
+                "analysis", "/analyze", json={"market_data": market_data}
+            ) as response:
+                return await response.json() if response.status == 200 else {}
         except Exception as e:
             print(f"❌ Analysis Agent error: {e}")
             return {}
 
     async def _call_scraping_agent(self, symbol: str, source: str) -> Dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.agent_urls['scraping']}/scrape",
-                    json={"target": symbol, "source": source, "limit": 5}
-                ) as response:
-                    return await response.json() if response.status == 200 else {}
+            async with self.clients.post(
+                "scraping", "/scrape",
+                json={"target": symbol, "source": source, "limit": 5}
+            ) as response:
+                return await response.json() if response.status == 200 else {}
         except Exception as e:
             print(f"❌ Scraping Agent error for {symbol}: {e}")
             return {}
 
     async def _call_language_agent(self, market_data: Dict, analysis: Dict, 
-                                   documents: List[Dict], query: str, response_type: str) -> Dict:
+                                   documents: List[Dict], query: str, response_type: str,
+                                   priority: str = "interactive", backend: Optional[str] = None) -> Dict:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.agent_urls['language']}/synthesize",
-                    json={
-                        "market_data": market_data,
-                        "analysis_results": analysis,
-                        "retrieved_documents": documents,
-                        "query": query,
-                        "response_type": response_type
-                    }
-                ) as response:
-                    return await response.json() if response.status == 200 else {}
+            async with self.clients.post(
+                "language", "/synthesize",
+                json={
+                    "market_data": market_data,
+                    "analysis_results": analysis,
+                    "retrieved_documents": documents,
+                    "query": query,
+                    "response_type": response_type,
+                    "priority": priority,
+                    "backend": backend
+                }
+            ) as response:
+                return await response.json() if response.status == 200 else {}
         except Exception as e:
             print(f"❌ Language Agent error: {e}")
             return {}
 
+    async def _stream_language_agent(self, market_data: Dict, analysis: Dict,
+                                     documents: List[Dict], query: str, response_type: str,
+                                     priority: str = "interactive",
+                                     backend: Optional[str] = None) -> AsyncIterator[Dict]:
+        try:
+            async with self.clients.post(
+                "language", "/synthesize/stream",
+                json={
+                    "market_data": market_data,
+                    "analysis_results": analysis,
+                    "retrieved_documents": documents,
+                    "query": query,
+                    "response_type": response_type,
+                    "priority": priority,
+                    "backend": backend
+                }
+            ) as response:
+                if response.status != 200:
+                    detail = await response.text()
+                    print(f"❌ Language Agent stream returned HTTP {response.status}")
+                    yield {"type": "error", "detail": f"Language agent returned HTTP {response.status}: {detail}"}
+                    return
+                async for line in response.content:
+                    if line.strip():
+                        yield json.loads(line)
+        except Exception as e:
+            print(f"❌ Language Agent stream error: {e}")
+            yield {"type": "error", "detail": f"Language agent stream failed: {str(e)}"}
+
 # ---------------- FastAPI Endpoints -------------------
 
 orchestrator = AgentOrchestrator()
@@ -404,24 +529,40 @@ async def process_trading_request(request: OrchestrationRequest):
         print(f"❌ Orchestration error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/process/stream")
+async def process_trading_request_stream(request: OrchestrationRequest):
+    """Process a trading request, streaming the AI response as NDJSON events"""
+    async def events():
+        try:
+            async for event in orchestrator.stream_request(request):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            print(f"❌ Orchestration stream error: {e}")
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 
 @app.get("/health")
 async def health_check():
     """Check health of all agents"""
     health_status = {}
-    for agent_name, url in orchestrator.agent_urls.items():
+    for agent_name in orchestrator.agent_urls:
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{url}/health", timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        health_status[agent_name] = "healthy"
-                    else:
-                        health_status[agent_name] = "unhealthy"
+            async with orchestrator.clients.get(
+                agent_name, "/health", timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                if response.status == 200:
+                    health_status[agent_name] = "healthy"
+                else:
+                    health_status[agent_name] = "unhealthy"
         except Exception as e:
             health_status[agent_name] = f"unreachable: {e}"
 
     return {
         "status": "healthy" if all(status == "healthy" for status in health_status.values()) else "degraded",
         "agents": health_status,
+        "pools": orchestrator.clients.metrics(),
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -1,12 +1,37 @@
+from config.settings import settings
+
+from typing import Dict
 import httpx
 
+# One long-lived client per service so calls reuse keep-alive connections
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+def get_client(service_name: str) -> httpx.AsyncClient:
+    client = _clients.get(service_name)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=f"http://{service_name}:8000",
+            limits=httpx.Limits(
+                max_connections=settings.AGENT_POOL_SIZE,
+                max_keepalive_connections=settings.AGENT_POOL_SIZE,
+                keepalive_expiry=settings.AGENT_KEEPALIVE_TIMEOUT
+            ),
+            timeout=settings.AGENT_TIMEOUTS.get(service_name, settings.AGENT_DEFAULT_TIMEOUT)
+        )
+        _clients[service_name] = client
+    return client
+
+async def close_clients():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
 async def get_agent_response(service_name: str, endpoint: str, payload: dict):
     url = f"http://{service_name}:8000{endpoint}"
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()
+        response = await get_client(service_name).post(endpoint, json=payload)
+        response.raise_for_status()
+        return response.json()
     except httpx.RequestError as e:
         print(f"❌ Request error calling {url}: {e}")
         return {}
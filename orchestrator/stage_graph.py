@@ -0,0 +1,62 @@
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple
+import asyncio
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+class StageGraph:
+    """Runs async stages as a dependency graph.
+
+    Each stage starts as soon as the stages it depends on have finished, so
+    independent agent calls overlap and the total latency is the critical
+    path rather than the sum of every hop.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Tuple[StageFunc, Tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: StageFunc, depends_on: Iterable[str] = ()):
+        """Register a stage; func receives a dict of its dependencies' results"""
+        depends_on = tuple(depends_on)
+        for dep in depends_on:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (func, depends_on)
+
+    async def run(self) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+        """Execute all stages and return (results, timings)
+
+        Timings are seconds relative to the start of the run, per stage:
+        when it started, how long it ran and when it finished.
+        """
+        origin = perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str):
+            func, depends_on = self.stages[name]
+            inputs = {dep: await tasks[dep] for dep in depends_on}
+            start = perf_counter()
+            try:
+                return await func(inputs)
+            finally:
+                end = perf_counter()
+                timings[name] = {
+                    "start": round(start - origin, 3),
+                    "duration": round(end - start, 3),
+                    "end": round(end - origin, 3)
+                }
+
+        # Stages only look up their dependencies once they run, so every task
+        # exists by the time it is awaited
+        for name in self.stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            values = await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return dict(zip(tasks.keys(), values)), timings
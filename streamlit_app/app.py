@@ -1,7 +1,8 @@
 import streamlit as st
 import requests
-from typing import List, Dict
+from typing import List, Dict, Iterator
 import io
+import json
 
 # Page config
 st.set_page_config(
@@ -124,6 +125,57 @@ def process_query(query: str, symbols: List[str], include_analysis: bool, respon
             "sources": []
         }
 
+def stream_query(query: str, symbols: List[str], include_analysis: bool, response_type: str,
+                 result: Dict) -> Iterator[str]:
+    """Yield response tokens from the orchestrator as they arrive
+
+    Fills result with the same fields as process_query once the stream ends,
+    plus time_to_first_token.
+    """
+    result.update({"content": "", "confidence": 0.0, "processing_time": None, "sources": []})
+    try:
+        with requests.post(
+            f"{ORCHESTRATOR_URL}/process/stream",
+            json={
+                "query": query,
+                "symbols": symbols,
+                "include_analysis": include_analysis,
+                "response_type": response_type
+            },
+            stream=True,
+            timeout=60
+        ) as response:
+            if response.status_code != 200:
+                result["content"] = f"Error: Service returned status {response.status_code}"
+                yield result["content"]
+                return
+            streamed = False
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "token":
+                    streamed = True
+                    yield event["content"]
+                elif event["type"] == "done":
+                    ai_resp = event.get("ai_response", {})
+                    result.update({
+                        "content": ai_resp.get("response", "No response generated"),
+                        "confidence": ai_resp.get("confidence", 0.0),
+                        "processing_time": event.get("processing_time"),
+                        "time_to_first_token": event.get("time_to_first_token"),
+                        "sources": ai_resp.get("sources", [])
+                    })
+                    if not streamed:
+                        # Unavailable or failed before any token: show the message instead
+                        yield result["content"]
+                elif event["type"] == "error":
+                    result["content"] = f"Error processing request: {event.get('detail')}"
+                    yield result["content"]
+    except Exception as e:
+        result["content"] = f"Error processing request: {str(e)}"
+        yield result["content"]
+
 def initialize_session_state():
     """Initialize session state variables"""
     if "messages" not in st.session_state:
@@ -485,29 +537,33 @@ def main():
 
             # Generate assistant response
             with st.chat_message("assistant"):
-                with st.spinner("Processing your request..."):
-                    response = process_query(prompt, symbols, include_analysis, response_type)
-                    st.markdown(response["content"])
+                response = {}
+                # Tokens render as they arrive; time to first token sets perceived latency
+                st.write_stream(stream_query(prompt, symbols, include_analysis, response_type, response))
 
-                    # Voice response if enabled
-                    if response_type == "voice" and response["content"]:
-                        with st.spinner("Generating voice response..."):
-                            voice_result = synthesize_speech(response["content"])
-                            if voice_result["success"]:
-                                st.audio(voice_result["audio_data"], format="audio/mp3")
-                            else:
-                                st.error(f"Voice synthesis failed: {voice_result['error']}")
+                # Voice response if enabled
+                if response_type == "voice" and response["content"]:
+                    with st.spinner("Generating voice response..."):
+                        voice_result = synthesize_speech(response["content"])
+                        if voice_result["success"]:
+                            st.audio(voice_result["audio_data"], format="audio/mp3")
+                        else:
+                            st.error(f"Voice synthesis failed: {voice_result['error']}")
 
-                    # Display metrics
-                    col_metrics1, col_metrics2 = st.columns(2)
-                    with col_metrics1:
-                        processing_time = response.get("processing_time")
-                        if processing_time:
+                # Display metrics
+                col_metrics1, col_metrics2 = st.columns(2)
+                with col_metrics1:
+                    processing_time = response.get("processing_time")
+                    if processing_time:
+                        first_token = response.get("time_to_first_token")
+                        if first_token is not None:
+                            st.caption(f"⏱️ First token in {first_token:.2f}s, processed in {processing_time:.2f}s")
+                        else:
                             st.caption(f"⏱️ Processed in {processing_time:.2f}s")
-                    
-                    with col_metrics2:
-                        if response.get("confidence", 0) > 0:
-                            st.caption(f"🎯 Confidence: {response['confidence']:.2%}")
+                
+                with col_metrics2:
+                    if response.get("confidence", 0) > 0:
+                        st.caption(f"🎯 Confidence: {response['confidence']:.2%}")
 
             # Add assistant message to history
             st.session_state.messages.append({"role": "assistant", "content": response["content"]})
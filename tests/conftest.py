@@ -0,0 +1,35 @@
+import socket
+
+import pytest
+
+from benchmarks.fake_llm_server import create_app, serve_in_thread
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def unreachable_url() -> str:
+    """Base URL of a local port nothing listens on"""
+    return f"http://127.0.0.1:{free_port()}"
+
+@pytest.fixture
+def serve():
+    """Start FastAPI apps on local ports; returns their base URLs and stops them afterwards"""
+    servers = []
+
+    def start(app) -> str:
+        port = free_port()
+        servers.append(serve_in_thread(app, port))
+        return f"http://127.0.0.1:{port}"
+
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+@pytest.fixture
+def fake_llm(serve):
+    """Fake OpenAI-compatible completion server; yields (app, base_url)"""
+    app = create_app(first_token_latency=0.05, token_latency=0.0)
+    yield app, serve(app) + "/v1"
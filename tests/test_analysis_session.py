@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from agents.analysis_session import AnalysisSession, RunningStats
+
+def test_running_stats_add_and_remove_match_numpy():
+    values = np.random.default_rng(0).normal(100, 15, 200)
+    stats = RunningStats()
+    for x in values:
+        stats.add(x)
+    for x in values[:150]:
+        stats.remove(x)
+
+    remaining = values[150:]
+    assert stats.count == len(remaining)
+    assert stats.mean == pytest.approx(remaining.mean())
+    assert stats.variance() == pytest.approx(remaining.var())
+    assert stats.variance(ddof=1) == pytest.approx(remaining.var(ddof=1))
+
+    for x in remaining:
+        stats.remove(x)
+    assert (stats.count, stats.mean, stats.variance()) == (0, 0.0, 0.0)
+
+def test_betas_match_numpy_including_a_holding_added_mid_session():
+    rng = np.random.default_rng(1)
+    session = AnalysisSession()
+    prices = {"AAPL": 190.0, "MSFT": 410.0, "XOM": 110.0}
+    session.apply({symbol: {"current_price": price} for symbol, price in prices.items()})
+
+    held_since = {symbol: 0 for symbol in prices}
+    portfolio, returns = [], {symbol: [] for symbol in ("AAPL", "MSFT", "XOM", "NVDA")}
+    for tick in range(120):
+        if tick == 60:
+            prices["NVDA"] = 120.0
+            held_since["NVDA"] = len(portfolio)
+            session.apply({"NVDA": {"current_price": 120.0}})
+        # Each tick moves a random subset; holdings that don't move return 0
+        moved = [symbol for symbol in prices if rng.random() < 0.6] or ["AAPL"]
+        before = sum(prices.values())
+        quotes = {}
+        for symbol in prices:
+            r = rng.normal(0.0005, 0.01) if symbol in moved else 0.0
+            returns[symbol].append(r)
+            if symbol in moved:
+                quotes[symbol] = {"current_price": prices[symbol] * (1 + r)}
+        portfolio.append(sum(quotes[s]["current_price"] - prices[s] for s in quotes) / before)
+        prices.update({symbol: quote["current_price"] for symbol, quote in quotes.items()})
+        session.apply(quotes)
+
+    betas = session.betas()
+    for symbol, start in held_since.items():
+        p = np.array(portfolio[start:])
+        expected = np.cov(returns[symbol], p)[0, 1] / np.var(p, ddof=1)
+        assert betas[symbol] == pytest.approx(expected, abs=1e-4)
+
+    assert session.updates == 120
+    assert session.volatility() == pytest.approx(np.std(list(prices.values())) / np.mean(list(prices.values())))
+
+def test_removed_holding_restarts_its_window():
+    session = AnalysisSession()
+    session.apply({"AAPL": {"current_price": 100.0}, "MSFT": {"current_price": 100.0}})
+    session.apply({"AAPL": {"current_price": 101.0}})
+    session.apply({"AAPL": None})
+    session.apply({"AAPL": {"current_price": 50.0}})
+    assert "AAPL" not in session.betas()
+    assert session.moments["AAPL"]["sum"] == 0.0
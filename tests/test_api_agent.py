@@ -0,0 +1,87 @@
+import asyncio
+from datetime import date, datetime
+from time import perf_counter
+
+from agents.api_agent import MarketDataService, polygon_session_candidates
+
+def quote(price: float, source: str) -> dict:
+    return {"current_price": price, "prev_close": price, "source": source}
+
+def test_hanging_symbol_does_not_hold_back_the_batch():
+    service = MarketDataService()
+
+    async def grouped(symbols, deadline=None):
+        return {"AAPL": quote(190.0, "polygon")} if "AAPL" in symbols else {}
+
+    async def bulk(symbols, deadline=None):
+        return {}
+
+    async def single(symbol, deadline=None):
+        if symbol == "HANG":
+            await asyncio.sleep(30)
+        return quote(410.0, "finnhub")
+
+    service.get_polygon_grouped_data = grouped
+    service.get_alpha_vantage_batch_data = bulk
+    service.providers = {"finnhub": single}
+    service.polygon_grouped_min_symbols = 1
+
+    start = perf_counter()
+    results = asyncio.run(service.get_many(["AAPL", "MSFT", "HANG"], deadline=0.2))
+
+    assert perf_counter() - start < 1
+    assert results["AAPL"]["source"] == "polygon"
+    assert results["MSFT"]["current_price"] == 410.0
+    assert results["HANG"] == {"error": "Timed out after 0.2s"}
+    # Results that arrived are cached even though the batch never finished
+    assert set(service.cache.entries) == {"AAPL", "MSFT"}
+
+def test_small_batches_skip_polygon_grouped_daily():
+    service = MarketDataService()
+    calls = []
+
+    async def grouped(symbols, deadline=None):
+        calls.append(list(symbols))
+        return {}
+
+    async def bulk(symbols, deadline=None):
+        return {}
+
+    async def single(symbol, deadline=None):
+        return quote(10.0, "finnhub")
+
+    service.get_polygon_grouped_data = grouped
+    service.get_alpha_vantage_batch_data = bulk
+    service.providers = {"finnhub": single}
+    service.polygon_grouped_min_symbols = 3
+
+    asyncio.run(service.get_many(["AAPL", "MSFT"]))
+    assert calls == []
+    asyncio.run(service.get_many(["TSM", "NVDA", "AMD"]))
+    assert calls == [["TSM", "NVDA", "AMD"]]
+
+def test_polygon_session_candidates_skip_weekends_and_known_dates():
+    monday = date(2024, 7, 8)
+    assert polygon_session_candidates(monday, 5, None, set()) == ["2024-07-05", "2024-07-04", "2024-07-03"]
+    # Independence Day seen closed; the last session ends the walk
+    assert polygon_session_candidates(monday, 5, "2024-07-03", {"2024-07-04"}) == ["2024-07-05", "2024-07-03"]
+    assert polygon_session_candidates(date(2024, 7, 6), 5, "2024-07-05", set()) == ["2024-07-05"]
+
+def test_polygon_grouped_daily_remembers_the_last_session():
+    service = MarketDataService()
+    service.polygon_key = "test"
+    candidates = polygon_session_candidates(datetime.utcnow().date(), service.POLYGON_GROUPED_LOOKBACK_DAYS, None, set())
+    holiday, session = candidates[0], candidates[1]
+    days = []
+
+    async def grouped_day(http, day, deadline=None):
+        days.append(day)
+        return [{"T": "AAPL", "c": 1.0, "o": 1.0, "h": 1.0, "l": 1.0, "v": 10}] if day == session else []
+
+    service._polygon_grouped_day = grouped_day
+    first = asyncio.run(service.get_polygon_grouped_data(["AAPL"]))
+    second = asyncio.run(service.get_polygon_grouped_data(["AAPL"]))
+
+    assert first == second and first["AAPL"]["source"] == "polygon"
+    # One probe of the holiday, then one call per request for the remembered session
+    assert days == [holiday, session, session]
@@ -0,0 +1,78 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from data_ingestion.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+WORDS = ["earnings", "guidance", "revenue", "margin", "buyback", "dividend", "chip", "oil",
+         "rate", "inflation", "cloud", "demand", "supply", "tariff", "merger", "lawsuit"]
+
+def corpus(size: int = 400, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    # Skewed word frequencies so terms have very different IDFs
+    weights = 1 / np.arange(1, len(WORDS) + 1)
+    weights /= weights.sum()
+    return [" ".join(rng.choice(WORDS, rng.integers(3, 30), p=weights)) for _ in range(size)]
+
+def reference_scores(documents: list, query: str, k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """Textbook Okapi BM25 with the Lucene-style non-negative IDF"""
+    tokenized = [tokenize(document) for document in documents]
+    average_length = sum(map(len, tokenized)) / len(tokenized)
+    scores = np.zeros(len(documents))
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(term in tokens for tokens in tokenized)
+        if not df:
+            continue
+        idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        for i, tokens in enumerate(tokenized):
+            tf = Counter(tokens)[term]
+            scores[i] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / average_length))
+    return scores
+
+def test_tokenizer_keeps_dotted_tickers_and_drops_stop_words():
+    assert tokenize("The $BRK.B and AAPL rally") == ["brk.b", "aapl", "rally"]
+
+def test_scores_match_reference_bm25():
+    documents = corpus(50)
+    index = BM25Index()
+    index.add(documents)
+    expected = reference_scores(documents, "earnings merger lawsuit")
+    scores, ids = index.search("earnings merger lawsuit", len(documents))
+    np.testing.assert_allclose(scores, expected[ids], rtol=1e-6)
+    assert set(ids) == set(np.flatnonzero(expected))
+
+@pytest.mark.parametrize("k", [1, 5, 20])
+def test_maxscore_top_k_equals_exhaustive_search(k):
+    documents = corpus()
+    index = BM25Index()
+    for start in range(0, len(documents), 100):
+        index.add(documents[start:start + 100])
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        query = " ".join(rng.choice(WORDS, rng.integers(1, 6)))
+        expected = reference_scores(documents, query)
+        scores, ids = index.search(query, k)
+        top = np.sort(expected)[::-1][:k]
+        np.testing.assert_allclose(scores, top[:len(scores)], rtol=1e-6)
+        np.testing.assert_allclose(expected[ids], scores, rtol=1e-6)
+
+def test_unknown_terms_and_empty_queries_return_nothing():
+    index = BM25Index()
+    index.add(corpus(10))
+    for query in ("", "the and", "zzz"):
+        scores, ids = index.search(query, 5)
+        assert len(scores) == len(ids) == 0
+
+def test_reciprocal_rank_fusion_orders_by_summed_reciprocal_rank():
+    lexical = np.array([7, 3, 1])
+    semantic = np.array([3, 9, 7, 4])
+    fused = reciprocal_rank_fusion([lexical, semantic], 4, rrf_k=60)
+
+    expected = {
+        7: 1 / 61 + 1 / 63, 3: 1 / 62 + 1 / 61, 1: 1 / 63, 9: 1 / 62, 4: 1 / 64
+    }
+    assert [doc_id for doc_id, _ in fused] == [3, 7, 9, 1]
+    for doc_id, score in fused:
+        assert score == pytest.approx(expected[doc_id])
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+
+from agents.columnar_portfolio import ColumnarPortfolio, write_columnar
+
+HOLDINGS = [
+    {"symbol": "AAPL", "shares": 10, "current_value": 1900.5, "hedged": True},
+    {"symbol": "MSFT", "current_value": 820.0, "hedged": False},
+    {"symbol": "TSM", "shares": 7, "hedged": None}
+]
+
+def test_column_types_round_trip(tmp_path):
+    write_columnar(HOLDINGS, str(tmp_path))
+    portfolio = ColumnarPortfolio(str(tmp_path))
+
+    assert portfolio.columns["shares"].dtype == np.int64
+    assert portfolio.columns["hedged"].dtype == np.bool_
+    assert portfolio.columns["current_value"].dtype == np.float64
+    assert set(portfolio.nulls) == {"shares", "hedged"}
+    assert list(portfolio) == [
+        {"symbol": "AAPL", "shares": 10, "current_value": 1900.5, "hedged": True},
+        {"symbol": "MSFT", "current_value": 820.0, "hedged": False},
+        {"symbol": "TSM", "shares": 7}
+    ]
+    assert isinstance(portfolio[0]["shares"], int) and isinstance(portfolio[0]["hedged"], bool)
+    assert portfolio.total("shares") == 17
+
+def test_previous_version_survives_until_the_next_write(tmp_path):
+    directory = str(tmp_path)
+    write_columnar(HOLDINGS, directory)
+    write_columnar(HOLDINGS[:2], directory)
+    # A reader that saw version 1's meta before the swap can still open its arrays
+    assert os.path.exists(os.path.join(directory, "symbol.1.npy"))
+    assert os.path.exists(os.path.join(directory, "shares.null.1.npy"))
+    assert len(ColumnarPortfolio(directory)) == 2
+
+    write_columnar(HOLDINGS[:1], directory)
+    versions = {name.rsplit(".", 2)[-2] for name in os.listdir(directory) if name.endswith(".npy")}
+    assert versions == {"2", "3"}
@@ -0,0 +1,67 @@
+import re
+
+import pytest
+
+from agents.context_builder import ContextBuilder, _approximate_tokens
+
+MARKET = {
+    symbol: {"current_price": 100.0 + i, "change": move, "change_percent": move}
+    for i, (symbol, move) in enumerate([
+        ("AAPL", 2.5), ("MSFT", -4.0), ("NVDA", 0.1), ("XOM", 1.0), ("JPM", -0.5),
+        ("TSM", 3.2), ("AMZN", -1.8), ("META", 0.7), ("GOOGL", -2.2), ("CVX", 0.3)
+    ])
+}
+ANALYSIS = {"analysis": {"risk_score": 6.1, "volatility": 24.0, "sector_diversification": 3}}
+DOCUMENTS = [
+    {"content": "Oil majors cut capex as crude slides; refiners see margin squeeze " * 4},
+    {"content": "NVDA supply constraints ease as new packaging capacity comes online " * 4},
+    {"content": "Short note on chip exports."}
+]
+
+def builder(budget: int, **kwargs) -> ContextBuilder:
+    return ContextBuilder(budget, count_tokens=_approximate_tokens, **kwargs)
+
+@pytest.mark.parametrize("budget", range(40, 420, 10))
+def test_context_fits_the_token_budget(budget):
+    for query in ("How are chip stocks doing?", "NVDA supply"):
+        context = builder(budget).build(query, MARKET, ANALYSIS, DOCUMENTS)
+        assert context["stats"]["context_tokens"] <= budget
+
+def test_quotes_named_in_the_query_come_first():
+    context = builder(100).build("What about NVDA and CVX today?", MARKET, ANALYSIS, [])
+    market = context["market"].split("; ")
+    # The two smallest movers, but named in the query; the rest follow by size of move
+    assert [line.split(":")[0] for line in market[:3]] == ["CVX", "NVDA", "MSFT"]
+
+def test_documents_keep_their_share_of_the_budget():
+    query = "NVDA supply"
+    crowded = builder(200, document_share=0.4).build(query, MARKET, ANALYSIS, DOCUMENTS)
+    quotes_only = builder(200, document_share=0.0).build(query, MARKET, ANALYSIS, DOCUMENTS)
+
+    assert quotes_only["stats"]["documents_included"] == 0
+    assert crowded["stats"]["documents_included"] >= 1
+    # The most relevant document is the one kept
+    assert crowded["documents"].startswith("NVDA supply constraints")
+    assert crowded["stats"]["quotes_included"] < quotes_only["stats"]["quotes_included"]
+
+def test_omitted_symbols_are_counted_in_a_note():
+    context = builder(60).build("How is the market?", MARKET, ANALYSIS, [])
+    stats = context["stats"]
+    omitted = stats["quotes_total"] - stats["quotes_included"]
+    assert omitted > 0
+    assert context["market"].endswith(f"(+{omitted} more symbols omitted)")
+
+    everything = builder(2000).build("How is the market?", MARKET, ANALYSIS, [])
+    assert "omitted" not in everything["market"]
+    assert everything["stats"]["quotes_included"] == len(MARKET)
+
+def test_compression_ratio_compares_available_and_packed_tokens():
+    stats = builder(80).build("How are chip stocks doing?", MARKET, ANALYSIS, DOCUMENTS)["stats"]
+    assert stats["original_tokens"] > stats["context_tokens"]
+    assert stats["compression_ratio"] == round(stats["original_tokens"] / stats["context_tokens"], 2)
+
+def test_only_truncated_snippets_get_an_ellipsis():
+    snippets = builder(2000, snippet_chars=50).rank_documents("chip exports", DOCUMENTS)
+    assert snippets[0] == "Short note on chip exports."
+    assert all(len(snippet) == 53 and snippet.endswith("...") for snippet in snippets[1:])
+    assert re.match(r"^(Oil|NVDA)", snippets[1])
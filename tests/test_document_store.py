@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from data_ingestion.document_store import OFFSETS_SUFFIX, SEGMENT_SUFFIX, DocumentStore
+
+def docs(start: int, count: int) -> list:
+    return [{"content": f"headline {i}", "metadata": {"ticker": "AAPL", "n": i}} for i in range(start, start + count)]
+
+def test_append_save_and_reopen(tmp_path):
+    path = str(tmp_path / "store.docs")
+    store = DocumentStore()
+    store.extend(docs(0, 3))
+    store.append(docs(3, 1)[0])
+    assert len(store) == 4 and store.persisted == 0
+    store.save(path)
+
+    reopened = DocumentStore(path)
+    assert DocumentStore.exists(path)
+    assert list(reopened) == docs(0, 4)
+    assert reopened[-1] == docs(3, 1)[0]
+    with pytest.raises(IndexError):
+        reopened[4]
+
+def test_saves_append_only_pending_records(tmp_path):
+    path = str(tmp_path / "store.docs")
+    store = DocumentStore()
+    store.extend(docs(0, 5))
+    store.save(path)
+    segment_size = os.path.getsize(path + SEGMENT_SUFFIX)
+
+    store.extend(docs(5, 2))
+    # Pending documents are readable before they are saved
+    assert store[6] == docs(6, 1)[0] and store.persisted == 5
+    store.save(path)
+    assert store.persisted == 7 and store.pending == []
+    assert os.path.getsize(path + OFFSETS_SUFFIX) == 7 * 8
+    with open(path + SEGMENT_SUFFIX, "rb") as f:
+        assert f.read(segment_size) == b"".join(
+            json.dumps(d).encode("utf-8") for d in docs(0, 5)
+        )
+    assert list(DocumentStore(path)) == docs(0, 7)
+
+def test_reader_maps_records_and_refreshes_after_another_writer_appends(tmp_path):
+    path = str(tmp_path / "store.docs")
+    writer = DocumentStore()
+    writer.extend(docs(0, 3))
+    writer.save(path)
+
+    reader = DocumentStore(path)
+    # Persisted records are read through the memory map, not held in memory
+    assert reader.pending == [] and reader._segment is not None
+    writer.extend(docs(3, 2))
+    writer.save(path)
+    assert len(reader) == 3
+    reader.refresh()
+    assert list(reader) == docs(0, 5)
+
+def test_save_to_a_new_path_copies_then_continues_there(tmp_path):
+    first, second = str(tmp_path / "a.docs"), str(tmp_path / "b.docs")
+    store = DocumentStore()
+    store.extend(docs(0, 2))
+    store.save(first)
+    store.extend(docs(2, 1))
+    store.save(second)
+
+    assert list(DocumentStore(first)) == docs(0, 2)
+    assert list(DocumentStore(second)) == docs(0, 3)
+
+def test_interrupted_save_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "store.docs")
+    store = DocumentStore()
+    store.extend(docs(0, 2))
+    store.save(path)
+    # A record written to the segment whose offset never made it to .idx
+    with open(path + SEGMENT_SUFFIX, "ab") as f:
+        f.write(b'{"content": "half')
+
+    store.extend(docs(2, 1))
+    store.save(path)
+    assert list(DocumentStore(path)) == docs(0, 3)
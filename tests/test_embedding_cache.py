@@ -0,0 +1,56 @@
+import numpy as np
+
+from data_ingestion.embedding_cache import EmbeddingCache, content_key
+
+def vector(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=4).astype(np.float32)
+
+def keys(*texts) -> list:
+    return [content_key("model", text) for text in texts]
+
+def test_keys_depend_on_model_and_text():
+    assert content_key("model", "AAPL beats") == content_key("model", "AAPL beats")
+    assert content_key("model", "AAPL beats") != content_key("other-model", "AAPL beats")
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    a, b, c = keys("a", "b", "c")
+    cache.set_many({a: vector(0), b: vector(1)})
+    # Reading a makes b the least recently used
+    assert set(cache.get_many([a])) == {a}
+    cache.set_many({c: vector(2)})
+
+    assert set(cache.get_many([a, b, c])) == {a, c}
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+
+def test_hits_duplicates_and_avoided_rate():
+    cache = EmbeddingCache(max_entries=10)
+    a, b = keys("a", "b")
+    assert cache.get_many([a, a, b]) == {}
+    cache.set_many({a: vector(0), b: vector(1)})
+    found = cache.get_many([a, b, a])
+
+    np.testing.assert_array_equal(found[a], vector(0))
+    stats = cache.stats()
+    assert (stats["hits"], stats["duplicates"], stats["encoded"]) == (2, 2, 2)
+    assert stats["avoided"] == 4 and stats["avoided_rate"] == round(4 / 6, 3)
+
+def test_sqlite_store_survives_restart_and_eviction(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    a, b = keys("a", "b")
+    cache = EmbeddingCache(max_entries=1, disk_path=path)
+    cache.set_many({a: vector(0), b: vector(1)})
+    # a was evicted from memory but is still on disk
+    assert a not in cache.entries
+    np.testing.assert_array_equal(cache.get_many([a])[a], vector(0))
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    restarted = EmbeddingCache(max_entries=10, disk_path=path)
+    found = restarted.get_many([a, b])
+    np.testing.assert_array_equal(found[b], vector(1))
+    assert restarted.stats()["disk_hits"] == 2 and restarted.stats()["size"] == 2
+    # Now in memory: served without touching disk
+    restarted.get_many([a, b])
+    assert restarted.stats()["hits"] == 2
+    restarted.close()
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from agents.language_agent import LanguageRequest, LanguageService
+from agents.llm_backends import LLMBackend, OpenAIBackend
+
+def test_backend_without_complete_fails_at_construction():
+    class Incomplete(LLMBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_unavailable_response_names_the_backend_and_reason():
+    class Offline(LLMBackend):
+        name = "offline"
+
+        @property
+        def unavailable_reason(self):
+            return "model weights not downloaded"
+
+        async def complete(self, messages, context, query, max_tokens):
+            return ""
+
+    service = LanguageService()
+    service.backends["offline"] = Offline()
+    service.backends["openai"] = OpenAIBackend(None, "gpt-3.5-turbo")
+
+    def ask(backend: str):
+        request = LanguageRequest(market_data={}, analysis_results={}, retrieved_documents=[],
+                                  query="How is tech?", backend=backend)
+        return asyncio.run(service.generate_response(request))
+
+    offline = ask("offline")
+    assert offline.response == "The offline backend is unavailable: model weights not downloaded"
+    assert offline.backend == "offline" and offline.confidence == 0.0
+    assert "OpenAI API key not configured" in ask("openai").response
+
+@pytest.mark.parametrize("remote", [False, True])
+def test_failing_backend_returns_an_error_response_naming_it(remote):
+    class Broken(LLMBackend):
+        name = "broken"
+        model = "broken-v1"
+
+        async def complete(self, messages, context, query, max_tokens):
+            raise RuntimeError("weights corrupted")
+
+        async def stream(self, messages, context, query, max_tokens):
+            yield "Partial "
+            raise RuntimeError("weights corrupted")
+
+    Broken.remote = remote
+    service = LanguageService()
+    service.backends["broken"] = Broken()
+    service.cache = None
+    service.semantic_cache = None
+    request = LanguageRequest(market_data={}, analysis_results={}, retrieved_documents=[],
+                              query="How is tech?", backend="broken")
+
+    response = asyncio.run(service.generate_response(request))
+    assert response.response == "Unable to generate response: weights corrupted"
+    assert response.backend == "broken" and response.confidence == 0.0
+
+    async def stream():
+        return [event async for event in service.stream_response(request)]
+
+    events = asyncio.run(stream())
+    assert [event["type"] for event in events] == ["token", "error"]
+    assert "weights corrupted" in events[-1]["detail"]
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.language_agent import LanguageRequest, LanguageService
+from agents.llm_backends import OpenAIBackend
+from agents.llm_dispatcher import DeadlineExceeded, LLMDispatcher
+from orchestrator.main import app as orchestrator_app
+
+async def hold(dispatcher: LLMDispatcher, release: asyncio.Event, priority: str = "interactive"):
+    async with dispatcher.slot(priority):
+        await release.wait()
+
+def test_interactive_is_dispatched_before_queued_background():
+    async def scenario():
+        dispatcher = LLMDispatcher(1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(dispatcher, release))
+        await asyncio.sleep(0)
+        order = []
+
+        async def call(name: str, priority: str):
+            async with dispatcher.slot(priority):
+                order.append(name)
+
+        waiters = [asyncio.create_task(call("report-1", "background")),
+                   asyncio.create_task(call("report-2", "background"))]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.create_task(call("chat", "interactive")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return order, dispatcher
+
+    order, dispatcher = asyncio.run(scenario())
+    assert order == ["chat", "report-1", "report-2"]
+    assert dispatcher.in_flight == 0
+
+def test_expired_deadline_is_shed_on_arrival():
+    async def scenario():
+        dispatcher = LLMDispatcher(1)
+        with pytest.raises(DeadlineExceeded):
+            async with dispatcher.slot("interactive", deadline=-1):
+                pass
+
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(dispatcher, release))
+        await asyncio.sleep(0)
+        # No slot free and no time left to queue
+        with pytest.raises(DeadlineExceeded):
+            async with dispatcher.slot("interactive", deadline=0):
+                pass
+        release.set()
+        await holder
+        return dispatcher.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["priorities"]["interactive"]["shed"] == 2
+    assert stats["priorities"]["interactive"]["queued"] == 0
+
+def test_deadline_passing_in_queue_sheds_and_frees_the_queue():
+    async def scenario():
+        dispatcher = LLMDispatcher(1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(dispatcher, release))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded, match="still queued"):
+            async with dispatcher.slot("background", deadline=0.05):
+                pass
+        stats = dispatcher.stats()
+        release.set()
+        await holder
+        return stats, dispatcher
+
+    stats, dispatcher = asyncio.run(scenario())
+    assert stats["priorities"]["background"]["queue_depth"] == 0
+    assert stats["priorities"]["background"]["shed"] == 1
+    assert dispatcher.in_flight == 0
+
+def test_cancelled_callers_give_back_their_slots():
+    async def scenario():
+        dispatcher = LLMDispatcher(1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(dispatcher, release))
+        queued = asyncio.create_task(hold(dispatcher, asyncio.Event()))
+        await asyncio.sleep(0)
+        assert dispatcher.in_flight == 1
+
+        # Cancelled while queued: never takes a slot
+        queued.cancel()
+        # Cancelled while holding the slot: releases it
+        holder.cancel()
+        await asyncio.gather(holder, queued, return_exceptions=True)
+        assert dispatcher.in_flight == 0
+
+        async with dispatcher.slot("interactive", deadline=0):
+            assert dispatcher.in_flight == 1
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert dispatcher.in_flight == 0
+
+def test_fake_server_never_sees_more_than_max_in_flight(fake_llm):
+    fake_app, base_url = fake_llm
+    service = LanguageService()
+    service.backends["openai"] = OpenAIBackend("fake", "gpt-3.5-turbo", base_url)
+    service.cache = None
+    service.semantic_cache = None
+    service.dispatcher = LLMDispatcher(3)
+
+    async def burst():
+        requests = [
+            LanguageRequest(market_data={}, analysis_results={}, retrieved_documents=[],
+                            query=f"request {i}", priority="background" if i % 2 else "interactive",
+                            backend="openai")
+            for i in range(12)
+        ]
+        return await asyncio.gather(*(service.generate_response(request) for request in requests))
+
+    responses = asyncio.run(burst())
+    assert all(response.backend == "openai" and response.confidence > 0 for response in responses)
+    assert fake_app.state.requests == 12
+    assert fake_app.state.peak_in_flight == 3
+    assert service.dispatcher.in_flight == 0
+
+def test_orchestrator_rejects_unknown_priority():
+    response = TestClient(orchestrator_app).post("/process", json={"query": "How is tech?", "priority": "urgent"})
+    assert response.status_code == 422
+
+def test_shed_stream_ends_with_an_error_event(fake_llm):
+    _, base_url = fake_llm
+    service = LanguageService()
+    service.backends["openai"] = OpenAIBackend("fake", "gpt-3.5-turbo", base_url)
+    service.cache = None
+    service.semantic_cache = None
+    service.dispatcher = LLMDispatcher(1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(service.dispatcher, release))
+        await asyncio.sleep(0)
+        request = LanguageRequest(market_data={}, analysis_results={}, retrieved_documents=[],
+                                  query="How is tech?", backend="openai", deadline=0)
+        events = [event async for event in service.stream_response(request)]
+        release.set()
+        await holder
+        return events
+
+    events = asyncio.run(scenario())
+    assert [event["type"] for event in events] == ["error"]
+    assert events[0]["detail"].startswith("Service busy, please retry")
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from agents.api_agent import MarketDataService
+from agents.rate_limiter import RateLimitExceeded
+
+class FakeClock:
+    """Time that only moves when a waiter sleeps or the test advances it"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+def test_burst_throttle_refill_on_fake_clock():
+    clock = FakeClock()
+    service = MarketDataService(clock=clock, sleep=clock.sleep)
+    bucket = service.limiter.buckets["alpha_vantage"]
+    assert bucket.capacity == 5
+
+    async def scenario():
+        # Burst: the full 5/min budget goes out without waiting
+        waits = [await service.limiter.acquire("alpha_vantage") for _ in range(5)]
+        assert waits == [0, 0, 0, 0, 0]
+        assert service.limiter.rank(["alpha_vantage", "finnhub"]) == ["finnhub", "alpha_vantage"]
+
+        # Throttle: the next caller queues for one refill interval (12s at 5/min)
+        assert await service.limiter.acquire("alpha_vantage") == pytest.approx(12)
+        # A caller that cannot get a token before its deadline is turned away, not queued
+        with pytest.raises(RateLimitExceeded):
+            await service.limiter.acquire("alpha_vantage", deadline=clock() + 5)
+        assert bucket.queue_depth == 0
+
+        # Refill: a minute later the whole burst is available again
+        clock.now += 60
+        waits = [await service.limiter.acquire("alpha_vantage", deadline=clock()) for _ in range(5)]
+        assert waits == [0, 0, 0, 0, 0]
+
+    asyncio.run(scenario())
+    assert clock.slept == [pytest.approx(12)]
+    stats = bucket.stats()
+    assert (stats["acquired"], stats["rejected"]) == (11, 1)
+
+def test_exhausted_provider_is_skipped_before_the_deadline():
+    clock = FakeClock()
+    service = MarketDataService(clock=clock, sleep=clock.sleep)
+    calls = []
+
+    def provider(name: str):
+        async def fetch(symbol, deadline=None):
+            await service.limiter.acquire(name, deadline)
+            calls.append(name)
+            return {"current_price": 10.0, "source": name}
+        return fetch
+
+    service.providers = {name: provider(name) for name in ("polygon", "finnhub", "alpha_vantage")}
+    for bucket in service.limiter.buckets.values():
+        bucket.tokens = 0
+
+    data = asyncio.run(service._fetch_symbol_data("AAPL", deadline=clock() + 2))
+    # Finnhub (60/min) refills within the deadline; the 5/min tiers are not waited on
+    assert data["source"] == "finnhub"
+    assert calls == ["finnhub"]
+    assert clock.slept == [pytest.approx(1)]
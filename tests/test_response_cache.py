@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from agents.language_agent import LanguageRequest, LanguageService
+from agents.llm_backends import LLMBackend
+from agents.response_cache import (
+    DiskResponseBackend, MemoryResponseBackend, ResponseCache, SemanticResponseCache, market_data_ttl
+)
+
+PARAPHRASES = ("How is my tech exposure?", "What's my technology exposure today?")
+
+class ParaphraseEmbeddings:
+    """Embeds every query about exposure to the same unit vector"""
+
+    def encode_query(self, query: str) -> np.ndarray:
+        vector = np.zeros((1, 4), dtype=np.float32)
+        vector[0, 0 if "exposure" in query else 1] = 1.0
+        return vector
+
+class CountingBackend(LLMBackend):
+    name = "counting"
+    model = "counting-v1"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, messages, context, query, max_tokens):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+def request(query: str, source: str) -> LanguageRequest:
+    return LanguageRequest(
+        market_data={"AAPL": {"current_price": 190.1, "source": "polygon"}},
+        analysis_results={},
+        retrieved_documents=[{"content": f"Coverage from {source}", "metadata": {"source": source}}],
+        query=query,
+        backend="counting"
+    )
+
+def test_semantic_cache_requires_the_same_retrieved_documents():
+    service = LanguageService()
+    backend = CountingBackend()
+    service.backends["counting"] = backend
+    service.cache = None
+    service.semantic_cache = SemanticResponseCache(ParaphraseEmbeddings(), 10, 0.9)
+
+    async def scenario():
+        first = await service.generate_response(request(PARAPHRASES[0], "reuters"))
+        paraphrase = await service.generate_response(request(PARAPHRASES[1], "reuters"))
+        other_evidence = await service.generate_response(request(PARAPHRASES[1], "bloomberg"))
+        return first, paraphrase, other_evidence
+
+    first, paraphrase, other_evidence = asyncio.run(scenario())
+    assert paraphrase.cached and paraphrase.response == first.response
+    assert not other_evidence.cached
+    assert other_evidence.sources == ["bloomberg"]
+    assert backend.calls == 2
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+TTLS = {"polygon": 300.0, "finnhub": 5.0}
+NOW = datetime(2026, 3, 2, 15, 30)
+
+def quote(source: str, seconds_old: float) -> dict:
+    return {"current_price": 100.0, "source": source, "timestamp": (NOW - timedelta(seconds=seconds_old)).isoformat()}
+
+def test_ttl_is_set_by_the_stalest_quote():
+    # Polygon quote fetched 100s ago has 200s left; the finnhub quote 2s ago has 3s left
+    market = {"AAPL": quote("polygon", 100), "MSFT": quote("finnhub", 2)}
+    assert market_data_ttl(market, TTLS, 60, 30, now=NOW) == pytest.approx(3.0)
+    assert market_data_ttl({"AAPL": quote("polygon", 100)}, TTLS, 60, 30, now=NOW) == pytest.approx(200.0)
+    # Unknown providers use the default TTL, quotes without timestamps count as just fetched
+    assert market_data_ttl({"AAPL": {"current_price": 1.0, "source": "other"}}, TTLS, 60, 30, now=NOW) == 60
+    # Already stale
+    assert market_data_ttl({"AAPL": quote("finnhub", 10)}, TTLS, 60, 30, now=NOW) < 0
+    # No quotes (errors don't count)
+    assert market_data_ttl({"AAPL": {"error": "No data"}}, TTLS, 60, 30, now=NOW) == 30
+
+@pytest.fixture(params=["memory", "disk"])
+def backend(request, tmp_path):
+    clock = Clock()
+    if request.param == "memory":
+        yield MemoryResponseBackend(2, clock=clock), clock
+    else:
+        disk = DiskResponseBackend(str(tmp_path / "cache" / "responses.sqlite"), 2, clock=clock)
+        yield disk, clock
+        disk.db.close()
+
+def test_backends_evict_least_recently_used(backend):
+    backend, clock = backend
+    backend.set("a", {"response": "A"}, 60)
+    clock.now += 1
+    backend.set("b", {"response": "B"}, 60)
+    clock.now += 1
+    # Reading a makes b the least recently used
+    assert backend.get("a") == {"response": "A"}
+    clock.now += 1
+    backend.set("c", {"response": "C"}, 60)
+
+    assert len(backend) == 2
+    assert backend.get("b") is None
+    assert backend.get("a") == {"response": "A"} and backend.get("c") == {"response": "C"}
+
+def test_backends_expire_and_delete_entries(backend):
+    backend, clock = backend
+    backend.set("short", {"response": "S"}, 5)
+    backend.set("long", {"response": "L"}, 60)
+    clock.now += 5
+    assert backend.get("short") is None
+    assert len(backend) == 1
+    assert backend.get("long") == {"response": "L"}
+
+    clock.now += 60
+    backend.set("new", {"response": "N"}, 60)
+    if isinstance(backend, DiskResponseBackend):
+        # The shared file also purges every expired row on store; memory expires on read
+        assert len(backend) == 1
+    assert backend.get("long") is None and backend.get("new") == {"response": "N"}
+    assert len(backend) == 1
+
+def test_disk_backend_is_shared_across_instances(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "responses.sqlite")
+    writer = DiskResponseBackend(path, 10, clock=clock)
+    writer.set("key", {"response": "cached", "confidence": 0.8}, 60)
+    reader = DiskResponseBackend(path, 10, clock=clock)
+    assert reader.get("key") == {"response": "cached", "confidence": 0.8}
+    writer.db.close()
+    reader.db.close()
+
+def test_response_cache_counts_and_skips_stale_responses():
+    clock = Clock()
+    cache = ResponseCache(MemoryResponseBackend(10, clock=clock))
+    cache.set("stale", {"response": "old"}, 0)
+    cache.set("stale", {"response": "older"}, -3)
+    assert cache.get("stale") is None
+
+    cache.set("fresh", {"response": "new"}, 30)
+    assert cache.get("fresh") == {"response": "new"}
+    assert cache.get("fresh") == {"response": "new"}
+    assert cache.stats() == {
+        "hits": 2, "misses": 1, "stores": 1, "uncacheable": 2,
+        "backend": "MemoryResponseBackend", "size": 1, "hit_rate": round(2 / 3, 3)
+    }
@@ -0,0 +1,151 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.analysis_agent import app as analysis_app
+from agents.risk_engine import (
+    _tail_stats, build_return_matrix, historical_var, horizon_returns, monte_carlo_var,
+    parametric_var, portfolio_risk
+)
+
+def sample_returns(days: int = 250, holdings: int = 6, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, (days, 1))
+    return factor * rng.uniform(0.5, 1.5, holdings) + rng.normal(0, 0.005, (days, holdings))
+
+def test_vectorized_risk_matches_explicit_covariance():
+    returns = sample_returns()
+    exposures = np.array([5.0, 1.0, 3.0, 0.5, 2.0, 4.0])
+    risk = portfolio_risk(exposures, returns)
+
+    w = exposures / exposures.sum()
+    cov = np.cov(returns, rowvar=False)
+    variance = w @ cov @ w
+    assert risk["volatility"] == pytest.approx(np.sqrt(variance))
+    assert risk["annualized_volatility"] == pytest.approx(np.sqrt(variance * 252))
+    np.testing.assert_allclose(risk["beta_to_portfolio"], cov @ w / variance)
+    np.testing.assert_allclose(risk["marginal_contribution"], cov @ w / np.sqrt(variance))
+    assert risk["risk_contribution"].sum() == pytest.approx(risk["volatility"])
+    np.testing.assert_allclose(risk["portfolio_returns"], returns @ w)
+
+def test_benchmark_betas_match_numpy():
+    returns = sample_returns()
+    benchmark = returns.mean(axis=1) + np.random.default_rng(1).normal(0, 0.002, len(returns))
+    exposures = np.ones(returns.shape[1])
+    risk = portfolio_risk(exposures, returns, benchmark)
+
+    expected = [np.cov(returns[:, j], benchmark)[0, 1] / np.var(benchmark, ddof=1) for j in range(returns.shape[1])]
+    np.testing.assert_allclose(risk["asset_betas"], expected)
+    assert risk["portfolio_beta"] == pytest.approx(np.mean(expected))
+
+def test_return_matrix_aligns_on_most_recent_observations():
+    matrix = build_return_matrix({"A": [1, 2, 3, 4], "B": [7, 8]}, ["A", "B"])
+    np.testing.assert_array_equal(matrix, [[3, 7], [4, 8]])
+
+def analyze_payload(**overrides) -> dict:
+    returns = sample_returns(days=60, holdings=3)
+    payload = {
+        "market_data": {
+            "AAPL": {"current_price": 190.0, "sector": "Technology"},
+            "MSFT": {"current_price": 410.0, "sector": "Technology"},
+            "XOM": {"current_price": 110.0, "sector": "Energy"}
+        },
+        "returns": {symbol: returns[:, j].tolist() for j, symbol in enumerate(["AAPL", "MSFT", "XOM"])}
+    }
+    payload.update(overrides)
+    return payload
+
+def test_analyze_keeps_the_price_dispersion_risk_score():
+    client = TestClient(analysis_app)
+    without_returns = client.post("/analyze", json={"market_data": analyze_payload()["market_data"]}).json()
+    with_returns = client.post("/analyze", json=analyze_payload()).json()
+
+    for field in ("risk_score", "volatility"):
+        assert with_returns["analysis"][field] == without_returns["analysis"][field]
+    assert with_returns["analysis"]["risk"]["holdings"] == 3
+
+def test_analyze_rejects_partial_weights():
+    client = TestClient(analysis_app)
+    response = client.post("/analyze", json=analyze_payload(weights={"AAPL": 1000.0, "MSFT": 500.0}))
+    assert response.status_code == 400
+    assert "XOM" in response.json()["detail"]
+
+    full = client.post("/analyze", json=analyze_payload(weights={"AAPL": 1000.0, "MSFT": 500.0, "XOM": 500.0}))
+    weights = {row["symbol"]: row["weight"] for row in full.json()["analysis"]["risk"]["top_risk_contributors"]}
+    assert weights == {"AAPL": 0.5, "MSFT": 0.25, "XOM": 0.25}
+
+# ---------------- Value at Risk -------------------
+
+def test_tail_stats_on_a_known_sample():
+    losses = np.random.default_rng(0).permutation(np.arange(1.0, 101.0))
+    assert _tail_stats(losses, 0.95) == {"var": 96.0, "cvar": 98.0}
+    # At least one observation is always in the tail
+    assert _tail_stats(losses, 0.999) == {"var": 100.0, "cvar": 100.0}
+
+def test_horizon_returns_are_overlapping_sums():
+    returns = np.array([0.01, 0.02, -0.03, 0.04])
+    np.testing.assert_array_equal(horizon_returns(returns, 1), returns)
+    np.testing.assert_allclose(horizon_returns(returns, 2), [0.03, -0.01, 0.01])
+    np.testing.assert_allclose(horizon_returns(returns, 4), [0.04])
+    assert len(horizon_returns(returns, 5)) == 0
+
+def test_historical_var_reads_the_empirical_quantile():
+    returns = -np.arange(1.0, 101.0) / 1000
+    assert historical_var(returns, 0.95) == pytest.approx({"var": 0.096, "cvar": 0.098})
+    with pytest.raises(ValueError):
+        historical_var(returns[:3], 0.95, horizon_days=5)
+
+def test_monte_carlo_converges_to_parametric_on_gaussian_data():
+    returns = sample_returns(days=2000, holdings=4, seed=3)
+    weights = np.array([4.0, 3.0, 2.0, 1.0])
+    portfolio_returns = portfolio_risk(weights, returns)["portfolio_returns"]
+
+    parametric = parametric_var(portfolio_returns, 0.99)
+    monte_carlo = asyncio.run(monte_carlo_var(
+        returns, weights, 0.99, 400_000, seed=42, parallel_threshold=100_000, workers=2
+    ))
+    assert monte_carlo["var"] == pytest.approx(parametric["var"], rel=0.02)
+    assert monte_carlo["cvar"] == pytest.approx(parametric["cvar"], rel=0.02)
+    # Same seed, same answer
+    again = asyncio.run(monte_carlo_var(
+        returns, weights, 0.99, 400_000, seed=42, parallel_threshold=100_000, workers=2
+    ))
+    assert again == monte_carlo
+
+def var_payload(**overrides) -> dict:
+    returns = sample_returns(days=100, holdings=2)
+    payload = {
+        "returns": {"AAPL": returns[:, 0].tolist(), "MSFT": returns[:, 1].tolist()},
+        "weights": {"AAPL": 60_000.0, "MSFT": 40_000.0},
+        "paths": 5_000,
+        "seed": 1
+    }
+    payload.update(overrides)
+    return payload
+
+def test_var_endpoint_reports_all_three_methods():
+    response = TestClient(analysis_app).post("/risk/var", json=var_payload())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["portfolio_value"] == 100_000.0
+    for method in ("historical", "parametric", "monte_carlo"):
+        assert 0 < body[method]["var"] <= body[method]["cvar"]
+        assert body[method]["var_amount"] == pytest.approx(body[method]["var"] * 100_000, rel=1e-4)
+
+@pytest.mark.parametrize("overrides, detail", [
+    ({"weights": {"TSM": 1.0}}, "No holdings"),
+    ({"confidence": 1.0}, "confidence"),
+    ({"confidence": 0.2}, "confidence"),
+    ({"paths": 0}, "paths"),
+    ({"paths": 10**12}, "paths"),
+    ({"horizon_days": 0}, "horizon_days"),
+    ({"horizon_days": 500}, "Not enough history"),
+    ({"distribution": "cauchy"}, "Unknown distribution"),
+    ({"distribution": "student_t", "degrees_of_freedom": 2}, "degrees_of_freedom"),
+])
+def test_var_endpoint_rejects_invalid_requests(overrides, detail):
+    response = TestClient(analysis_app).post("/risk/var", json=var_payload(**overrides))
+    assert response.status_code == 400
+    assert detail in response.json()["detail"]
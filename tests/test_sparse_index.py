@@ -0,0 +1,70 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from data_ingestion.sparse_index import IncrementalTfidfIndex
+
+SECTORS = ["technology", "energy", "healthcare", "financials", "utilities", "materials"]
+VERBS = ["rallied", "slipped", "outperformed", "lagged", "rebounded"]
+
+def corpus(size: int = 60, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        f"{rng.choice(SECTORS)} stocks {rng.choice(VERBS)} as {rng.choice(SECTORS)} "
+        f"earnings {rng.choice(VERBS)} in quarter {i % 4 + 1} report {i}"
+        for i in range(size)
+    ]
+
+def incremental(documents: list, batches: int = 4, **kwargs) -> IncrementalTfidfIndex:
+    index = IncrementalTfidfIndex(**kwargs)
+    for batch in np.array_split(np.array(documents, dtype=object), batches):
+        index.add(list(batch))
+    return index
+
+def as_vectorizer_columns(index: IncrementalTfidfIndex, vectorizer: TfidfVectorizer, matrix) -> np.ndarray:
+    """Reorder our feature columns into the vectorizer's alphabetical order"""
+    position = {column: i for i, column in enumerate(index.features())}
+    order = [position[index.vocabulary[term]] for term in vectorizer.get_feature_names_out()]
+    return matrix.toarray()[:, order]
+
+# 41 falls between two term frequencies of corpus(); at a tie TfidfVectorizer's
+# choice depends on an unstable argsort, while ours is alphabetical
+@pytest.mark.parametrize("max_features", [None, 41])
+def test_incremental_adds_match_a_vectorizer_fitted_on_the_whole_corpus(max_features):
+    documents = corpus()
+    index = incremental(documents, max_features=max_features)
+    if max_features:
+        frequencies = np.sort(index.term_frequency[:len(index.vocabulary)])[::-1]
+        assert frequencies[max_features - 1] > frequencies[max_features]
+    vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), max_features=max_features)
+    expected = vectorizer.fit_transform(documents)
+
+    assert len(index.features()) == expected.shape[1]
+    np.testing.assert_allclose(as_vectorizer_columns(index, vectorizer, index.transform(documents)),
+                               expected.toarray(), rtol=1e-5, atol=1e-6)
+
+    query = "technology stocks rallied"
+    scores, ids = index.search(query, 5)
+    similarities = (expected @ vectorizer.transform([query]).T).toarray().ravel()
+    np.testing.assert_allclose(scores, np.sort(similarities)[::-1][:5], rtol=1e-5)
+    np.testing.assert_allclose(similarities[ids], scores, rtol=1e-5)
+
+def test_feature_cap_bounds_the_dense_width_but_keeps_every_count():
+    documents = corpus()
+    index = incremental(documents, max_features=25)
+    assert index.transform(documents[:3]).shape == (3, 25)
+    assert len(index.vocabulary) > 25
+    # The most frequent terms can change as documents arrive, so counts are kept for all terms
+    assert index.term_frequency[:len(index.vocabulary)].sum() == index.matrix().sum()
+
+def test_pickle_round_trip_keeps_the_cap_and_scores():
+    documents = corpus()
+    index = incremental(documents, max_features=30)
+    restored = pickle.loads(pickle.dumps(index))
+    restored.add(["technology rallied again"])
+    index.add(["technology rallied again"])
+    np.testing.assert_array_equal(restored.features(), index.features())
+    for a, b in zip(restored.search("technology rallied", 5), index.search("technology rallied", 5)):
+        np.testing.assert_allclose(a, b)
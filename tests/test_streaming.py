@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents import language_agent
+from agents.llm_backends import LLMBackend, OpenAIBackend
+from agents.response_cache import MemoryResponseBackend, ResponseCache
+from benchmarks.fake_llm_server import DEFAULT_TEXT
+from orchestrator import main as orchestrator_main
+from orchestrator.agent_clients import AgentClientPool
+
+PAYLOAD = {
+    "market_data": {"AAPL": {"current_price": 190.1, "change": 1.2, "change_percent": 0.6}},
+    "analysis_results": {"analysis": {"risk_score": 6.1, "volatility": 24.0}},
+    "retrieved_documents": [],
+    "query": "What's our risk exposure in tech stocks today?",
+    "response_type": "detailed",
+    "backend": "openai"
+}
+
+class FailingBackend(LLMBackend):
+    name = "failing"
+    model = "failing-v1"
+
+    async def complete(self, messages, context, query, max_tokens):
+        raise RuntimeError("provider exploded")
+
+    async def stream(self, messages, context, query, max_tokens):
+        yield "Partial "
+        raise RuntimeError("provider exploded")
+
+@pytest.fixture
+def language_service(fake_llm, monkeypatch):
+    _, base_url = fake_llm
+    service = language_agent.language_service
+    monkeypatch.setitem(service.backends, "openai", OpenAIBackend("fake", "gpt-3.5-turbo", base_url))
+    monkeypatch.setitem(service.backends, "failing", FailingBackend())
+    monkeypatch.setattr(service, "cache", ResponseCache(MemoryResponseBackend(100)))
+    monkeypatch.setattr(service, "_semantic_cache", None)
+    return service
+
+def stream_events(client, path: str, payload: dict) -> list:
+    with client.stream("POST", path, json=payload) as response:
+        assert response.status_code == 200
+        return [json.loads(line) for line in response.iter_lines() if line.strip()]
+
+def test_synthesize_stream_sends_tokens_in_order_then_done(language_service):
+    events = stream_events(TestClient(language_agent.app), "/synthesize/stream", PAYLOAD)
+
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == DEFAULT_TEXT
+    assert [event["type"] for event in events[-2:]] == ["token", "done"]
+    assert events[-1]["response"] == DEFAULT_TEXT
+    assert events[-1]["cached"] is False
+
+def test_synthesize_stream_cache_hit_is_one_token(language_service, fake_llm):
+    fake_app, _ = fake_llm
+    client = TestClient(language_agent.app)
+    stream_events(client, "/synthesize/stream", PAYLOAD)
+    events = stream_events(client, "/synthesize/stream", PAYLOAD)
+
+    assert [event["type"] for event in events] == ["token", "done"]
+    assert events[0]["content"] == DEFAULT_TEXT
+    assert events[1]["cached"] is True
+    assert fake_app.state.requests == 1
+
+def test_synthesize_stream_backend_error_is_an_error_event(language_service):
+    events = stream_events(TestClient(language_agent.app), "/synthesize/stream", {**PAYLOAD, "backend": "failing"})
+
+    assert [event["type"] for event in events] == ["token", "error"]
+    assert "provider exploded" in events[-1]["detail"]
+    # Dispatcher slot was released despite the failure
+    assert language_service.dispatcher.in_flight == 0
+
+@pytest.fixture
+def orchestrator_client(language_service, serve, unreachable_url, monkeypatch):
+    # Agents other than the language agent are unreachable and degrade to empty results
+    urls = {name: unreachable_url for name in orchestrator_main.orchestrator.agent_urls}
+    urls["language"] = serve(language_agent.app)
+    monkeypatch.setattr(orchestrator_main.orchestrator, "clients", AgentClientPool(urls))
+    with TestClient(orchestrator_main.app) as client:
+        yield client
+
+def test_process_stream_forwards_tokens_then_done(orchestrator_client):
+    request = {"query": PAYLOAD["query"], "symbols": [], "response_type": "detailed", "backend": "openai"}
+    events = stream_events(orchestrator_client, "/process/stream", request)
+
+    assert events[0]["type"] == "context"
+    tokens = [event["content"] for event in events if event["type"] == "token"]
+    assert "".join(tokens) == DEFAULT_TEXT
+    assert events[-1]["type"] == "done"
+    assert events[-1]["ai_response"]["response"] == DEFAULT_TEXT
+    assert 0 < events[-1]["time_to_first_token"] <= events[-1]["processing_time"]
+
+def test_process_stream_reports_language_agent_http_error(orchestrator_client):
+    request = {"query": PAYLOAD["query"], "symbols": [], "backend": "no-such-backend"}
+    events = stream_events(orchestrator_client, "/process/stream", request)
+
+    assert [event["type"] for event in events] == ["context", "error"]
+    assert "HTTP 400" in events[-1]["detail"]
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from config.settings import settings
+from data_ingestion.embedding_service import EmbeddingService
+from data_ingestion.sharded_embedding_service import ShardedEmbeddingService
+from data_ingestion.vector_index import build_index, search_params, train_index
+
+DIMENSION = 32
+TICKERS = ["AAPL", "MSFT", "NVDA", "XOM", "JPM", "TSM", "AMZN", "META"]
+
+class LookupModel:
+    """Stands in for a SentenceTransformer: each known text maps to a fixed vector"""
+
+    def __init__(self, table: dict):
+        self.table = table
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return DIMENSION
+
+    def encode(self, texts, batch_size: int = 32, convert_to_tensor: bool = False) -> np.ndarray:
+        return np.stack([self.table[text] for text in texts])
+
+def unit(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Clustered unit vectors, as sentence embeddings are, and queries near corpus points"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, DIMENSION))
+    documents = unit(centers[rng.integers(0, 20, 2000)] + rng.normal(0, 0.6, (2000, DIMENSION)))
+    queries = unit(documents[rng.choice(2000, 50, replace=False)] + rng.normal(0, 0.3, (50, DIMENSION)))
+    texts = [f"doc {i}" for i in range(len(documents))]
+    query_texts = [f"query {j}" for j in range(len(queries))]
+    model = LookupModel({**dict(zip(texts, documents)), **dict(zip(query_texts, queries))})
+    exact = np.argsort(-(queries @ documents.T), axis=1, kind="stable")[:, :10]
+    return {"documents": documents, "queries": queries, "texts": texts, "query_texts": query_texts,
+            "model": model, "exact": exact}
+
+def recall(found: np.ndarray, exact: np.ndarray) -> float:
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)])
+
+def ids(results) -> list:
+    return [int(content.split()[1]) for content, _, _ in results]
+
+@pytest.mark.parametrize("index_type, params, minimum", [
+    ("ivf_flat", {"nprobe": 8}, 0.9),
+    ("ivf_flat", {"nprobe": 32}, 1.0),
+    ("hnsw", {"ef_search": 64}, 0.95),
+])
+def test_approximate_indexes_recall_against_flat(corpus, index_type, params, minimum):
+    index = build_index(index_type, DIMENSION, nlist=32, hnsw_m=16)
+    train_index(index, corpus["documents"])
+    index.add(corpus["documents"])
+    _, found = index.search(corpus["queries"], 10, params=search_params(index, **params))
+    assert recall(found, corpus["exact"]) >= minimum
+
+def test_narrower_probe_trades_recall_for_speed(corpus):
+    index = build_index("ivf_flat", DIMENSION, nlist=32)
+    train_index(index, corpus["documents"])
+    index.add(corpus["documents"])
+    recalls = [recall(index.search(corpus["queries"], 10, params=search_params(index, nprobe=nprobe))[1],
+                      corpus["exact"]) for nprobe in (1, 4, 16)]
+    assert recalls == sorted(recalls) and recalls[0] < recalls[-1]
+
+@pytest.fixture
+def quantized(monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "pq")
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PQ_M", 8)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PQ_BITS", 4)
+    monkeypatch.setattr(settings, "VECTOR_RERANK_FACTOR", 10)
+
+def test_quantized_search_is_reranked_with_float_vectors(corpus, quantized, tmp_path):
+    service = EmbeddingService(index_type="flat", model=corpus["model"])
+    service.add_documents(corpus["texts"])
+    assert service.staging is None and service.index.is_trained
+
+    reranked, codes_only = [], []
+    for query_text, query in zip(corpus["query_texts"], corpus["queries"]):
+        results = service.search(query_text, 10)
+        # Re-ranked scores are exact inner products, best first
+        np.testing.assert_allclose([score for _, score, _ in results],
+                                   corpus["documents"][ids(results)] @ query, rtol=1e-5)
+        reranked.append(ids(results))
+        codes_only.append(service.index.search(query[None, :], 10)[1][0])
+    assert recall(reranked, corpus["exact"]) >= 0.9
+    assert recall(reranked, corpus["exact"]) > recall(codes_only, corpus["exact"])
+
+    # A reloaded snapshot keeps re-ranking against the vectors saved with it
+    path = str(tmp_path / "quantized")
+    service.save_index(path)
+    restored = EmbeddingService(index_type="flat", model=corpus["model"])
+    restored.load_index(path)
+    assert restored.search(corpus["query_texts"][0], 10) == service.search(corpus["query_texts"][0], 10)
+    service.close()
+    restored.close()
+
+def test_manual_training_waits_for_enough_points_for_the_pq_codebook(corpus, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_INDEX_NLIST", 4)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PQ_M", 8)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PQ_BITS", 8)
+    service = EmbeddingService(index_type="ivf_pq", model=corpus["model"])
+    service.add_documents(corpus["texts"][:100])
+
+    # More than nlist points, but fewer than the 256 PQ centroids
+    service.train()
+    assert service.staging is not None
+    assert ids(service.search(corpus["query_texts"][0], 3)) == list(
+        np.argsort(-(corpus["documents"][:100] @ corpus["queries"][0]), kind="stable")[:3]
+    )
+
+    service.add_documents(corpus["texts"][100:300])
+    service.train()
+    assert service.staging is None and service.index.ntotal == 300
+    service.close()
+
+def test_sharded_fan_out_matches_an_unsharded_index(corpus):
+    metadatas = [{"ticker": TICKERS[i % len(TICKERS)]} for i in range(len(corpus["texts"]))]
+    unsharded = EmbeddingService(index_type="flat", model=corpus["model"])
+    unsharded.add_documents(corpus["texts"], metadatas)
+    sharded = ShardedEmbeddingService(index_type="flat", shard_by="symbol", shard_count=4, model=corpus["model"])
+    sharded.add_documents(corpus["texts"], metadatas)
+
+    assert len(sharded.shards) > 1 and len(sharded) == len(unsharded.documents)
+    # One model and one embedding cache for every shard
+    assert {id(shard.embedding_cache) for shard in sharded.shards.values()} == {id(sharded.embedding_cache)}
+    for query_text in corpus["query_texts"]:
+        expected = unsharded.search(query_text, 10)
+        merged = sharded.search(query_text, 10)
+        assert ids(merged) == ids(expected)
+        np.testing.assert_allclose([s for _, s, _ in merged], [s for _, s, _ in expected], rtol=1e-6)
+
+    # Restricting the fan-out searches only the named shards
+    key = sharded.shard_key({"ticker": "AAPL"})
+    only = sharded.search(corpus["query_texts"][0], 10, shard_keys=[key])
+    assert {metadata["ticker"] for _, _, metadata in only} <= {
+        ticker for ticker in TICKERS if sharded.shard_key({"ticker": ticker}) == key
+    }
+    unsharded.close()
+    sharded.close()
@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+
+from data_ingestion.vector_store import FloatVectorStore
+
+def vectors(rows: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(rows, 8)).astype(np.float32)
+
+def test_snapshot_is_not_changed_by_later_adds(tmp_path):
+    path = str(tmp_path / "index.vectors")
+    first, later = vectors(5), vectors(3, seed=1)
+    store = FloatVectorStore(8)
+    store.add(first)
+    store.save(path)
+    store.add(later)
+
+    assert os.path.getsize(path) == first.nbytes
+    np.testing.assert_array_equal(store.get(np.array([4, 5])), np.stack([first[4], later[0]]))
+    store.close()
+    # Closing removes only the private working file
+    assert os.path.exists(path) and not os.path.exists(store.path)
+
+def test_loading_a_snapshot_copies_it_and_never_writes_it(tmp_path):
+    path = str(tmp_path / "index.vectors")
+    saved = vectors(6)
+    writer = FloatVectorStore(8)
+    writer.add(saved)
+    writer.save(path)
+
+    # A reader whose index only covers the first 4 rows
+    reader = FloatVectorStore(8, path, rows=4)
+    reader.add(vectors(2, seed=2))
+    writer.add(vectors(2, seed=3))
+
+    assert len(reader) == 6 and len(writer) == 8
+    np.testing.assert_array_equal(reader.get(np.arange(4)), saved[:4])
+    np.testing.assert_array_equal(np.fromfile(path, dtype=np.float32).reshape(-1, 8), saved)
+    reader.close()
+    writer.close()